@@ -0,0 +1,68 @@
+"""Compares per-row inserts with the COPY based bulk writer.
+
+Usage (against the testing database):
+    env $(cat .env.tests | xargs) python -m benchmarks.bench_bulk_insert --rows 100000
+"""
+
+import argparse
+import time
+
+from sqlalchemy import text
+
+from src.core.database import Base, SessionLocal, engine
+from src.transaction.repository import TransactionRepository
+from tests.generators import generate_transaction
+
+
+def _truncate(session) -> None:
+    session.execute(
+        text(
+            "TRUNCATE TABLE transactions, customer_summary, product_summary, "
+            "customer_product, customer_sketch, product_sketch"
+        )
+    )
+    session.commit()
+
+
+def _measure(label: str, rows: int, func) -> None:
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{label:<12} {rows:>9} rows  {elapsed:8.2f}s  {rows / elapsed:>10.0f} rows/s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    transactions = [generate_transaction() for _ in range(args.rows)]
+
+    with SessionLocal() as session:
+        repository = TransactionRepository(session=session)
+
+        def per_row():
+            for transaction in transactions:
+                repository.create(transaction=transaction)
+            repository.persist()
+
+        def bulk():
+            repository.create_many(
+                transactions=transactions, batch_size=args.batch_size
+            )
+            repository.persist()
+
+        _truncate(session)
+        _measure("per-row", args.rows, per_row)
+        _truncate(session)
+        _measure("create_many", args.rows, bulk)
+        _truncate(session)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Wall time and request size of plain vs compressed uploads through the API.
+
+Every variant uploads the same rows to POST /transactions/upload, the table is
+truncated in between. zstd is skipped when zstandard is not installed.
+
+Usage (against the testing database):
+    env $(cat .env.tests | xargs) python -m benchmarks.bench_compressed_upload --rows 200000
+"""
+
+import argparse
+import gzip
+import io
+import time
+import zipfile
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from benchmarks.bench_validator import _generate_content
+from src.core.database import Base, SessionLocal, engine
+from src.main import app
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _zip(content: bytes, members: int) -> bytes:
+    lines = content.splitlines(keepends=True)
+    header, rows = lines[0], lines[1:]
+    size = -(-len(rows) // members)
+    archive = io.BytesIO()
+
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        for idx in range(members):
+            part = b"".join([header, *rows[idx * size : (idx + 1) * size]])
+            zip_file.writestr(f"part-{idx}.csv", part)
+
+    return archive.getvalue()
+
+
+def _truncate() -> None:
+    with SessionLocal() as session:
+        session.execute(
+            text(
+                "TRUNCATE TABLE transactions, customer_summary, product_summary, "
+                "customer_product, customer_sketch, product_sketch"
+            )
+        )
+        session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--zip-members", type=int, default=4)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    client = TestClient(app)
+    content = _generate_content(args.rows)
+
+    variants = [
+        ("plain", content, "text/csv"),
+        ("gzip", gzip.compress(content, compresslevel=6), "application/gzip"),
+        ("zip", _zip(content, members=args.zip_members), "application/zip"),
+    ]
+
+    if zstandard is not None:
+        compressed = zstandard.ZstdCompressor(level=3).compress(content)
+        variants.append(("zstd", compressed, "application/zstd"))
+
+    for label, payload, content_type in variants:
+        _truncate()
+        started = time.perf_counter()
+        response = client.post(
+            "/transactions/upload",
+            files={"file": (f"transactions.{label}", payload, content_type)},
+        )
+        elapsed = time.perf_counter() - started
+
+        assert response.json()["success"] == args.rows, response.text
+        print(
+            f"{label:<6} {len(payload) / 2**20:8.2f}MiB  "
+            f"ratio {len(content) / len(payload):5.1f}x  {elapsed:7.2f}s  "
+            f"{args.rows / elapsed:>9.0f} rows/s"
+        )
+
+    _truncate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Caller side cost of a log record: synchronous JSON handler vs the queue pipeline.
+
+Usage:
+    env $(cat .env.tests | xargs) python -m benchmarks.bench_logging --records 200000
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import time
+from datetime import datetime
+
+from src.core.logging import (
+    CustomFormatter,
+    _BatchingQueueListener,
+    _RecordQueueHandler,
+)
+
+
+class _SynchronousFormatter(logging.Formatter):
+    """The formatter used before the queue pipeline"""
+
+    def format(self, record):
+        log_record = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "location": f"{record.module}:{record.lineno}",
+        }
+
+        if hasattr(record, "extra") and isinstance(record.extra, dict):
+            log_record.update(record.extra)
+
+        return json.dumps(log_record)
+
+
+def _measure(label: str, logger: logging.Logger, records: int, drain=None) -> None:
+    started = time.perf_counter()
+
+    for idx in range(records):
+        logger.error(
+            f"Invalid row content: {idx}. Reason: Input should be greater than 0",
+            extra={"extra": {"column": "amount", "reason": "greater_than"}},
+        )
+
+    caller = time.perf_counter() - started
+
+    if drain:
+        drain()
+
+    total = time.perf_counter() - started
+
+    print(
+        f"{label:<12} {records:>9} records  "
+        f"caller {caller / records * 1e6:6.2f}us/record  total {total:6.2f}s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=200000)
+    args = parser.parse_args()
+
+    devnull = open(os.devnull, "w")
+
+    before = logging.getLogger("bench.before")
+    before.propagate = False
+    handler = logging.StreamHandler(devnull)
+    handler.setFormatter(_SynchronousFormatter())
+    before.addHandler(handler)
+
+    _measure("synchronous", before, args.records)
+
+    records = queue.SimpleQueue()
+    after = logging.getLogger("bench.after")
+    after.propagate = False
+    after.addHandler(_RecordQueueHandler(records))
+    listener = _BatchingQueueListener(
+        records, stream=devnull, formatter=CustomFormatter(), batch_size=512
+    )
+
+    listener.start()
+    _measure("queued", after, args.records, drain=listener.stop)
+
+    # Enqueue cost alone, the writer only starts once every record is queued
+    def drain():
+        listener.start()
+        listener.stop()
+
+    _measure("enqueue", after, args.records, drain=drain)
+
+
+if __name__ == "__main__":
+    main()
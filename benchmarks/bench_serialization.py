@@ -0,0 +1,165 @@
+"""Listing page serialization, validated models and jsonable_encoder vs the fast path.
+
+Rows are built in memory, so only mapping and encoding are measured: the
+validated variant is how reads were served before, each ORM instance
+validated into a ``Transaction`` and the page passed through
+``jsonable_encoder`` before ``JSONResponse`` encoded it again. The fast path
+validates plain rows with ``Transaction.from_row`` and serializes the page
+with ``ModelResponse``. Both variants validate every row, plain rows only
+skip ORM attribute access; most of the gain is in encoding.
+
+Usage:
+    env $(cat .env.tests | xargs) python -m benchmarks.bench_serialization \\
+        --page-size 1000
+"""
+
+import argparse
+import timeit
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.core.responses import ModelResponse
+from src.transaction.models.access import TransactionActiveRecord
+from src.transaction.models.dto import (
+    TotalCountKind,
+    Transaction,
+    TransactionsPaginated,
+)
+
+
+def _active_records(count: int):
+    started = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    return [
+        TransactionActiveRecord(
+            transaction_id=uuid4(),
+            timestamp=started + timedelta(seconds=n),
+            amount=Decimal(n % 1000) / 10 + 1,
+            currency=("PLN", "EUR", "USD")[n % 3],
+            customer_id=uuid4(),
+            product_id=uuid4(),
+            quantity=1 + n % 5,
+        )
+        for n in range(count)
+    ]
+
+
+# Attribute access like the Row of a plain select
+_Row = namedtuple(
+    "_Row", [column.key for column in TransactionActiveRecord.__table__.c]
+)
+
+
+def _rows(models):
+    return [
+        _Row(*(getattr(model, field) for field in _Row._fields)) for model in models
+    ]
+
+
+def _validated(model: TransactionActiveRecord) -> Transaction:
+    return Transaction(
+        transaction_id=model.transaction_id,
+        timestamp=model.timestamp,
+        amount=model.amount,
+        currency=model.currency,
+        customer_id=model.customer_id,
+        product_id=model.product_id,
+        quantity=model.quantity,
+    )
+
+
+def _validated_page(models) -> TransactionsPaginated:
+    return TransactionsPaginated(
+        total_count=len(models),
+        total_count_kind=TotalCountKind.EXACT,
+        page=1,
+        page_size=len(models),
+        items=[_validated(model) for model in models],
+    )
+
+
+def _rows_page(rows) -> TransactionsPaginated:
+    return TransactionsPaginated.model_construct(
+        total_count=len(rows),
+        total_count_kind=TotalCountKind.EXACT,
+        page=1,
+        page_size=len(rows),
+        items=[Transaction.from_row(row) for row in rows],
+        next_cursor=None,
+    )
+
+
+def _measure(label: str, page_size: int, func, number: int) -> float:
+    elapsed = min(timeit.repeat(func, number=number, repeat=5)) / number
+
+    print(
+        f"{label:<22} {elapsed * 1000:8.3f}ms per page  "
+        f"{elapsed / page_size * 1e6:7.2f}us per row"
+    )
+
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    models = _active_records(args.page_size)
+    rows = _rows(models)
+    validated_page = _validated_page(models)
+    rows_page = _rows_page(rows)
+
+    assert (
+        ModelResponse(content=rows_page).body
+        == JSONResponse(content=jsonable_encoder(validated_page)).body
+    )
+
+    _measure(
+        "map validated",
+        args.page_size,
+        lambda: [_validated(model) for model in models],
+        args.number,
+    )
+    _measure(
+        "map rows",
+        args.page_size,
+        lambda: [Transaction.from_row(row) for row in rows],
+        args.number,
+    )
+    _measure(
+        "encode jsonable",
+        args.page_size,
+        lambda: JSONResponse(content=jsonable_encoder(validated_page)),
+        args.number,
+    )
+    _measure(
+        "encode model",
+        args.page_size,
+        lambda: ModelResponse(content=rows_page),
+        args.number,
+    )
+    before = _measure(
+        "total before",
+        args.page_size,
+        lambda: JSONResponse(content=jsonable_encoder(_validated_page(models))),
+        args.number,
+    )
+    after = _measure(
+        "total fast path",
+        args.page_size,
+        lambda: ModelResponse(content=_rows_page(rows)),
+        args.number,
+    )
+
+    print(f"speedup {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Customer summary computed from loaded rows vs the SQL aggregate vs the rollup.
+
+One customer gets ``--rows`` transactions, the loaded variant is how the
+summary was computed before it was pushed down to the database, the
+aggregate before rollups were maintained on ingest. Peak memory is traced
+with tracemalloc, which also slows down the loaded variant.
+
+Usage (against the testing database):
+    env $(cat .env.tests | xargs) python -m benchmarks.bench_summary --rows 1000000
+"""
+
+import argparse
+import time
+import tracemalloc
+from uuid import uuid4
+
+from sqlalchemy import select, text
+
+from src.core.database import Base, SessionLocal, engine
+from src.transaction import queries
+from src.transaction.models.access import TransactionActiveRecord
+from src.transaction.repository import TransactionRepository
+from src.transaction.rollups import SummaryRollups
+
+
+def _seed(session, customer_id, rows: int) -> None:
+    session.execute(
+        text(
+            "TRUNCATE TABLE transactions, customer_summary, product_summary, "
+            "customer_product, customer_sketch, product_sketch"
+        )
+    )
+    session.execute(
+        text(
+            "INSERT INTO transactions "
+            "SELECT gen_random_uuid(), "
+            "timestamptz '2024-01-01' + make_interval(secs => n), "
+            "(n % 1000) / 10.0 + 1, "
+            "(ARRAY['PLN', 'EUR', 'USD'])[n % 3 + 1]::currency, "
+            "1 + n % 5, :customer_id, gen_random_uuid() "
+            "FROM generate_series(1, :rows) AS n"
+        ),
+        {"customer_id": customer_id, "rows": rows},
+    )
+    session.commit()
+    session.execute(text("ANALYZE transactions"))
+    session.commit()
+    SummaryRollups(engine=engine).rebuild()
+
+
+def _loaded_summary(repository: TransactionRepository, customer_id):
+    models = repository.session.scalars(
+        select(TransactionActiveRecord).where(
+            TransactionActiveRecord.customer_id == customer_id
+        )
+    ).all()
+    rates = {"PLN": 1, **repository._PLN_RATES}
+
+    return (
+        sum(model.amount * rates[model.currency] for model in models),
+        len(set(model.product_id for model in models)),
+        max(model.timestamp for model in models),
+    )
+
+
+def _aggregated_summary(repository: TransactionRepository, customer_id):
+    summary = repository.session.execute(
+        queries.summarize_customers(repository._PLN_RATES).where(
+            TransactionActiveRecord.customer_id == customer_id
+        )
+    ).one()
+
+    return (
+        summary.total_revenue,
+        summary.unique_products_count,
+        summary.last_transaction_date,
+    )
+
+
+def _rollup_summary(repository: TransactionRepository, customer_id):
+    summary = repository.get_customer_summary(customer_id=customer_id)
+
+    return (
+        summary.total_revenue,
+        summary.unique_products_count,
+        summary.last_transaction_date,
+    )
+
+
+def _measure(label: str, func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<10} {elapsed:8.3f}s  peak {peak / 2**20:9.1f}MiB")
+
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    customer_id = uuid4()
+
+    with SessionLocal() as session:
+        _seed(session, customer_id, args.rows)
+        repository = TransactionRepository(session=session)
+
+        loaded = _measure("loaded", lambda: _loaded_summary(repository, customer_id))
+        session.expunge_all()
+        aggregated = _measure(
+            "aggregate", lambda: _aggregated_summary(repository, customer_id)
+        )
+
+        rollup = _measure("rollup", lambda: _rollup_summary(repository, customer_id))
+
+        assert loaded == aggregated == rollup, (loaded, aggregated, rollup)
+
+        session.execute(
+            text(
+                "TRUNCATE TABLE transactions, customer_summary, product_summary, "
+                "customer_product, customer_sketch, product_sketch"
+            )
+        )
+        session.commit()
+
+
+if __name__ == "__main__":
+    main()
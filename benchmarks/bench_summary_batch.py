@@ -0,0 +1,120 @@
+"""Customer summaries requested one id at a time vs the bulk NDJSON endpoint.
+
+``--customers`` customers get ``--rows`` transactions between them, both
+variants go through the application with its own database sessions, the
+bulk one in requests of ``REPORT_BATCH_MAX_IDS`` ids.
+
+Usage (against the testing database):
+    env $(cat .env.tests | xargs) python -m benchmarks.bench_summary_batch \\
+        --customers 20000
+"""
+
+import argparse
+import json
+import time
+from uuid import uuid4
+
+from sqlalchemy import text
+from starlette.testclient import TestClient
+
+from src.core.database import Base, SessionLocal, engine
+from src.main import app
+from src.settings import settings
+from src.transaction.rollups import SummaryRollups
+from src.transaction.service import report_cache
+
+
+def _truncate(session) -> None:
+    session.execute(
+        text(
+            "TRUNCATE TABLE transactions, customer_summary, product_summary, "
+            "customer_product, customer_sketch, product_sketch"
+        )
+    )
+    session.commit()
+
+
+def _seed(session, customer_ids, rows: int) -> None:
+    _truncate(session)
+    session.execute(
+        text(
+            "INSERT INTO transactions "
+            "SELECT gen_random_uuid(), "
+            "timestamptz '2024-01-01' + make_interval(secs => n), "
+            "(n % 1000) / 10.0 + 1, "
+            "(ARRAY['PLN', 'EUR', 'USD'])[n % 3 + 1]::currency, "
+            "1 + n % 5, (CAST(:customer_ids AS uuid[]))"
+            "[n % cardinality(CAST(:customer_ids AS uuid[])) + 1], "
+            "gen_random_uuid() "
+            "FROM generate_series(1, :rows) AS n"
+        ),
+        {"customer_ids": customer_ids, "rows": rows},
+    )
+    session.commit()
+    SummaryRollups(engine=engine).rebuild()
+
+
+def _per_id(client: TestClient, customer_ids):
+    return [
+        client.get(f"/reports/customer-summary/{customer_id}").json()
+        for customer_id in customer_ids
+    ]
+
+
+def _batched(client: TestClient, customer_ids):
+    summaries = []
+
+    for start in range(0, len(customer_ids), settings.report_batch_max_ids):
+        response = client.post(
+            "/reports/customer-summary:batch",
+            json={
+                "customer_ids": customer_ids[
+                    start : start + settings.report_batch_max_ids
+                ]
+            },
+        )
+        summaries += [json.loads(line) for line in response.text.splitlines()]
+
+    return summaries
+
+
+def _measure(label: str, customers: int, func):
+    report_cache.backend.reset()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{label:<8} {customers:>9} summaries  {elapsed:8.2f}s  "
+        f"{customers / elapsed:>10.0f} summaries/s"
+    )
+
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, default=20000)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    customer_ids = [str(uuid4()) for _ in range(args.customers)]
+
+    with SessionLocal() as session, TestClient(app) as client:
+        _seed(session, customer_ids, args.rows)
+
+        per_id = _measure(
+            "per-id", args.customers, lambda: _per_id(client, customer_ids)
+        )
+        batched = _measure(
+            "batch", args.customers, lambda: _batched(client, customer_ids)
+        )
+
+        assert per_id == batched
+
+        _truncate(session)
+
+
+if __name__ == "__main__":
+    main()
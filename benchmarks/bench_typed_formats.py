@@ -0,0 +1,96 @@
+"""Validation throughput of the same rows as CSV, NDJSON, Parquet and Arrow IPC.
+
+Parquet and Arrow store ids as 16 byte UUIDs, timestamps, amounts and
+quantities typed. Requires pyarrow.
+
+Usage:
+    env $(cat .env.tests | xargs) python -m benchmarks.bench_typed_formats --rows 200000
+"""
+
+import argparse
+import csv
+import io
+import time
+from datetime import datetime
+from uuid import UUID
+
+import orjson
+import pyarrow
+import pyarrow.ipc
+import pyarrow.parquet
+
+from benchmarks.bench_validator import _generate_content
+from src.transaction.models.dto import UploadFormat
+from src.transaction.validator import VALIDATORS
+
+
+def _typed_table(rows: list) -> "pyarrow.Table":
+    return pyarrow.table(
+        {
+            "transaction_id": pyarrow.array(
+                [UUID(row["transaction_id"]).bytes for row in rows], pyarrow.uuid()
+            ),
+            "timestamp": pyarrow.array(
+                [datetime.fromisoformat(row["timestamp"]) for row in rows],
+                pyarrow.timestamp("us", tz="UTC"),
+            ),
+            "amount": pyarrow.array([float(row["amount"]) for row in rows]),
+            "currency": pyarrow.array(
+                [row["currency"] for row in rows]
+            ).dictionary_encode(),
+            "customer_id": pyarrow.array(
+                [UUID(row["customer_id"]).bytes for row in rows], pyarrow.uuid()
+            ),
+            "product_id": pyarrow.array(
+                [UUID(row["product_id"]).bytes for row in rows], pyarrow.uuid()
+            ),
+            "quantity": pyarrow.array([int(row["quantity"]) for row in rows]),
+        }
+    )
+
+
+def _payloads(rows: int) -> dict:
+    content = _generate_content(rows)
+    records = list(csv.DictReader(io.StringIO(content.decode())))
+    table = _typed_table(records)
+
+    parquet, arrow = io.BytesIO(), io.BytesIO()
+    pyarrow.parquet.write_table(table, parquet)
+
+    with pyarrow.ipc.new_file(arrow, table.schema) as writer:
+        writer.write_table(table)
+
+    return {
+        UploadFormat.CSV: content,
+        UploadFormat.NDJSON: b"\n".join(map(orjson.dumps, records)),
+        UploadFormat.PARQUET: parquet.getvalue(),
+        UploadFormat.ARROW: arrow.getvalue(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    payloads = _payloads(args.rows)
+
+    for name, validator_class in VALIDATORS.items():
+        for format, payload in payloads.items():
+            started = time.perf_counter()
+            success = sum(
+                batch.success
+                for batch in validator_class().validate_stream(
+                    stream=io.BytesIO(payload), format=format
+                )
+            )
+            elapsed = time.perf_counter() - started
+
+            print(
+                f"{name:<10} {format.value:<8} {len(payload) / 2**20:7.2f}MiB  "
+                f"{success:>9} rows  {elapsed:7.2f}s  {args.rows / elapsed:>10.0f} rows/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
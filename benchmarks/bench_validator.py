@@ -0,0 +1,62 @@
+"""Compares the pydantic model validator with the columnar one.
+
+Usage:
+    env $(cat .env.tests | xargs) python -m benchmarks.bench_validator --rows 1000000
+"""
+
+import argparse
+import io
+import random
+import time
+from uuid import uuid4
+
+from src.transaction.validator import VALIDATORS
+from tests.generators import generate_csv, valid_headers
+
+
+def _generate_content(rows: int) -> bytes:
+    currencies = ("PLN", "EUR", "USD")
+
+    return generate_csv(
+        valid_headers(),
+        [
+            {
+                "transaction_id": str(uuid4()),
+                "timestamp": f"2024-01-{random.randint(1, 28):02d}T10:00:00Z",
+                "amount": f"{random.uniform(1, 1000):.2f}",
+                "currency": random.choice(currencies),
+                "customer_id": str(uuid4()),
+                "product_id": str(uuid4()),
+                "quantity": random.randint(1, 10),
+            }
+            for _ in range(rows)
+        ],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    content = _generate_content(args.rows)
+
+    for name, validator_class in VALIDATORS.items():
+        started = time.perf_counter()
+        success = sum(
+            batch.success
+            for batch in validator_class(workers=args.workers).validate_stream(
+                stream=io.BytesIO(content)
+            )
+        )
+        elapsed = time.perf_counter() - started
+
+        print(
+            f"{name:<10} {success:>9} rows  {elapsed:8.2f}s  "
+            f"{args.rows / elapsed:>10.0f} rows/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
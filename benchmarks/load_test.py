@@ -0,0 +1,117 @@
+"""Concurrent read load against the API, reports latency percentiles.
+
+Seeds the testing database, then keeps ``--concurrency`` clients busy with a mix
+of paginated reads, transaction details and (slow) customer/product reports.
+
+Usage (in process, against the testing database):
+    env $(cat .env.tests | xargs) python -m benchmarks.load_test --requests 2000
+Against a running server:
+    env $(cat .env.tests | xargs) python -m benchmarks.load_test --url http://localhost:8000
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from uuid import uuid4
+
+import httpx
+from sqlalchemy import text
+
+from src.core.database import Base, SessionLocal, engine
+from src.main import app
+from src.transaction.repository import TransactionRepository
+from tests.generators import generate_transaction
+
+
+def _seed(rows: int, hot_rows: int) -> dict:
+    customer_id, product_id = uuid4(), uuid4()
+    transactions = [generate_transaction() for _ in range(rows)]
+    transactions += [
+        generate_transaction(customer_id=customer_id, product_id=product_id)
+        for _ in range(hot_rows)
+    ]
+
+    Base.metadata.create_all(bind=engine)
+
+    with SessionLocal() as session:
+        session.execute(
+            text(
+                "TRUNCATE TABLE transactions, customer_summary, product_summary, "
+                "customer_product, customer_sketch, product_sketch"
+            )
+        )
+        repository = TransactionRepository(session=session)
+        repository.create_many(transactions=transactions)
+        repository.persist()
+
+    return {
+        "transaction_ids": [item.transaction_id for item in transactions[:100]],
+        "customer_id": customer_id,
+        "product_id": product_id,
+    }
+
+
+def _paths(seeded: dict):
+    while True:
+        yield random.choice(
+            (
+                "/transactions?page=1&page_size=20",
+                f"/transactions/{random.choice(seeded['transaction_ids'])}",
+                f"/reports/customer-summary/{seeded['customer_id']}",
+                f"/reports/product-summary/{seeded['product_id']}",
+                "/health-check",
+            )
+        )
+
+
+async def _run(client: httpx.AsyncClient, requests: int, concurrency: int, paths):
+    latencies = []
+
+    async def worker():
+        while len(latencies) < requests:
+            started = time.perf_counter()
+            response = await client.get(next(paths))
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code < 500, response.text
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return latencies, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--hot-rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    seeded = _seed(rows=args.rows, hot_rows=args.hot_rows)
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://test")
+
+    async def run():
+        async with client:
+            return await _run(client, args.requests, args.concurrency, _paths(seeded))
+
+    latencies, elapsed = asyncio.run(run())
+    percentiles = statistics.quantiles(latencies, n=100)
+
+    print(
+        f"{len(latencies)} requests  concurrency {args.concurrency}  "
+        f"{len(latencies) / elapsed:.0f} req/s  "
+        f"p50 {percentiles[49] * 1000:.1f}ms  p99 {percentiles[98] * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from ..core.telemetry import pool_telemetry
+from ..transaction.service import report_cache
+
+router = APIRouter(prefix="/internal", include_in_schema=False)
+
+
+@router.get("/pool-stats")
+async def get_pool_stats():
+    return JSONResponse(
+        content={
+            name: telemetry.snapshot() for name, telemetry in pool_telemetry.items()
+        },
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    return JSONResponse(
+        content={"reports": report_cache.snapshot()}, status_code=status.HTTP_200_OK
+    )
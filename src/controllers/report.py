@@ -1,24 +1,107 @@
+from typing import Iterable, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 
+from src.core import etags
+from src.core.responses import ModelResponse
 from src.transaction.errors import CustomerSummaryNotFound, ProductSummaryNotFound
-from src.transaction.service import TransactionService, get_transaction_service
+from src.transaction.models.dto import (
+    CustomerSummariesRequest,
+    DistinctCountMode,
+    ProductSummariesRequest,
+)
+from src.transaction.service import (
+    AsyncTransactionService,
+    get_async_transaction_service,
+)
+
+# Stored by clients and the CDN, revalidated on every use
+REPORT_CACHE_CONTROL = "no-cache"
+
+NDJSON_CHUNK_SIZE = 500  # Summaries serialized per chunk of a bulk response
 
 router = APIRouter()
 
 
+def _encode_ndjson(items: List[BaseModel]) -> Iterable[bytes]:
+    for start in range(0, len(items), NDJSON_CHUNK_SIZE):
+        yield b"".join(
+            item.model_dump_json().encode() + b"\n"
+            for item in items[start : start + NDJSON_CHUNK_SIZE]
+        )
+
+
+@router.post("/reports/customer-summary:batch")
+async def get_customer_summaries(
+    request: CustomerSummariesRequest,
+    distinct: DistinctCountMode = Query(
+        DistinctCountMode.EXACT, description="approximate reads HyperLogLog sketches"
+    ),
+    service: AsyncTransactionService = Depends(get_async_transaction_service),
+):
+    summaries = await service.get_customer_summaries(
+        customer_ids=request.customer_ids, distinct=distinct
+    )
+
+    return StreamingResponse(
+        _encode_ndjson(summaries), media_type="application/x-ndjson"
+    )
+
+
+@router.post("/reports/product-summary:batch")
+async def get_product_summaries(
+    request: ProductSummariesRequest,
+    distinct: DistinctCountMode = Query(
+        DistinctCountMode.EXACT, description="approximate reads HyperLogLog sketches"
+    ),
+    service: AsyncTransactionService = Depends(get_async_transaction_service),
+):
+    summaries = await service.get_product_summaries(
+        product_ids=request.product_ids, distinct=distinct
+    )
+
+    return StreamingResponse(
+        _encode_ndjson(summaries), media_type="application/x-ndjson"
+    )
+
+
 @router.get("/reports/customer-summary/{customer_id}")
 async def get_customer_summary(
-    customer_id: UUID, service: TransactionService = Depends(get_transaction_service)
+    customer_id: UUID,
+    distinct: DistinctCountMode = Query(
+        DistinctCountMode.EXACT, description="approximate reads HyperLogLog sketches"
+    ),
+    if_none_match: Optional[str] = Header(None),
+    service: AsyncTransactionService = Depends(get_async_transaction_service),
 ):
     try:
-        customer_summary_ = service.get_customer_summary(customer_id=customer_id)
+        if if_none_match:
+            etag = etags.etag(
+                await service.get_customer_summary_version(
+                    customer_id=customer_id, distinct=distinct
+                )
+            )
 
-        return JSONResponse(
-            content=jsonable_encoder(customer_summary_), status_code=status.HTTP_200_OK
+            if etags.matches(if_none_match, etag):
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag, "Cache-Control": REPORT_CACHE_CONTROL},
+                )
+
+        customer_summary_ = await service.get_customer_summary(
+            customer_id=customer_id, distinct=distinct
+        )
+
+        return ModelResponse(
+            content=customer_summary_,
+            status_code=status.HTTP_200_OK,
+            headers={
+                "ETag": etags.etag(customer_summary_.version),
+                "Cache-Control": REPORT_CACHE_CONTROL,
+            },
         )
 
     except CustomerSummaryNotFound as error:
@@ -30,13 +113,38 @@ async def get_customer_summary(
 
 @router.get("/reports/product-summary/{product_id}")
 async def get_product_summary(
-    product_id: UUID, service: TransactionService = Depends(get_transaction_service)
+    product_id: UUID,
+    distinct: DistinctCountMode = Query(
+        DistinctCountMode.EXACT, description="approximate reads HyperLogLog sketches"
+    ),
+    if_none_match: Optional[str] = Header(None),
+    service: AsyncTransactionService = Depends(get_async_transaction_service),
 ):
     try:
-        product_summary_ = service.get_product_summary(product_id=product_id)
+        if if_none_match:
+            etag = etags.etag(
+                await service.get_product_summary_version(
+                    product_id=product_id, distinct=distinct
+                )
+            )
+
+            if etags.matches(if_none_match, etag):
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag, "Cache-Control": REPORT_CACHE_CONTROL},
+                )
+
+        product_summary_ = await service.get_product_summary(
+            product_id=product_id, distinct=distinct
+        )
 
-        return JSONResponse(
-            content=jsonable_encoder(product_summary_), status_code=status.HTTP_200_OK
+        return ModelResponse(
+            content=product_summary_,
+            status_code=status.HTTP_200_OK,
+            headers={
+                "ETag": etags.etag(product_summary_.version),
+                "Cache-Control": REPORT_CACHE_CONTROL,
+            },
         )
 
     except ProductSummaryNotFound as error:
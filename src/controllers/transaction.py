@@ -1,56 +1,233 @@
-from typing import Optional
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Header,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from pydantic import TypeAdapter
+from starlette.concurrency import run_in_threadpool
 
-from ..core.errors import RepositoryOperationalError, RepositoryUniqueConstraintError
+from ..core import etags
+from ..core.database import get_async_session_factory
+from ..core.responses import ModelResponse
+from ..core.errors import (
+    RepositoryOperationalError,
+    RepositoryUniqueConstraintError,
+    ResourceConflict,
+)
 from ..transaction.errors import (
+    IngestErrorReportNotFound,
+    IngestJobNotFound,
+    InvalidCursor,
     InvalidFileStructure,
     TransactionNotFound,
     UnsupportedTransactionFormat,
+    UploadChunkTooLarge,
+)
+from ..settings import settings
+from ..transaction.jobs import IngestJobService, get_ingest_job_service
+from ..transaction.models.dto import (
+    DuplicateStrategy,
+    ExportFormat,
+    Transaction,
+    TransactionsBatch,
+    TransactionsBatchRequest,
+)
+from ..transaction.repository import AsyncTransactionRepository
+from ..transaction.service import (
+    AsyncTransactionService,
+    TransactionService,
+    get_async_transaction_service,
+    get_transaction_service,
 )
-from ..transaction.service import TransactionService, get_transaction_service
 
 AVAILABLE_MIME_FORMATS = ["text/csv", "application/vnd.ms-excel"]
+COMPRESSED_MIME_FORMATS = [
+    "application/gzip",
+    "application/x-gzip",
+    "application/zstd",
+    "application/zip",
+    "application/x-zip-compressed",
+]
+TYPED_MIME_FORMATS = [
+    "application/x-ndjson",
+    "application/jsonl",
+    "application/vnd.apache.parquet",
+    "application/x-parquet",
+    "application/vnd.apache.arrow.file",
+    "application/vnd.apache.arrow.stream",
+    "application/octet-stream",
+]
+
+BATCH_GET_CHUNK_SIZE = 500  # Items serialized per chunk of a batch-get response
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+_TRANSACTIONS = TypeAdapter(List[Transaction])
+_IDS = TypeAdapter(List[UUID])
 
 router = APIRouter()
 
 
-def _verify_file_mimetype(file: File):
-    if file.content_type not in AVAILABLE_MIME_FORMATS:
+def _verify_file_mimetype(file: File, formats: List[str] = AVAILABLE_MIME_FORMATS):
+    if file.content_type not in formats:
         raise UnsupportedTransactionFormat
 
 
+def _encode_batch(batch: TransactionsBatch):
+    """JSON of the batch, serialized and sent a chunk of items at a time"""
+    yield b'{"items":['
+
+    for start in range(0, len(batch.items), BATCH_GET_CHUNK_SIZE):
+        chunk = batch.items[start : start + BATCH_GET_CHUNK_SIZE]
+        yield (b"," if start else b"") + _TRANSACTIONS.dump_json(chunk)[1:-1]
+
+    yield b'],"missing":' + _IDS.dump_json(batch.missing) + b"}"
+
+
 @router.get("/transactions")
 async def fetch_transactions(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1),
+    cursor: Optional[str] = Query(None, description="next_cursor of a previous page"),
+    include_total: bool = Query(True, description="Count matching transactions"),
     product_id: Optional[UUID] = None,
     customer_id: Optional[UUID] = None,
-    service: TransactionService = Depends(get_transaction_service),
+    service: AsyncTransactionService = Depends(get_async_transaction_service),
+):
+    try:
+        if cursor is not None:
+            paginated = await service.fetch_after_cursor(
+                cursor=cursor,
+                page_size=page_size,
+                product_id=product_id,
+                customer_id=customer_id,
+            )
+        else:
+            paginated = await service.fetch_paginated(
+                page=page,
+                page_size=page_size,
+                product_id=product_id,
+                customer_id=customer_id,
+                include_total=include_total,
+            )
+
+        return ModelResponse(content=paginated, status_code=status.HTTP_200_OK)
+
+    except InvalidCursor as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error.as_dict,
+        )
+
+
+def _encode_csv(transactions: List[Transaction], header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    if header:
+        writer.writerow(Transaction.model_fields)
+
+    writer.writerows(
+        (
+            transaction.transaction_id,
+            transaction.timestamp.isoformat(),
+            transaction.amount,
+            transaction.currency.value,
+            transaction.customer_id,
+            transaction.product_id,
+            transaction.quantity,
+        )
+        for transaction in transactions
+    )
+
+    return buffer.getvalue().encode()
+
+
+def _encode_ndjson(transactions: List[Transaction], header: bool) -> bytes:
+    return b"".join(
+        transaction.model_dump_json().encode() + b"\n" for transaction in transactions
+    )
+
+
+@router.get("/transactions/export")
+async def export_transactions(
+    format: ExportFormat = Query(ExportFormat.CSV),
+    customer_id: Optional[UUID] = None,
+    product_id: Optional[UUID] = None,
+    since: Optional[datetime] = Query(None, description="Inclusive, UTC if naive"),
+    until: Optional[datetime] = Query(None, description="Exclusive, UTC if naive"),
+    session_factory=Depends(get_async_session_factory),
 ):
-    paginated = service.fetch_paginated(
-        page=page, page_size=page_size, product_id=product_id, customer_id=customer_id
+    encode = _encode_csv if format is ExportFormat.CSV else _encode_ndjson
+
+    async def body() -> AsyncIterator[bytes]:
+        # The session lives as long as the response is streamed
+        async with session_factory() as session:
+            service = AsyncTransactionService(
+                transaction_repository=AsyncTransactionRepository(session=session)
+            )
+            header = True
+
+            async for transactions in service.stream(
+                customer_id=customer_id,
+                product_id=product_id,
+                since=since,
+                until=until,
+            ):
+                yield encode(transactions, header)
+                header = False
+
+            if header:
+                yield encode([], header)
+
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="transactions.{format.value}"'
+        },
     )
 
-    return JSONResponse(
-        content=jsonable_encoder(paginated), status_code=status.HTTP_200_OK
+
+@router.post("/transactions/batch-get")
+async def get_transactions_batch(
+    request: TransactionsBatchRequest,
+    service: AsyncTransactionService = Depends(get_async_transaction_service),
+):
+    batch = await service.get_by_ids(transaction_ids=request.transaction_ids)
+
+    return StreamingResponse(
+        _encode_batch(batch),
+        media_type="application/json",
+        status_code=status.HTTP_200_OK,
     )
 
 
 @router.get("/transactions/{transaction_id}")
 async def get_transaction_details(
     transaction_id: UUID,
-    service: TransactionService = Depends(get_transaction_service),
+    if_none_match: Optional[str] = Header(None),
+    service: AsyncTransactionService = Depends(get_async_transaction_service),
 ):
     try:
-        transaction = service.get_by_id(transaction_id=transaction_id)
-
-        return JSONResponse(
-            content=jsonable_encoder(transaction), status_code=status.HTTP_201_CREATED
-        )
+        transaction = await service.get_by_id(transaction_id=transaction_id)
 
     except TransactionNotFound as error:
         raise HTTPException(
@@ -58,17 +235,41 @@ async def get_transaction_details(
             detail=error.as_dict,
         )
 
+    # Transactions are never updated, a tag of a stored one is still current
+    headers = {
+        "ETag": etags.etag(etags.version("transaction", transaction_id)),
+        "Cache-Control": (
+            f"public, max-age={settings.transaction_cache_max_age}, immutable"
+        ),
+    }
+
+    if etags.matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return ModelResponse(
+        content=transaction, status_code=status.HTTP_200_OK, headers=headers
+    )
+
 
 @router.post("/transactions/upload")
 async def upload_transaction(
     file: UploadFile = File(...),
+    on_conflict: DuplicateStrategy = Query(DuplicateStrategy.FAIL),
     service: TransactionService = Depends(get_transaction_service),
 ):
     try:
-        _verify_file_mimetype(file=file)
+        _verify_file_mimetype(
+            file=file,
+            formats=AVAILABLE_MIME_FORMATS
+            + COMPRESSED_MIME_FORMATS
+            + TYPED_MIME_FORMATS,
+        )
 
-        file_content: bytes = await file.read()
-        bulk_transaction = service.create_from_csv(content=file_content)
+        # UploadFile is spooled to disk, so rows are read, decompressed and
+        # persisted in batches, off the event loop
+        bulk_transaction = await run_in_threadpool(
+            service.create_from_upload, stream=file.file, on_conflict=on_conflict
+        )
 
         status_code = None
 
@@ -84,6 +285,13 @@ async def upload_transaction(
         if not bulk_transaction.success and not bulk_transaction.failure:
             status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
 
+        if (
+            not bulk_transaction.success
+            and not bulk_transaction.failure
+            and bulk_transaction.skipped
+        ):
+            status_code = status.HTTP_200_OK  # Re-upload of already stored rows
+
         return JSONResponse(
             content=jsonable_encoder(bulk_transaction), status_code=status_code
         )
@@ -99,3 +307,174 @@ async def upload_transaction(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=error.as_dict,
         )
+
+
+@router.post("/transactions/uploads")
+async def submit_upload_job(
+    file: UploadFile = File(...),
+    on_conflict: DuplicateStrategy = Query(DuplicateStrategy.FAIL),
+    service: IngestJobService = Depends(get_ingest_job_service),
+):
+    try:
+        _verify_file_mimetype(file=file)
+
+        job = await run_in_threadpool(
+            service.submit,
+            stream=file.file,
+            file_name=file.filename,
+            on_conflict=on_conflict,
+        )
+
+        return JSONResponse(
+            content=jsonable_encoder(job),
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"Location": f"/transactions/uploads/{job.job_id}"},
+        )
+
+    except UnsupportedTransactionFormat as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error.as_dict,
+        )
+
+    except (RepositoryUniqueConstraintError, RepositoryOperationalError) as error:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=error.as_dict,
+        )
+
+
+@router.get("/transactions/uploads/{job_id}")
+async def get_upload_job(
+    job_id: UUID,
+    service: IngestJobService = Depends(get_ingest_job_service),
+):
+    try:
+        job = await run_in_threadpool(service.get_by_id, job_id=job_id)
+
+        return JSONResponse(
+            content=jsonable_encoder(job), status_code=status.HTTP_200_OK
+        )
+
+    except IngestJobNotFound as error:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error.as_dict,
+        )
+
+
+@router.post("/transactions/upload-sessions")
+async def create_upload_session(
+    file_name: Optional[str] = Query(None),
+    on_conflict: DuplicateStrategy = Query(DuplicateStrategy.FAIL),
+    service: IngestJobService = Depends(get_ingest_job_service),
+):
+    try:
+        job = await run_in_threadpool(
+            service.create_session, file_name=file_name, on_conflict=on_conflict
+        )
+
+        return JSONResponse(
+            content=jsonable_encoder(job),
+            status_code=status.HTTP_201_CREATED,
+            headers={"Location": f"/transactions/upload-sessions/{job.job_id}"},
+        )
+
+    except (RepositoryUniqueConstraintError, RepositoryOperationalError) as error:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=error.as_dict,
+        )
+
+
+@router.put("/transactions/upload-sessions/{job_id}")
+async def upload_session_chunk(
+    job_id: UUID,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    service: IngestJobService = Depends(get_ingest_job_service),
+):
+    try:
+        # Declared size is checked first so an oversized chunk is never buffered
+        declared = request.headers.get("content-length", "0")
+
+        if declared.isdigit() and int(declared) > settings.upload_max_chunk_size:
+            raise UploadChunkTooLarge
+
+        chunk = await request.body()
+
+        if len(chunk) > settings.upload_max_chunk_size:
+            raise UploadChunkTooLarge
+
+        job = await run_in_threadpool(
+            service.append_chunk, job_id=job_id, offset=offset, chunk=chunk
+        )
+
+        return JSONResponse(
+            content=jsonable_encoder(job), status_code=status.HTTP_200_OK
+        )
+
+    except UploadChunkTooLarge as error:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=error.as_dict,
+        )
+
+    except IngestJobNotFound as error:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error.as_dict,
+        )
+
+    except ResourceConflict as error:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=error.as_dict,
+        )
+
+
+@router.post("/transactions/upload-sessions/{job_id}/commit")
+async def commit_upload_session(
+    job_id: UUID,
+    size: Optional[int] = Query(None, ge=0),
+    service: IngestJobService = Depends(get_ingest_job_service),
+):
+    try:
+        job = await run_in_threadpool(service.commit_session, job_id=job_id, size=size)
+
+        return JSONResponse(
+            content=jsonable_encoder(job),
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"Location": f"/transactions/uploads/{job.job_id}"},
+        )
+
+    except IngestJobNotFound as error:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error.as_dict,
+        )
+
+    except ResourceConflict as error:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=error.as_dict,
+        )
+
+
+@router.get("/transactions/error-reports/{report_id}")
+async def download_error_report(
+    report_id: UUID,
+    service: TransactionService = Depends(get_transaction_service),
+):
+    try:
+        return FileResponse(
+            path=service.get_error_report_path(report_id=report_id),
+            media_type="text/csv",
+            filename=f"errors-{report_id}.csv",
+        )
+
+    except IngestErrorReportNotFound as error:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error.as_dict,
+        )
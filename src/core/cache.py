@@ -0,0 +1,248 @@
+"""Caching of computed results with single flight misses.
+
+``ComputeCache`` computes a missing key once however many callers miss it
+concurrently, the others wait for that result. Entries are kept by a
+``CacheBackend``: ``LRUCacheBackend`` keeps them in process, a backend
+sharing them between processes subclasses ``CacheBackend``.
+"""
+
+__all__ = ("CacheBackend", "LRUCacheBackend", "ComputeCache", "MISSING")
+
+import asyncio
+import functools
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, TypeVar
+
+T = TypeVar("T")
+
+MISSING = object()  # Returned by CacheBackend.get for absent and expired keys
+
+
+class CacheBackend(ABC):
+    """Storage of cached entries, every method must be safe to call from any thread"""
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Any: ...
+
+    @abstractmethod
+    def peek(self, key: Hashable) -> Any:
+        """Like ``get``, without counting the lookup or refreshing the entry"""
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any) -> None: ...
+
+    @abstractmethod
+    def delete(self, keys: Iterable[Hashable]) -> None: ...
+
+    def snapshot(self) -> Dict:
+        return {}
+
+
+class LRUCacheBackend(CacheBackend):
+    """In process entries, least recently used are evicted above ``max_size``"""
+
+    def __init__(self, max_size: int, ttl: float):
+        """
+        :param ttl: seconds an entry is served, 0 disables the cache
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()  # key: (expires_at, value)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+            self.invalidations = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return MISSING
+
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return entry[1]
+
+    def peek(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] <= time.monotonic():
+                return MISSING
+
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, keys: Iterable[Hashable]) -> None:
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drops every entry, counted as invalidations"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+class ComputeCache:
+    """Cache of computed values, concurrent misses of a key compute it once.
+
+    A value computed while any key was invalidated is returned but not
+    stored, it may predate the change that caused the invalidation.
+    Exceptions are raised to every waiting caller and not cached. An async
+    computation runs in its own task, so cancelling the caller that started
+    it does not cancel it for the callers waiting on it.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._key_locks: Dict[Hashable, list] = {}  # key: [lock, users]
+        self._pending: Dict[Hashable, asyncio.Task] = {}
+        self.computations = 0
+        self.coalesced = 0
+
+    def peek(self, key: Hashable) -> Any:
+        """Cached value or ``MISSING``, never computes nor counts as a lookup"""
+        return self.backend.peek(key)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T]) -> T:
+        value = self.backend.get(key)
+
+        if value is not MISSING:
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+
+        try:
+            with key_lock[0]:
+                value = self.backend.get(key)  # Computed while waiting for the lock
+
+                if value is not MISSING:
+                    self._count_coalesced()
+                    return value
+
+                return self._compute(key, compute)
+        finally:
+            with self._lock:
+                key_lock[1] -= 1
+
+                if not key_lock[1]:
+                    del self._key_locks[key]
+
+    async def get_or_compute_async(
+        self, key: Hashable, compute: Callable[[], Awaitable[T]]
+    ) -> T:
+        value = self.backend.get(key)
+
+        if value is not MISSING:
+            return value
+
+        if pending := self._pending.get(key):
+            self._count_coalesced()
+            return await asyncio.shield(pending)
+
+        # Owned by the cache, a cancelled caller leaves it running for the others
+        pending = self._pending[key] = asyncio.ensure_future(
+            self._compute_async(key, compute)
+        )
+        pending.add_done_callback(functools.partial(self._computed_async, key))
+
+        return await asyncio.shield(pending)
+
+    def invalidate(self, keys: Iterable[Hashable]) -> None:
+        with self._lock:
+            self._generation += 1
+            self.backend.delete(keys)
+
+    def snapshot(self) -> Dict:
+        return {
+            **self.backend.snapshot(),
+            "computations": self.computations,
+            "coalesced": self.coalesced,
+        }
+
+    def _compute(self, key: Hashable, compute: Callable[[], T]) -> T:
+        generation = self._generation
+        value = compute()
+        self._store(key, value, generation)
+
+        return value
+
+    async def _compute_async(
+        self, key: Hashable, compute: Callable[[], Awaitable[T]]
+    ) -> T:
+        generation = self._generation
+        value = await compute()
+        self._store(key, value, generation)
+
+        return value
+
+    def _computed_async(self, key: Hashable, pending: asyncio.Task) -> None:
+        if self._pending.get(key) is pending:
+            del self._pending[key]
+
+        if not pending.cancelled():
+            pending.exception()  # Retrieved, there may be no waiters left
+
+    def _store(self, key: Hashable, value: Any, generation: int) -> None:
+        with self._lock:
+            self.computations += 1
+
+            if generation == self._generation:
+                self.backend.set(key, value)
+
+    def _count_coalesced(self) -> None:
+        with self._lock:
+            self.coalesced += 1
@@ -1,21 +1,63 @@
-__all__ = ("engine", "Base", "get_session")
+__all__ = (
+    "engine",
+    "async_engine",
+    "Base",
+    "get_session",
+    "get_async_session",
+    "get_async_session_factory",
+)
 
+import psycopg2
 from sqlalchemy import create_engine
-from sqlalchemy.exc import IntegrityError, OperationalError, InternalError, ProgrammingError
+from sqlalchemy.exc import DBAPIError, IntegrityError, TimeoutError as PoolTimeoutError
 
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from .errors import RepositoryUniqueConstraintError, RepositoryOperationalError
+from .telemetry import instrumented
 from ..settings import settings
 
+_DSN = (
+    f"{settings.db_username}:{settings.db_password}"
+    f"@{settings.db_hostname}:{settings.db_port}/{settings.db_name}"
+)
+
+_POOL_OPTIONS = dict(
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_pool_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    # libpq startup options, both drivers accept them. Timestamps without an
+    # offset are stored as UTC.
+    connect_args={
+        "options": f"-c statement_timeout={settings.db_statement_timeout} "
+        "-c timezone=UTC"
+    },
+)
+
 engine = create_engine(
-    f"postgresql://{settings.db_username}:{settings.db_password}"
-    f"@{settings.db_hostname}:{settings.db_port}/{settings.db_name}",
+    f"postgresql://{_DSN}",
     echo=False,
+    poolclass=instrumented(QueuePool, name="sync"),
+    **_POOL_OPTIONS,
 )
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+# psycopg (v3) async driver, request handlers query without blocking the event loop
+async_engine = create_async_engine(
+    f"postgresql+psycopg://{_DSN}",
+    echo=False,
+    poolclass=instrumented(AsyncAdaptedQueuePool, name="async"),
+    **_POOL_OPTIONS,
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -27,18 +69,25 @@ def get_session():
         session.close()
 
 
+async def get_async_session():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    """Streamed responses open their own session, dependency ones close first"""
+    return AsyncSessionLocal
+
+
 def catch_errors(func):
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
-        except IntegrityError:
+        # Raw DBAPI errors come from driver level calls, e.g. COPY
+        except (IntegrityError, psycopg2.IntegrityError):
             raise RepositoryUniqueConstraintError(message="Unique constraint has been violated")
-        except (
-                OperationalError,
-                InternalError,
-                ProgrammingError,
-                ValueError,
-        ) as error:
+        # Database and pool failures only, e.g. a ValueError is a bug of the caller
+        except (DBAPIError, PoolTimeoutError, psycopg2.Error) as error:
             raise RepositoryOperationalError(message=str(error)) from error
 
     return wrapper
@@ -8,6 +8,7 @@ class ErrorCode(str, Enum):
     DATABASE_ERROR = "DATABASE_ERROR"
     VALIDATION_ERROR = "VALIDATION_ERROR"
     RESOURCE_NOT_FOUND = "RESOURCE_NOT_FOUND"
+    RESOURCE_CONFLICT = "RESOURCE_CONFLICT"
 
 
 class Error(Exception):
@@ -35,6 +36,10 @@ class ValidationError(Error):
     pass
 
 
+class ResourceConflict(Error):
+    pass
+
+
 class RepositoryError(Error):
     pass
 
@@ -0,0 +1,43 @@
+"""Strong entity tags of responses and ``If-None-Match`` evaluation.
+
+A tag is derived from the data version of an entity, not from the response
+body, so a conditional request is answered without building the body.
+``REPRESENTATION_VERSION`` is part of every tag and must be bumped whenever
+the serialized form of a response changes.
+"""
+
+__all__ = ("REPRESENTATION_VERSION", "version", "etag", "matches")
+
+import hashlib
+from typing import Any, Optional
+
+REPRESENTATION_VERSION = 2
+
+
+def version(*parts: Any) -> str:
+    """Digest of the values a representation is built from"""
+    digest = hashlib.blake2b(digest_size=16)
+
+    for part in (REPRESENTATION_VERSION, *parts):
+        digest.update(str(part).encode())
+        digest.update(b"\x1f")
+
+    return digest.hexdigest()
+
+
+def etag(version_: str) -> str:
+    return f'"{version_}"'
+
+
+def matches(if_none_match: Optional[str], etag_: str) -> bool:
+    """Weak comparison of RFC 9110, as required for If-None-Match"""
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    return any(
+        candidate.strip().removeprefix("W/") == etag_
+        for candidate in if_none_match.split(",")
+    )
@@ -1,14 +1,28 @@
 __all__ = ("logger",)
 
-import json
+import atexit
 import logging
-from datetime import datetime
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, TextIO, Tuple
+
+import orjson
+
+from ..settings import settings
 
 
 class CustomFormatter(logging.Formatter):
     def format(self, record):
         log_record = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc)
+            .replace(tzinfo=None)
+            .isoformat(),
             "level": record.levelname,
             "message": record.getMessage(),
             "location": f"{record.module}:{record.lineno}",
@@ -17,13 +31,164 @@ class CustomFormatter(logging.Formatter):
         if hasattr(record, "extra") and isinstance(record.extra, dict):
             log_record.update(record.extra)
 
-        return json.dumps(log_record)
+        if getattr(record, "dropped", 0):
+            log_record["dropped"] = record.dropped
+
+        if record.exc_text:
+            log_record["exception"] = record.exc_text
+
+        return orjson.dumps(log_record, default=str).decode()
+
+
+class _ThrottleFilter(logging.Filter):
+    """Per logger sampling and rate limiting, applied before a record is queued.
+
+    ``sample_rates`` maps logger names to the share of records kept. The rate
+    limit is a token bucket per logger and level, records dropped by it are
+    counted in the next record let through.
+    """
+
+    def __init__(self, rate: float, burst: int, sample_rates: Dict[str, float]):
+        super().__init__()
+        self._rate = rate
+        self._burst = burst
+        self._sample_rates = sample_rates
+        self._buckets: Dict[Tuple[str, int], List[float]] = {}
+        self._dropped: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        sample_rate = self._sample_rates.get(record.name)
+
+        if sample_rate is not None and random.random() >= sample_rate:
+            return False
+
+        if not self._rate:
+            return True
+
+        key = (record.name, record.levelno)
+        now = time.monotonic()
+
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self._burst, now))
+            tokens = min(self._burst, tokens + (now - updated) * self._rate)
+
+            if tokens < 1:
+                self._buckets[key] = [tokens, now]
+                self._dropped[key] = self._dropped.get(key, 0) + 1
+                return False
+
+            self._buckets[key] = [tokens - 1, now]
+            record.dropped = self._dropped.pop(key, 0)
+
+        return True
+
+
+class _RecordQueueHandler(QueueHandler):
+    """Queues records with as little work as possible on the calling thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Arguments are merged now as they may change before the record is written
+        record.msg = record.getMessage()
+        record.args = None
+
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+
+class _BatchingQueueListener(QueueListener):
+    """Writes everything queued since the previous write in a single call"""
+
+    def __init__(
+        self,
+        queue_: queue.SimpleQueue,
+        stream: TextIO,
+        formatter: logging.Formatter,
+        batch_size: int,
+    ):
+        super().__init__(queue_)
+        self._stream = stream
+        self._formatter = formatter
+        self._batch_size = batch_size
+        self._stopping = False
+
+    def dequeue(self, block: bool):
+        if self._stopping:
+            self._stopping = False
+            return self._sentinel
+
+        first = self.queue.get(block)
+
+        if first is self._sentinel:
+            return first
+
+        batch = [first]
+
+        while len(batch) < self._batch_size:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is self._sentinel:
+                self._stopping = True  # Stop once this batch is written
+                break
+
+            batch.append(item)
+
+        return batch
+
+    def handle(self, batch: List[logging.LogRecord]) -> None:
+        lines = "".join(self._formatter.format(record) + "\n" for record in batch)
+
+        try:
+            self._stream.write(lines)
+            self._stream.flush()
+        except Exception:
+            pass  # Logging must never take the writer thread down
+
+
+def _start_listener() -> _BatchingQueueListener:
+    listener = _BatchingQueueListener(
+        log_queue,
+        stream=sys.stderr,
+        formatter=CustomFormatter(),
+        batch_size=settings.log_batch_size,
+    )
+    listener.start()
+
+    return listener
 
 
 logger = logging.getLogger("eventLogger")
 logger.setLevel(logging.INFO)
 
-handler = logging.StreamHandler()
-handler.setFormatter(CustomFormatter())
+log_queue = queue.SimpleQueue()
+
+handler = _RecordQueueHandler(log_queue)
+handler.addFilter(
+    _ThrottleFilter(
+        rate=settings.log_rate_limit,
+        burst=settings.log_rate_burst,
+        sample_rates=settings.log_sample_rates,
+    )
+)
 
 logger.addHandler(handler)
+
+listener = _start_listener()
+atexit.register(lambda: listener.stop())
+
+
+def _restart_listener_in_child() -> None:
+    """Forked processes, e.g. validation workers, do not inherit the writer thread"""
+    global log_queue, listener
+
+    log_queue = handler.queue = queue.SimpleQueue()
+    listener = _start_listener()
+
+
+os.register_at_fork(after_in_child=_restart_listener_in_child)
@@ -0,0 +1,21 @@
+__all__ = ("ModelResponse",)
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class ModelResponse(JSONResponse):
+    """JSON response serializing pydantic models straight to bytes.
+
+    Skips jsonable_encoder and the intermediate dicts. The body holds the
+    same JSON values as ``JSONResponse(jsonable_encoder(model))``, but
+    floats are formatted by pydantic, e.g. ``1e20`` rather than ``1e+20``.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+
+        return super().render(content)
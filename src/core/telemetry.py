@@ -0,0 +1,117 @@
+__all__ = ("PoolTelemetry", "instrumented", "pool_telemetry")
+
+import bisect
+import threading
+import time
+from typing import Dict, List, Type
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool
+
+
+class PoolTelemetry:
+    """Checkout statistics of a single connection pool, safe to share between threads"""
+
+    WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._pool = None
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.checkout_timeouts = 0
+            self.connects = 0
+            self.invalidations = 0
+            self._wait_counts = [0] * (len(self.WAIT_BUCKETS_MS) + 1)
+            self._wait_total_ms = 0.0
+
+    def bind(self, pool: Pool) -> None:
+        self._pool = pool
+
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        milliseconds = seconds * 1000
+
+        with self._lock:
+            if timed_out:
+                self.checkout_timeouts += 1
+            else:
+                self.checkouts += 1
+
+            self._wait_counts[
+                bisect.bisect_left(self.WAIT_BUCKETS_MS, milliseconds)
+            ] += 1
+            self._wait_total_ms += milliseconds
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            waits = sum(self._wait_counts)
+            histogram: List[Dict] = [
+                {"le_ms": bound, "count": count}
+                for bound, count in zip(
+                    (*self.WAIT_BUCKETS_MS, "inf"), self._wait_counts
+                )
+            ]
+
+            return {
+                "size": self._pool.size() if self._pool else None,
+                "checked_out": self._pool.checkedout() if self._pool else None,
+                "overflow": self._pool.overflow() if self._pool else None,
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "wait_ms_mean": (
+                    round(self._wait_total_ms / waits, 3) if waits else None
+                ),
+                "wait_ms_histogram": histogram,
+            }
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+
+pool_telemetry: Dict[str, PoolTelemetry] = {}
+
+
+def instrumented(pool_class: Type[Pool], name: str) -> Type[Pool]:
+    """Pool class that reports how long each checkout waited to ``pool_telemetry[name]``.
+
+    Checkout start has no pool event, hence the subclass; the pool passes its
+    own class on when it is recreated, e.g. by ``engine.dispose()``.
+    """
+    telemetry = pool_telemetry.setdefault(name, PoolTelemetry(name=name))
+
+    class InstrumentedPool(pool_class):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            telemetry.bind(self)
+
+        def connect(self):
+            started = time.perf_counter()
+
+            try:
+                connection = super().connect()
+            except PoolTimeoutError:
+                telemetry.record_wait(time.perf_counter() - started, timed_out=True)
+                raise
+
+            telemetry.record_wait(time.perf_counter() - started)
+
+            return connection
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+
+    return InstrumentedPool
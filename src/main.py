@@ -4,9 +4,12 @@ from fastapi.exceptions import RequestValidationError
 from fastapi import status
 from fastapi.responses import JSONResponse
 
+from .controllers.internal import router as internal_router
 from .controllers.report import router as report_router
 from .controllers.transaction import router as transaction_router
 from .core.database import Base, engine
+from .transaction.ingest_errors import remove_expired_reports
+from .transaction.jobs import ingest_job_runner
 
 
 def init_db_context():
@@ -19,10 +22,18 @@ app = FastAPI()
 @app.on_event("startup")
 def on_startup():
     init_db_context()
+    remove_expired_reports()
+    ingest_job_runner.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    ingest_job_runner.shutdown()
 
 
 app.include_router(transaction_router, tags=["Transactions"])
 app.include_router(report_router, tags=["Reports"])
+app.include_router(internal_router, tags=["Internal"])
 
 
 @app.exception_handler(RequestValidationError)
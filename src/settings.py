@@ -1,5 +1,10 @@
 __all__ = ("settings", "Settings")
 
+import os
+import tempfile
+
+from typing import Dict
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -13,6 +18,109 @@ class Settings(BaseSettings):
     db_port: str = Field(alias="DB_PORT")
     db_username: str = Field(alias="DB_USERNAME")
     db_password: str = Field(alias="DB_PASSWORD")
+    db_pool_size: int = Field(default=5, alias="DB_POOL_SIZE")
+    db_pool_max_overflow: int = Field(default=10, alias="DB_POOL_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(default=30.0, alias="DB_POOL_TIMEOUT")  # seconds
+    db_pool_recycle: int = Field(default=1800, alias="DB_POOL_RECYCLE")  # seconds
+    db_pool_pre_ping: bool = Field(default=True, alias="DB_POOL_PRE_PING")
+    db_statement_timeout: int = Field(
+        default=30000, alias="DB_STATEMENT_TIMEOUT"
+    )  # milliseconds, 0 disables
+    maintenance_statement_timeout: int = Field(
+        default=0, alias="MAINTENANCE_STATEMENT_TIMEOUT"
+    )  # milliseconds, 0 disables; replaces DB_STATEMENT_TIMEOUT for migrations
+
+    # Listing
+
+    listing_count_cache_ttl: float = Field(
+        default=10, alias="LISTING_COUNT_CACHE_TTL"
+    )  # seconds an exact total_count is reused, 0 disables
+    listing_count_cache_size: int = Field(
+        default=1000, alias="LISTING_COUNT_CACHE_SIZE"
+    )  # filters whose exact total_count is kept
+    listing_estimate_threshold: int = Field(
+        default=100000, alias="LISTING_ESTIMATE_THRESHOLD"
+    )  # unfiltered listings of larger tables report the planner estimate
+
+    transaction_cache_max_age: int = Field(
+        default=31536000, alias="TRANSACTION_CACHE_MAX_AGE"
+    )  # seconds, Cache-Control of transaction details, immutable once ingested
+
+    batch_get_max_ids: int = Field(
+        default=10000, alias="BATCH_GET_MAX_IDS"
+    )  # transaction ids per batch-get request
+    export_chunk_size: int = Field(
+        default=10000, alias="EXPORT_CHUNK_SIZE"
+    )  # rows fetched from the server-side cursor of an export at a time
+
+    # Reports
+
+    summary_sketch_precision: int = Field(
+        default=12, ge=4, le=15, alias="SUMMARY_SKETCH_PRECISION"
+    )  # 2**precision registers per HyperLogLog sketch (smallint register ids),
+    # changing it needs a rebuild
+    report_cache_size: int = Field(default=10000, alias="REPORT_CACHE_SIZE")
+    report_cache_ttl: float = Field(
+        default=30, alias="REPORT_CACHE_TTL"
+    )  # seconds, 0 disables; ingest in other processes is seen once entries expire
+    report_batch_max_ids: int = Field(
+        default=10000, alias="REPORT_BATCH_MAX_IDS"
+    )  # customer or product ids per bulk summary request
+
+    # Ingest
+
+    ingest_batch_size: int = Field(default=5000, alias="INGEST_BATCH_SIZE")
+    ingest_read_chunk_size: int = Field(
+        default=1024 * 1024, alias="INGEST_READ_CHUNK_SIZE"
+    )
+    ingest_validator: str = Field(
+        default="columnar", alias="INGEST_VALIDATOR"
+    )  # one of: model, columnar
+    validation_workers: int = Field(default=1, alias="VALIDATION_WORKERS")
+    validation_chunk_size: int = Field(
+        default=8 * 1024 * 1024, alias="VALIDATION_CHUNK_SIZE"
+    )
+    bulk_write_batch_size: int = Field(default=10000, alias="BULK_WRITE_BATCH_SIZE")
+    ingest_workers: int = Field(default=2, alias="INGEST_WORKERS")
+    ingest_job_heartbeat_interval: float = Field(
+        default=10, alias="INGEST_JOB_HEARTBEAT_INTERVAL"
+    )  # seconds between heartbeats of the jobs a worker runs
+    ingest_job_stale_after: float = Field(
+        default=60, alias="INGEST_JOB_STALE_AFTER"
+    )  # seconds without a heartbeat before a running job is resumed elsewhere
+    ingest_spool_directory: str = Field(
+        default=os.path.join(tempfile.gettempdir(), "ingest"),
+        alias="INGEST_SPOOL_DIRECTORY",
+    )  # must outlive the process for jobs to resume after a restart
+    upload_max_chunk_size: int = Field(
+        default=64 * 1024 * 1024, alias="UPLOAD_MAX_CHUNK_SIZE"
+    )
+    upload_session_timeout: int = Field(
+        default=3600, alias="UPLOAD_SESSION_TIMEOUT"
+    )  # seconds without a chunk before an uncommitted session fails
+    upload_session_idle_timeout: float = Field(
+        default=5, alias="UPLOAD_SESSION_IDLE_TIMEOUT"
+    )  # seconds a worker waits for the next chunk before the session is requeued
+    ingest_error_examples: int = Field(default=10, alias="INGEST_ERROR_EXAMPLES")
+    ingest_error_log_sample: int = Field(default=5, alias="INGEST_ERROR_LOG_SAMPLE")
+    ingest_report_directory: str = Field(
+        default=os.path.join(tempfile.gettempdir(), "ingest-reports"),
+        alias="INGEST_REPORT_DIRECTORY",
+    )
+    ingest_report_retention: int = Field(
+        default=7 * 24 * 3600, alias="INGEST_REPORT_RETENTION"
+    )  # seconds an error report is kept, 0 keeps reports forever
+
+    # Logging
+
+    log_batch_size: int = Field(default=512, alias="LOG_BATCH_SIZE")
+    log_rate_limit: float = Field(
+        default=1000, alias="LOG_RATE_LIMIT"
+    )  # records per second per logger and level, 0 disables
+    log_rate_burst: int = Field(default=2000, alias="LOG_RATE_BURST")
+    log_sample_rates: Dict[str, float] = Field(
+        default_factory=dict, alias="LOG_SAMPLE_RATES"
+    )  # JSON, e.g. {"eventLogger": 0.1}
 
 
 settings = Settings()
@@ -0,0 +1,142 @@
+__all__ = ("UploadMember", "open_upload")
+
+import gzip
+import io
+import shutil
+import tempfile
+import zipfile
+import zlib
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+
+from .errors import InvalidFileStructure, UnsupportedTransactionFormat
+from .formats import FORMAT_HEAD_SIZE, detect_format
+from .models.dto import UploadFormat
+
+try:
+    import zstandard
+except ImportError:  # Optional, zstd uploads are rejected without it
+    zstandard = None
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_ZIP_MAGIC = b"PK\x03\x04"
+_ZIP_EXTENSIONS = (".csv", ".ndjson", ".jsonl", ".parquet", ".arrow", ".arrows")
+# Formats read from a footer, their archive members are spooled to be seekable
+_SEEKABLE_FORMATS = (UploadFormat.PARQUET, UploadFormat.ARROW)
+
+_CORRUPT_ERRORS = (EOFError, gzip.BadGzipFile, zipfile.BadZipFile, zlib.error)
+
+if zstandard is not None:
+    _CORRUPT_ERRORS += (zstandard.ZstdError,)
+
+
+class UploadMember(NamedTuple):
+    name: Optional[str]  # Archive member name, None for a single file
+    stream: BinaryIO  # Decompressed as it is read
+    format: UploadFormat
+
+
+class _Decompressed(io.RawIOBase):
+    """Reports a corrupt or truncated compressed stream as an invalid file.
+
+    The leading bytes are read ahead to detect the format of the content.
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self.head = self._pending = self._read(FORMAT_HEAD_SIZE)
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._pending:
+            return self._read(size)
+
+        if size < 0:
+            data, self._pending = self._pending + self._read(size), b""
+        else:
+            data, self._pending = self._pending[:size], self._pending[size:]
+
+        return data
+
+    def _read(self, size: int) -> bytes:
+        try:
+            return self._stream.read(size)
+        except _CORRUPT_ERRORS as error:
+            raise InvalidFileStructure(f"Corrupt compressed upload: {error}")
+
+
+def open_upload(stream: BinaryIO) -> Iterator[UploadMember]:
+    """Yields the files of an upload, decompressing them as they are read.
+
+    Compression is detected from the leading bytes: gzip and zstd hold a
+    single file, every supported member of a zip archive is yielded in archive
+    order, anything else is passed through as is. The format of each file is
+    detected the same way. The stream must be seekable.
+
+    Parquet and Arrow IPC file members of an archive are extracted to a
+    temporary file first, as their footer is read before the data.
+    """
+    try:
+        yield from _open_members(stream=stream)
+    except _CORRUPT_ERRORS as error:
+        raise InvalidFileStructure(f"Corrupt compressed upload: {error}")
+
+
+def _open_members(stream: BinaryIO) -> Iterator[UploadMember]:
+    magic = stream.read(FORMAT_HEAD_SIZE)
+    stream.seek(0)
+
+    if magic.startswith(_GZIP_MAGIC):
+        with gzip.GzipFile(fileobj=stream, mode="rb") as member:
+            yield _member(name=None, stream=_Decompressed(member))
+
+    elif magic.startswith(_ZSTD_MAGIC):
+        if zstandard is None:
+            raise UnsupportedTransactionFormat(
+                "zstd uploads require the zstandard package"
+            )
+
+        decompressor = zstandard.ZstdDecompressor()
+
+        with decompressor.stream_reader(
+            stream, read_across_frames=True, closefd=False
+        ) as member:
+            yield _member(name=None, stream=_Decompressed(member))
+
+    elif magic.startswith(_ZIP_MAGIC):
+        with zipfile.ZipFile(stream) as archive:
+            names = [
+                info.filename
+                for info in archive.infolist()
+                if not info.is_dir()
+                and info.filename.lower().endswith(_ZIP_EXTENSIONS)
+                and not info.filename.startswith("__MACOSX/")
+            ]
+
+            if not names:
+                raise UnsupportedTransactionFormat(
+                    "Archive contains no supported files"
+                )
+
+            for name in names:
+                with archive.open(name) as member:
+                    upload_member = _member(name=name, stream=_Decompressed(member))
+
+                    if upload_member.format not in _SEEKABLE_FORMATS:
+                        yield upload_member
+                        continue
+
+                    with tempfile.TemporaryFile() as spool:
+                        shutil.copyfileobj(upload_member.stream, spool)
+                        spool.seek(0)
+
+                        yield upload_member._replace(stream=spool)
+
+    else:
+        yield UploadMember(name=None, stream=stream, format=detect_format(magic))
+
+
+def _member(name: Optional[str], stream: _Decompressed) -> UploadMember:
+    return UploadMember(name=name, stream=stream, format=detect_format(stream.head))
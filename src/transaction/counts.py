@@ -0,0 +1,43 @@
+"""Exact listing counts cached per filter for a short time.
+
+Counting every matching row costs more than reading a page, so an exact
+count is reused for ``settings.listing_count_cache_ttl`` seconds. Ingest
+clears the cache of its process when it commits, other processes see new
+rows once the entry expires. At most ``settings.listing_count_cache_size``
+filters are kept, the least recently used are evicted.
+"""
+
+__all__ = ("CountCache", "count_cache")
+
+from typing import Optional, Tuple
+
+from src.core.cache import MISSING, LRUCacheBackend
+from src.settings import settings
+
+_Key = Tuple[Optional[str], Optional[str]]  # customer_id, product_id
+
+
+class CountCache:
+    def __init__(self, ttl: float, max_size: int = settings.listing_count_cache_size):
+        self.backend = LRUCacheBackend(max_size=max_size, ttl=ttl)
+
+    def get(self, customer_id=None, product_id=None) -> Optional[int]:
+        count = self.backend.get(self._key(customer_id, product_id))
+
+        return None if count is MISSING else count
+
+    def set(self, count: int, customer_id=None, product_id=None) -> None:
+        self.backend.set(self._key(customer_id, product_id), count)
+
+    def invalidate(self) -> None:
+        self.backend.clear()
+
+    @staticmethod
+    def _key(customer_id, product_id) -> _Key:
+        return (
+            str(customer_id) if customer_id else None,
+            str(product_id) if product_id else None,
+        )
+
+
+count_cache = CountCache(ttl=settings.listing_count_cache_ttl)
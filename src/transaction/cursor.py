@@ -0,0 +1,31 @@
+"""Opaque keyset pagination cursors"""
+
+__all__ = ("encode_cursor", "decode_cursor")
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+from uuid import UUID
+
+import orjson
+
+from .errors import InvalidCursor
+
+
+def encode_cursor(timestamp: datetime, transaction_id: UUID) -> str:
+    """Encodes the sort key of the last returned transaction"""
+    payload = orjson.dumps([timestamp.isoformat(), str(transaction_id)])
+
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, transaction_id = orjson.loads(payload)
+
+        return datetime.fromisoformat(timestamp), UUID(transaction_id)
+
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError):
+        raise InvalidCursor
@@ -1,5 +1,6 @@
 from src.core.errors import (
     ErrorCode,
+    ResourceConflict,
     ResourceNotFound,
     ValidationError,
 )
@@ -20,6 +21,11 @@ class InvalidFileStructure(ValidationError):
     DEFAULT_MESSAGE = "Invalid file structure"
 
 
+class InvalidCursor(ValidationError):
+    INTERNAL_CODE = ErrorCode.VALIDATION_ERROR
+    DEFAULT_MESSAGE = "Invalid pagination cursor"
+
+
 class CustomerSummaryNotFound(ResourceNotFound):
     INTERNAL_CODE = ErrorCode.RESOURCE_NOT_FOUND
     DEFAULT_MESSAGE = "Customer summary does not exists"
@@ -28,3 +34,33 @@ class CustomerSummaryNotFound(ResourceNotFound):
 class ProductSummaryNotFound(ResourceNotFound):
     INTERNAL_CODE = ErrorCode.RESOURCE_NOT_FOUND
     DEFAULT_MESSAGE = "Product summary does not exists"
+
+
+class IngestJobNotFound(ResourceNotFound):
+    INTERNAL_CODE = ErrorCode.RESOURCE_NOT_FOUND
+    DEFAULT_MESSAGE = "Upload job does not exists"
+
+
+class IngestErrorReportNotFound(ResourceNotFound):
+    INTERNAL_CODE = ErrorCode.RESOURCE_NOT_FOUND
+    DEFAULT_MESSAGE = "Error report does not exists"
+
+
+class UploadOffsetMismatch(ResourceConflict):
+    INTERNAL_CODE = ErrorCode.RESOURCE_CONFLICT
+    DEFAULT_MESSAGE = "Chunk offset does not match received bytes"
+
+
+class UploadSessionClosed(ResourceConflict):
+    INTERNAL_CODE = ErrorCode.RESOURCE_CONFLICT
+    DEFAULT_MESSAGE = "Upload session is already committed"
+
+
+class UploadChunkTooLarge(ValidationError):
+    INTERNAL_CODE = ErrorCode.VALIDATION_ERROR
+    DEFAULT_MESSAGE = "Upload chunk exceeds the maximum chunk size"
+
+
+class UploadSessionExpired(ValidationError):
+    INTERNAL_CODE = ErrorCode.VALIDATION_ERROR
+    DEFAULT_MESSAGE = "Upload session was not committed in time"
@@ -0,0 +1,76 @@
+__all__ = ("detect_format", "iter_record_batches")
+
+from typing import BinaryIO, Iterator
+
+from .errors import InvalidFileStructure, UnsupportedTransactionFormat
+from .models.dto import UploadFormat
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Optional, Parquet and Arrow uploads are rejected without it
+    pyarrow = None
+
+_PARQUET_MAGIC = b"PAR1"
+_ARROW_FILE_MAGIC = b"ARROW1"
+_ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"  # Continuation marker of the first message
+
+FORMAT_HEAD_SIZE = 8  # Leading bytes needed by detect_format
+
+
+def detect_format(head: bytes) -> UploadFormat:
+    if head.startswith(_PARQUET_MAGIC):
+        return UploadFormat.PARQUET
+
+    if head.startswith(_ARROW_FILE_MAGIC):
+        return UploadFormat.ARROW
+
+    if head.startswith(_ARROW_STREAM_MAGIC):
+        return UploadFormat.ARROW_STREAM
+
+    if head.lstrip().startswith(b"{"):
+        return UploadFormat.NDJSON
+
+    return UploadFormat.CSV
+
+
+def iter_record_batches(
+    stream: BinaryIO, format: UploadFormat, batch_rows: int
+) -> Iterator["pyarrow.RecordBatch"]:
+    """Reads a Parquet or Arrow IPC upload as record batches of up to ``batch_rows``.
+
+    Parquet and the Arrow file format keep their metadata in a footer, so
+    the stream must be seekable. Only the batch being read is held in memory.
+    """
+    if pyarrow is None:
+        raise UnsupportedTransactionFormat(
+            f"{format.value} uploads require the pyarrow package"
+        )
+
+    if format in (UploadFormat.PARQUET, UploadFormat.ARROW) and not stream.seekable():
+        raise UnsupportedTransactionFormat(
+            f"{format.value} uploads must not be compressed, the format compresses its data"
+        )
+
+    try:
+        if format is UploadFormat.PARQUET:
+            yield from pyarrow.parquet.ParquetFile(stream).iter_batches(
+                batch_size=batch_rows
+            )
+            return
+
+        if format is UploadFormat.ARROW:
+            reader = pyarrow.ipc.open_file(stream)
+            batches = (
+                reader.get_batch(idx) for idx in range(reader.num_record_batches)
+            )
+        else:
+            batches = pyarrow.ipc.open_stream(stream)
+
+        for batch in batches:
+            for offset in range(0, batch.num_rows, batch_rows):
+                yield batch.slice(offset, batch_rows)
+
+    except pyarrow.ArrowInvalid as error:
+        raise InvalidFileStructure(f"Invalid {format.value} file: {error}")
@@ -0,0 +1,125 @@
+__all__ = ("RowError", "ErrorCollector", "remove_expired_reports")
+
+import contextlib
+import csv
+import os
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, TextIO, Tuple
+
+from src.core.logging import logger
+from src.settings import settings
+
+from .models.dto import IngestErrorGroup
+
+
+class RowError(NamedTuple):
+    row: int
+    column: Optional[str]  # None when the row as a whole is invalid
+    reason: str  # Stable error type, e.g. "uuid_parsing" or "duplicate"
+    message: str
+
+
+class ErrorCollector:
+    """Groups ingest errors by column and reason.
+
+    Only the first ``examples`` row numbers of a group are kept, and only the
+    first ``log_sample`` errors of a group are logged. Every error is written
+    to ``report_path`` as CSV when given, the file is created on the first error.
+    """
+
+    _REPORT_HEADERS = ("row", "column", "reason", "message")
+
+    def __init__(
+        self,
+        report_path: Optional[str] = None,
+        examples: int = settings.ingest_error_examples,
+        log_sample: int = settings.ingest_error_log_sample,
+    ):
+        self.report_path = report_path
+        self._examples = examples
+        self._log_sample = log_sample
+        self._groups: Dict[Tuple[Optional[str], str], IngestErrorGroup] = {}
+        self._report: Optional[TextIO] = None
+        self._writer = None
+
+    @property
+    def has_errors(self) -> bool:
+        return bool(self._groups)
+
+    def add(self, error: RowError) -> None:
+        group = self._groups.get((error.column, error.reason))
+
+        if group is None:
+            group = self._groups[(error.column, error.reason)] = IngestErrorGroup(
+                column=error.column, reason=error.reason, message=error.message
+            )
+
+        group.count += 1
+
+        if len(group.rows) < self._examples:
+            group.rows.append(error.row)
+
+        if group.count <= self._log_sample:
+            logger.error(
+                f"Invalid row content: {error.row}. Reason: {error.message}",
+                extra={"extra": {"column": error.column, "reason": error.reason}},
+            )
+
+        if self.report_path:
+            if self._report is None:
+                self._report = open(self.report_path, "w", newline="")
+                self._writer = csv.writer(self._report)
+                self._writer.writerow(self._REPORT_HEADERS)
+
+            self._writer.writerow(error)
+
+    def extend(self, errors: Iterable[RowError]) -> None:
+        for error in errors:
+            self.add(error)
+
+    def summary(self) -> List[IngestErrorGroup]:
+        return sorted(self._groups.values(), key=lambda group: -group.count)
+
+    def close(self) -> None:
+        """Closes the report and logs how many errors were not logged"""
+        if self._report is not None:
+            self._report.close()
+
+        suppressed = {
+            f"{group.column}:{group.reason}": group.count - self._log_sample
+            for group in self._groups.values()
+            if group.count > self._log_sample
+        }
+
+        if suppressed:
+            logger.warning(
+                f"{sum(suppressed.values())} further invalid rows were not logged",
+                extra={"extra": {"suppressed": suppressed}},
+            )
+
+
+def remove_expired_reports(
+    directory: str = settings.ingest_report_directory,
+    retention: float = settings.ingest_report_retention,
+) -> int:
+    """Removes the reports written over ``retention`` seconds ago, 0 keeps them all.
+
+    Returns how many reports were removed.
+    """
+    if not retention or not os.path.isdir(directory):
+        return 0
+
+    expired_before = time.time() - retention
+    removed = 0
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            with contextlib.suppress(FileNotFoundError):  # Removed by another process
+                if (
+                    entry.name.endswith(".csv")
+                    and entry.stat().st_mtime < expired_before
+                ):
+                    os.remove(entry.path)
+                    removed += 1
+
+    return removed
@@ -0,0 +1,540 @@
+__all__ = (
+    "IngestJobRunner",
+    "IngestJobService",
+    "ingest_job_runner",
+    "get_ingest_job_service",
+)
+
+import contextlib
+import io
+import os
+import shutil
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, Optional
+from uuid import UUID, uuid4
+
+from fastapi import Depends
+
+from src.core.database import SessionLocal
+from src.core.errors import Error
+from src.core.logging import logger
+from src.settings import settings
+
+from .errors import (
+    IngestJobNotFound,
+    UploadOffsetMismatch,
+    UploadSessionClosed,
+    UploadSessionExpired,
+)
+from .models.dto import DuplicateStrategy, IngestJob, IngestJobStatus
+from .repository import (
+    IngestJobRepository,
+    TransactionRepository,
+    get_ingest_job_repository,
+)
+from .service import get_transaction_service
+
+
+class _Interrupted(Exception):
+    """Raised between batches when the runner shuts down"""
+
+
+class _Parked(Exception):
+    """Raised by a read of an upload session left without chunks for a while"""
+
+
+class _TailStream(io.RawIOBase):
+    """Reads a spool file that is still being appended to by an upload session.
+
+    A read past the received bytes waits for the next chunk, the end of the
+    stream is reached once the session is committed and fully read. Chunks
+    received by this process wake the read up, the session state is polled
+    with a growing interval for the chunks received by other processes. A
+    session idle for ``idle_timeout`` is parked, freeing the worker.
+    """
+
+    _POLL_INTERVAL = 0.2  # seconds, doubled up to _MAX_POLL_INTERVAL
+    _MAX_POLL_INTERVAL = 2.0
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        is_complete: Callable[[], bool],
+        should_stop: Callable[[], bool],
+        wait: Callable[[float], None],
+        park: Callable[[int], bool],
+        idle_timeout: float,
+        timeout: float,
+    ):
+        """
+        :param wait: sleeps up to the given seconds, returns early on a chunk
+        :param park: requeues the session read up to the given offset, False
+            when a chunk arrived meanwhile
+        """
+        self._file = file
+        self._is_complete = is_complete
+        self._should_stop = should_stop
+        self._wait = wait
+        self._park = park
+        self._idle_timeout = idle_timeout
+        self._timeout = timeout
+
+    def readable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def read(self, size: int = -1) -> bytes:
+        waiting_since = time.monotonic()
+        interval = self._POLL_INTERVAL
+
+        while True:
+            if data := self._file.read(size):
+                return data
+
+            # Checked before the last read, so no chunk committed in between is missed
+            complete = self._is_complete()
+
+            if data := self._file.read(size):
+                return data
+
+            if complete:
+                return b""
+
+            if self._should_stop():
+                raise _Interrupted
+
+            waited = time.monotonic() - waiting_since
+
+            if waited > self._timeout:
+                raise UploadSessionExpired
+
+            if waited > self._idle_timeout and self._park(self._file.tell()):
+                raise _Parked
+
+            self._wait(interval)
+            interval = min(interval * 2, self._MAX_POLL_INTERVAL)
+
+
+def _is_upload_complete(job_id: UUID) -> bool:
+    with SessionLocal() as session:
+        return IngestJobRepository(session=session).is_upload_complete(job_id=job_id)
+
+
+def _park(job_id: UUID, owner: str, bytes_read: int) -> bool:
+    with SessionLocal() as session:
+        jobs = IngestJobRepository(session=session)
+        parked = jobs.park(job_id=job_id, owner=owner, bytes_read=bytes_read)
+        jobs.persist()
+
+    return parked
+
+
+class IngestJobRunner:
+    """Processes spooled uploads on a bounded pool of ingest workers.
+
+    A job is claimed before it runs, so it runs on one worker even when
+    several processes share the database. Every batch commits together with
+    the job progress, so a job interrupted by a shutdown or a crash stays
+    unfinished; once its heartbeat is stale it is resumed from its last
+    committed batch by ``start`` or the next heartbeat of any process.
+
+    An upload session is queued by its chunks: a worker validates the chunks
+    as they arrive and parks the session back to pending once it waits
+    ``upload_session_idle_timeout`` for the next one.
+    """
+
+    def __init__(self, workers: int = settings.ingest_workers):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._chunks = threading.Condition()
+        self._lock = threading.Lock()
+        self._queued: Dict[UUID, bool] = {}  # Job ids to run again once they end
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._workers, thread_name_prefix="ingest"
+        )
+        self._heartbeat = threading.Thread(
+            target=self._beat, name="ingest-heartbeat", daemon=True
+        )
+        self._heartbeat.start()
+
+        self._resume_unfinished()
+
+    def shutdown(self) -> None:
+        self._stopping.set()
+        self.notify()
+
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            self._queued.clear()
+
+        if self._heartbeat:
+            self._heartbeat.join()
+            self._heartbeat = None
+
+    def submit(self, job_id: UUID) -> None:
+        """Queues the job once per process, a job submitted while it runs is
+        run again when it ends, so a session parked meanwhile gets its chunk.
+        """
+        with self._lock:
+            if job_id in self._queued:
+                self._queued[job_id] = True
+                return
+
+            self._queued[job_id] = False
+
+        self._executor.submit(self._run_queued, job_id=job_id)
+
+    def _run_queued(self, job_id: UUID) -> None:
+        again = True
+
+        while again:
+            try:
+                self.run(job_id=job_id)
+            except Exception:
+                logger.exception(f"Upload job {job_id} failed")
+
+            with self._lock:
+                again = self._queued.pop(job_id)
+
+                if again:
+                    self._queued[job_id] = False
+
+    def notify(self) -> None:
+        """Wakes the workers waiting for the next chunk of an upload session"""
+        with self._chunks:
+            self._chunks.notify_all()
+
+    def _wait(self, seconds: float) -> None:
+        with self._chunks:
+            self._chunks.wait(timeout=seconds)
+
+    def run(self, job_id: UUID) -> None:
+        with SessionLocal() as session:
+            jobs = IngestJobRepository(session=session)
+            claimed = jobs.claim(
+                job_id=job_id,
+                owner=self.owner,
+                stale_after=settings.ingest_job_stale_after,
+            )
+            jobs.persist()
+
+            if not claimed:  # Finished, removed or running on another worker
+                return
+
+            job = jobs.get_active_record(job_id=job_id)
+
+            spool_path, on_conflict = job.spool_path, DuplicateStrategy(job.on_conflict)
+            batch_size, committed = job.batch_size, job.batches_committed
+            upload_complete = job.upload_complete
+            service = get_transaction_service(
+                transaction_repository=TransactionRepository(session=session)
+            )
+
+            try:
+                with open(spool_path, "rb") as stream:
+                    if not upload_complete:  # Validated while chunks arrive
+                        stream = _TailStream(
+                            file=stream,
+                            is_complete=lambda: _is_upload_complete(job_id=job_id),
+                            should_stop=self._stopping.is_set,
+                            wait=self._wait,
+                            park=lambda bytes_read: _park(
+                                job_id=job_id, owner=self.owner, bytes_read=bytes_read
+                            ),
+                            idle_timeout=settings.upload_session_idle_timeout,
+                            timeout=settings.upload_session_timeout,
+                        )
+
+                    checkpoint = time.perf_counter()
+
+                    def on_batch(batch, written) -> None:
+                        nonlocal checkpoint
+
+                        if self._stopping.is_set():
+                            raise _Interrupted
+
+                        now = time.perf_counter()
+                        recorded = jobs.record_batch(
+                            job_id=job_id,
+                            owner=self.owner,
+                            persisted=written.inserted,
+                            failed=batch.failure,
+                            skipped=written.skipped,
+                            bytes_processed=stream.tell(),
+                            seconds=now - checkpoint,
+                        )
+                        checkpoint = now
+
+                        if not recorded:  # Claimed as stale by another worker
+                            raise _Interrupted
+
+                    result = service.create_from_stream(
+                        stream=stream,
+                        on_conflict=on_conflict,
+                        batch_size=batch_size,
+                        skip_batches=committed,
+                        on_batch=on_batch,
+                        commit_batches=True,
+                    )
+
+                # Skipped batches are validated again, so errors cover the whole file
+                jobs.record_errors(
+                    job_id=job_id,
+                    errors=result.errors,
+                    error_report_id=result.error_report_id,
+                )
+                jobs.set_status(job_id=job_id, status=IngestJobStatus.COMPLETED)
+                jobs.persist()
+
+            except _Interrupted:
+                session.rollback()
+                logger.info(f"Upload job {job_id} interrupted, it will be resumed")
+                return
+
+            except _Parked:
+                session.rollback()
+                logger.info(f"Upload session {job_id} waits for its next chunk")
+                return
+
+            except Exception as error:
+                session.rollback()
+                message = error.as_dict["message"] if isinstance(error, Error) else None
+
+                if not message:
+                    logger.exception(f"Upload job {job_id} failed")
+
+                jobs.set_status(
+                    job_id=job_id,
+                    status=IngestJobStatus.FAILED,
+                    error=message or str(error),
+                )
+                jobs.persist()
+
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(spool_path)
+
+    def _beat(self) -> None:
+        while not self._stopping.wait(settings.ingest_job_heartbeat_interval):
+            try:
+                with SessionLocal() as session:
+                    jobs = IngestJobRepository(session=session)
+                    jobs.heartbeat(owner=self.owner)
+                    expired = jobs.expire_sessions(
+                        timeout=settings.upload_session_timeout,
+                        error=UploadSessionExpired().as_dict["message"],
+                    )
+                    jobs.persist()
+            except Exception:
+                logger.exception("Upload job heartbeat failed")
+                continue
+
+            for spool_path in expired:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(spool_path)
+
+            if self._stopping.is_set():
+                break
+
+            try:
+                self._resume_unfinished()
+            except Exception:
+                logger.exception("Resuming upload jobs failed")
+
+    def _resume_unfinished(self) -> None:
+        """Claims the pending jobs and the jobs of workers that stopped beating"""
+        with SessionLocal() as session:
+            jobs = IngestJobRepository(session=session)
+            job_ids = jobs.claim_unfinished(
+                owner=self.owner, stale_after=settings.ingest_job_stale_after
+            )
+            jobs.persist()
+
+        for job_id in job_ids:
+            logger.info(f"Resuming upload job {job_id}")
+            self.submit(job_id=job_id)
+
+
+class IngestJobService:
+    def __init__(self, job_repository: IngestJobRepository, runner: IngestJobRunner):
+        self.job_repository = job_repository
+        self.runner = runner
+
+    def submit(
+        self,
+        stream: BinaryIO,
+        file_name: Optional[str] = None,
+        on_conflict: DuplicateStrategy = DuplicateStrategy.FAIL,
+    ) -> IngestJob:
+        """Spools the upload to disk and queues it, returning the pending job"""
+        job_id, spool_path = self._new_spool()
+
+        with open(spool_path, "wb") as spool:
+            shutil.copyfileobj(stream, spool)
+
+        return self._create_job(
+            job_id=job_id,
+            file_name=file_name,
+            spool_path=spool_path,
+            on_conflict=on_conflict,
+            upload_complete=True,
+        )
+
+    def create_session(
+        self,
+        file_name: Optional[str] = None,
+        on_conflict: DuplicateStrategy = DuplicateStrategy.FAIL,
+    ) -> IngestJob:
+        """Starts a resumable upload, chunks are validated as they arrive"""
+        job_id, spool_path = self._new_spool()
+
+        open(spool_path, "wb").close()
+
+        return self._create_job(
+            job_id=job_id,
+            file_name=file_name,
+            spool_path=spool_path,
+            on_conflict=on_conflict,
+            upload_complete=False,
+        )
+
+    def append_chunk(self, job_id: UUID, offset: int, chunk: bytes) -> IngestJob:
+        """Appends a chunk starting at ``offset`` of the uploaded file.
+
+        A retried chunk may overlap bytes already received, only the missing
+        part is appended. Offsets past the received bytes are rejected.
+        """
+        job = self._lock_session(job_id=job_id)
+
+        try:
+            received = os.path.getsize(job.spool_path)
+
+            if offset > received:
+                raise UploadOffsetMismatch(
+                    f"Chunk offset {offset} is past received bytes, resume at {received}"
+                )
+
+            with open(job.spool_path, "ab") as spool:
+                spool.write(chunk[received - offset :])
+
+            received = max(received, offset + len(chunk))
+
+            status = job.status
+
+            self.job_repository.record_upload(job_id=job_id, bytes_total=received)
+            self.job_repository.persist()
+        finally:
+            self.job_repository.release()
+
+        self._queue(job_id=job_id, status=status)
+
+        return self.get_by_id(job_id=job_id)
+
+    def commit_session(self, job_id: UUID, size: Optional[int] = None) -> IngestJob:
+        """Marks the upload as complete, ``size`` guards against missing chunks"""
+        job = self._lock_session(job_id=job_id)
+
+        try:
+            received = os.path.getsize(job.spool_path)
+
+            if size is not None and size != received:
+                raise UploadOffsetMismatch(
+                    f"Received {received} of {size} bytes, resume at {received}"
+                )
+
+            status = job.status
+
+            self.job_repository.record_upload(
+                job_id=job_id, bytes_total=received, upload_complete=True
+            )
+            self.job_repository.persist()
+        finally:
+            self.job_repository.release()
+
+        self._queue(job_id=job_id, status=status)
+
+        return self.get_by_id(job_id=job_id)
+
+    def get_by_id(self, job_id: UUID) -> IngestJob:
+        job = self.job_repository.get_by_id(job_id=job_id)
+
+        if not job:
+            raise IngestJobNotFound
+
+        return job
+
+    def _lock_session(self, job_id: UUID):
+        """Open session of the job, locked until ``persist`` or ``release``.
+
+        The row lock serializes chunks and the commit of a session across
+        processes, so the session is checked again once it is held.
+        """
+        job = self.job_repository.get_active_record(job_id=job_id, for_update=True)
+
+        if not job:
+            self.job_repository.release()
+            raise IngestJobNotFound
+
+        if job.upload_complete:
+            self.job_repository.release()
+            raise UploadSessionClosed
+
+        return job
+
+    def _queue(self, job_id: UUID, status: str) -> None:
+        """Queues a pending session, or wakes the worker waiting for its chunks"""
+        if status == IngestJobStatus.PENDING.value:
+            self.runner.submit(job_id=job_id)
+        else:
+            self.runner.notify()
+
+    def _new_spool(self):
+        job_id = uuid4()
+
+        os.makedirs(settings.ingest_spool_directory, exist_ok=True)
+
+        return job_id, os.path.join(settings.ingest_spool_directory, f"{job_id}.csv")
+
+    def _create_job(
+        self,
+        job_id: UUID,
+        file_name: Optional[str],
+        spool_path: str,
+        on_conflict: DuplicateStrategy,
+        upload_complete: bool,
+    ) -> IngestJob:
+        job = self.job_repository.create(
+            job_id=job_id,
+            file_name=file_name,
+            spool_path=spool_path,
+            on_conflict=on_conflict,
+            batch_size=settings.ingest_batch_size,
+            bytes_total=os.path.getsize(spool_path),
+            upload_complete=upload_complete,
+        )
+        self.job_repository.persist()
+
+        if upload_complete:  # A session is queued by its first chunk
+            self.runner.submit(job_id=job_id)
+
+        return job
+
+
+ingest_job_runner = IngestJobRunner()
+
+
+def get_ingest_job_service(
+    job_repository: IngestJobRepository = Depends(get_ingest_job_repository),
+) -> IngestJobService:
+    return IngestJobService(job_repository=job_repository, runner=ingest_job_runner)
@@ -0,0 +1,305 @@
+"""Online migration of a populated transactions table to typed columns.
+
+Tables created before typed columns store ``timestamp`` as text, ``amount``
+as double precision and ``currency`` as free text. The migration keeps the
+table writable while it runs:
+
+1. typed shadow columns are added, a trigger fills them for new writes
+2. existing rows are backfilled in short batches, in primary key order
+3. indexes on the shadow columns are built concurrently
+4. under a brief exclusive lock the old columns are dropped and the shadow
+   columns take their names
+
+Every step can be repeated, an interrupted migration is resumed by running
+it again. Statements are bounded by ``MAINTENANCE_STATEMENT_TIMEOUT`` instead
+of ``DB_STATEMENT_TIMEOUT``, index builds and validations scan the table.
+
+Usage:
+    python -m src.transaction.migrations --batch-size 10000 --pause 0.1
+"""
+
+__all__ = ("TypedColumnsMigration",)
+
+import argparse
+import contextlib
+import time
+
+from sqlalchemy import Engine, text
+
+from src.core.database import engine as default_engine
+from src.core.logging import logger
+from src.settings import settings
+
+# Source column, shadow column, conversion of the source value
+_COLUMNS = (
+    ("timestamp", "timestamp_typed", "timestamptz", "{column}::timestamptz"),
+    ("amount", "amount_typed", "numeric", "{column}::numeric"),
+    ("currency", "currency_typed", "currency", "{column}::currency"),
+)
+
+
+class TypedColumnsMigration:
+    def __init__(
+        self,
+        engine: Engine = default_engine,
+        table: str = "transactions",
+        batch_size: int = 10000,
+        pause: float = 0.0,
+    ):
+        """
+        :param batch_size: rows updated per backfill transaction
+        :param pause: seconds to sleep between backfill batches, leaves room
+            for the regular load
+        """
+        self._engine = engine
+        self._table = table
+        self._batch_size = batch_size
+        self._pause = pause
+
+    def is_needed(self) -> bool:
+        with self._engine.connect() as connection:
+            data_type = connection.scalar(
+                text(
+                    "SELECT data_type FROM information_schema.columns "
+                    "WHERE table_name = :table AND column_name = 'timestamp'"
+                ),
+                {"table": self._table},
+            )
+
+        return data_type is not None and data_type != "timestamp with time zone"
+
+    def run(self) -> None:
+        if not self.is_needed():
+            logger.info(f"Table {self._table} already has typed columns")
+            return
+
+        self.add_shadow_columns()
+        self.backfill()
+        self.create_indexes()
+        self.swap_columns()
+
+        logger.info(f"Table {self._table} migrated to typed columns")
+
+    def add_shadow_columns(self) -> None:
+        """Adds nullable typed columns and the trigger filling them, both instant"""
+        assignments = "\n".join(
+            f"NEW.{shadow} := {convert.format(column=f'NEW.{source}')};"
+            for source, shadow, _, convert in _COLUMNS
+        )
+
+        with self._begin() as connection:
+            connection.execute(
+                text(
+                    "DO $$ BEGIN "
+                    "CREATE TYPE currency AS ENUM ('PLN', 'EUR', 'USD'); "
+                    "EXCEPTION WHEN duplicate_object THEN NULL; END $$"
+                )
+            )
+            connection.execute(
+                text(
+                    f"ALTER TABLE {self._table} "
+                    + ", ".join(
+                        f"ADD COLUMN IF NOT EXISTS {shadow} {type_}"
+                        for _, shadow, type_, _ in _COLUMNS
+                    )
+                )
+            )
+            connection.execute(
+                text(
+                    f"CREATE OR REPLACE FUNCTION {self._table}_typed_columns() "
+                    f"RETURNS trigger AS $$ BEGIN {assignments} RETURN NEW; END $$ "
+                    # Timestamps without an offset are read as UTC
+                    "LANGUAGE plpgsql SET timezone = 'UTC'"
+                )
+            )
+            connection.execute(
+                text(
+                    f"DROP TRIGGER IF EXISTS {self._table}_typed_columns "
+                    f"ON {self._table}"
+                )
+            )
+            connection.execute(
+                text(
+                    f"CREATE TRIGGER {self._table}_typed_columns "
+                    f"BEFORE INSERT OR UPDATE ON {self._table} "
+                    f"FOR EACH ROW EXECUTE FUNCTION {self._table}_typed_columns()"
+                )
+            )
+
+            # Checked for new rows right away, validated once backfilled
+            for _, shadow, _, _ in _COLUMNS:
+                connection.execute(
+                    text(
+                        f"DO $$ BEGIN ALTER TABLE {self._table} "
+                        f"ADD CONSTRAINT {shadow}_not_null "
+                        f"CHECK ({shadow} IS NOT NULL) NOT VALID; "
+                        "EXCEPTION WHEN duplicate_object THEN NULL; END $$"
+                    )
+                )
+
+    def backfill(self) -> int:
+        """Fills the shadow columns of existing rows, one short transaction per batch"""
+        assignments = ", ".join(
+            f"{shadow} = {convert.format(column=source)}"
+            for source, shadow, _, convert in _COLUMNS
+        )
+        statement = text(
+            f"UPDATE {self._table} SET {assignments} "
+            f"WHERE transaction_id IN ("
+            f"  SELECT transaction_id FROM {self._table} "
+            f"  WHERE transaction_id > :after AND timestamp_typed IS NULL "
+            f"  ORDER BY transaction_id LIMIT :limit"
+            f") RETURNING transaction_id"
+        )
+        after = "00000000-0000-0000-0000-000000000000"
+        updated = 0
+
+        while True:
+            with self._begin() as connection:
+                connection.execute(text("SET LOCAL timezone = 'UTC'"))
+                ids = connection.scalars(
+                    statement, {"after": after, "limit": self._batch_size}
+                ).all()
+
+            if not ids:
+                break
+
+            updated += len(ids)
+            after = max(ids)
+            logger.info(f"Backfilled {updated} rows of {self._table}")
+
+            if self._pause:
+                time.sleep(self._pause)
+
+        return updated
+
+    def create_indexes(self) -> None:
+        """Builds the listing indexes on the shadow columns without blocking writes.
+
+        Indexes left invalid by an interrupted build are dropped and built again.
+        """
+        indexes = {
+            f"ix_{self._table}_timestamp_id_typed": "timestamp_typed, transaction_id",
+            f"ix_{self._table}_customer_id_timestamp_id_typed": (
+                "customer_id, timestamp_typed, transaction_id"
+            ),
+            f"ix_{self._table}_product_id_timestamp_id_typed": (
+                "product_id, timestamp_typed, transaction_id"
+            ),
+        }
+
+        with self._autocommit() as connection:
+            for name, columns in indexes.items():
+                # A failed concurrent build leaves an invalid index behind
+                if connection.scalar(
+                    text(
+                        "SELECT NOT indisvalid FROM pg_index "
+                        "WHERE indexrelid = to_regclass(:name)"
+                    ),
+                    {"name": name},
+                ):
+                    logger.info(f"Rebuilding invalid index {name}")
+                    connection.execute(text(f"DROP INDEX CONCURRENTLY {name}"))
+
+                connection.execute(
+                    text(
+                        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                        f"ON {self._table} ({columns})"
+                    )
+                )
+
+            for _, shadow, _, _ in _COLUMNS:
+                # Takes a lock that still allows reads and writes
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {self._table} "
+                        f"VALIDATE CONSTRAINT {shadow}_not_null"
+                    )
+                )
+
+    def swap_columns(self, lock_timeout: str = "5s") -> None:
+        """Replaces the old columns by the shadow ones under a brief exclusive lock.
+
+        The validated check constraints let SET NOT NULL skip the table scan,
+        so the lock is held for catalog changes only.
+        """
+        with self._begin() as connection:
+            connection.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+            connection.execute(
+                text(f"LOCK TABLE {self._table} IN ACCESS EXCLUSIVE MODE")
+            )
+            connection.execute(
+                text(f"DROP TRIGGER {self._table}_typed_columns ON {self._table}")
+            )
+            connection.execute(text(f"DROP FUNCTION {self._table}_typed_columns()"))
+
+            for source, shadow, _, _ in _COLUMNS:
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {self._table} DROP COLUMN {source}; "
+                        f"ALTER TABLE {self._table} RENAME COLUMN {shadow} TO {source}; "
+                        f"ALTER TABLE {self._table} ALTER COLUMN {source} SET NOT NULL; "
+                        f"ALTER TABLE {self._table} DROP CONSTRAINT {shadow}_not_null"
+                    )
+                )
+
+            # Single column indexes are covered by the composite ones
+            for index in ("customer_id", "product_id"):
+                connection.execute(
+                    text(f"DROP INDEX IF EXISTS ix_{self._table}_{index}")
+                )
+
+            for name in (
+                "timestamp_id",
+                "customer_id_timestamp_id",
+                "product_id_timestamp_id",
+            ):
+                connection.execute(
+                    text(
+                        f"ALTER INDEX ix_{self._table}_{name}_typed "
+                        f"RENAME TO ix_{self._table}_{name}"
+                    )
+                )
+
+    @contextlib.contextmanager
+    def _begin(self):
+        with self._engine.begin() as connection:
+            connection.execute(
+                text(
+                    "SET LOCAL statement_timeout = "
+                    f"{settings.maintenance_statement_timeout}"
+                )
+            )
+
+            yield connection
+
+    @contextlib.contextmanager
+    def _autocommit(self):
+        """Connection outside a transaction, for concurrent index builds"""
+        with self._engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as connection:
+            connection.execute(
+                text(
+                    "SET statement_timeout = "
+                    f"{settings.maintenance_statement_timeout}"
+                )
+            )
+
+            try:
+                yield connection
+            finally:  # Back to DB_STATEMENT_TIMEOUT before the pool reuses it
+                connection.execute(text("RESET statement_timeout"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--pause", type=float, default=0.0)
+    args = parser.parse_args()
+
+    TypedColumnsMigration(batch_size=args.batch_size, pause=args.pause).run()
+
+
+if __name__ == "__main__":
+    main()
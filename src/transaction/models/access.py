@@ -1,6 +1,28 @@
-__all__ = ("TransactionActiveRecord",)
+__all__ = (
+    "TransactionActiveRecord",
+    "CustomerSummaryActiveRecord",
+    "ProductSummaryActiveRecord",
+    "CustomerProductActiveRecord",
+    "CustomerSketchActiveRecord",
+    "ProductSketchActiveRecord",
+    "IngestJobActiveRecord",
+)
 
-from sqlalchemy import Column, UUID, Float, Integer, String
+from sqlalchemy import (
+    Column,
+    UUID,
+    JSON,
+    BigInteger,
+    Boolean,
+    DateTime,
+    Enum,
+    Float,
+    Index,
+    Integer,
+    Numeric,
+    SmallInteger,
+    String,
+)
 
 from src.core.database import Base
 
@@ -10,11 +32,120 @@ class TransactionActiveRecord(Base):
 
     transaction_id = Column(UUID, primary_key=True)  # Natural key
 
-    timestamp = Column(String, nullable=False)
-    amount = Column(Float, nullable=False)
-    currency = Column(String, nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    amount = Column(Numeric, nullable=False)
+    currency = Column(Enum("PLN", "EUR", "USD", name="currency"), nullable=False)
     quantity = Column(Integer, nullable=False)
 
     #  Candidate for extraction in normalization process
-    customer_id = Column(UUID, nullable=False, index=True)
-    product_id = Column(UUID, nullable=False, index=True)
+    customer_id = Column(UUID, nullable=False)
+    product_id = Column(UUID, nullable=False)
+
+    # Listing order, so keyset pages are read straight from an index. The
+    # filtered variants also serve the customer and product lookups.
+    __table_args__ = (
+        Index("ix_transactions_timestamp_id", timestamp, transaction_id),
+        Index(
+            "ix_transactions_customer_id_timestamp_id",
+            customer_id,
+            timestamp,
+            transaction_id,
+        ),
+        Index(
+            "ix_transactions_product_id_timestamp_id",
+            product_id,
+            timestamp,
+            transaction_id,
+        ),
+    )
+
+
+# Rollups of transactions, updated in the same transaction as the rows they
+# summarize, see TransactionRepository.create_many
+
+
+class CustomerSummaryActiveRecord(Base):
+    __tablename__ = "customer_summary"
+
+    customer_id = Column(UUID, primary_key=True)
+
+    total_revenue = Column(Numeric, nullable=False)  # PLN
+    unique_products_count = Column(Integer, nullable=False)
+    last_transaction_date = Column(DateTime(timezone=True), nullable=False)
+    transactions_count = Column(BigInteger, nullable=False)
+
+
+class ProductSummaryActiveRecord(Base):
+    __tablename__ = "product_summary"
+
+    product_id = Column(UUID, primary_key=True)
+
+    total_quantity = Column(BigInteger, nullable=False)
+    total_revenue = Column(Numeric, nullable=False)  # PLN
+    unique_customers_count = Column(Integer, nullable=False)
+    transactions_count = Column(BigInteger, nullable=False)
+
+
+class CustomerProductActiveRecord(Base):
+    """Distinct pairs, a new pair increments both unique counts"""
+
+    __tablename__ = "customer_product"
+
+    customer_id = Column(UUID, primary_key=True)
+    product_id = Column(UUID, primary_key=True)
+
+
+class CustomerSketchActiveRecord(Base):
+    """HyperLogLog registers of the products of a customer, see sketches"""
+
+    __tablename__ = "customer_sketch"
+
+    customer_id = Column(UUID, primary_key=True)
+    register = Column(SmallInteger, primary_key=True)
+
+    rank = Column(SmallInteger, nullable=False)
+
+
+class ProductSketchActiveRecord(Base):
+    """HyperLogLog registers of the customers of a product, see sketches"""
+
+    __tablename__ = "product_sketch"
+
+    product_id = Column(UUID, primary_key=True)
+    register = Column(SmallInteger, primary_key=True)
+
+    rank = Column(SmallInteger, nullable=False)
+
+
+class IngestJobActiveRecord(Base):
+    __tablename__ = "ingest_jobs"
+
+    job_id = Column(UUID, primary_key=True)
+
+    status = Column(String, nullable=False, index=True)
+    file_name = Column(String, nullable=True)
+    spool_path = Column(String, nullable=False)
+    on_conflict = Column(String, nullable=False)
+    batch_size = Column(Integer, nullable=False)
+    # False while an upload session still receives chunks, see bytes_total
+    upload_complete = Column(Boolean, nullable=False, default=True)
+    # Last chunk of an upload session, idle sessions expire after a timeout
+    received_at = Column(DateTime(timezone=True), nullable=True)
+    # Worker running the job and when it was last seen alive, see IngestJobRunner
+    owner = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Progress, updated in the same transaction as each persisted batch
+    batches_committed = Column(Integer, nullable=False, default=0)
+    rows_persisted = Column(Integer, nullable=False, default=0)
+    rows_failed = Column(Integer, nullable=False, default=0)
+    rows_skipped = Column(Integer, nullable=False, default=0)
+    bytes_total = Column(BigInteger, nullable=False)
+    bytes_processed = Column(BigInteger, nullable=False, default=0)
+    elapsed_seconds = Column(Float, nullable=False, default=0.0)
+
+    error = Column(String, nullable=True)
+    errors = Column(JSON, nullable=True)  # Grouped row errors, see IngestErrorGroup
+    error_report_id = Column(UUID, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,20 +1,36 @@
 __all__ = (
     "Transaction",
+    "TransactionRecord",
     "CustomerSummary",
+    "CustomerSummariesRequest",
     "ProductSummary",
+    "ProductSummariesRequest",
     "TransactionsPaginated",
+    "TransactionsCursorPage",
+    "TransactionsBatch",
+    "TransactionsBatchRequest",
     "BulkTransactionResult",
+    "BulkTransactionMemberResult",
     "Currency",
+    "DistinctCountMode",
+    "DuplicateStrategy",
+    "ExportFormat",
+    "IngestErrorGroup",
+    "IngestJob",
+    "IngestJobStatus",
+    "TotalCountKind",
+    "UploadFormat",
 )
 
 import enum
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional, Set, List
+from typing import NamedTuple, Optional, Set, List
 from uuid import UUID
 
 from pydantic import BaseModel, Field, field_validator
 
+from src.settings import settings
 from .access import TransactionActiveRecord
 
 
@@ -28,6 +44,49 @@ class Currency(enum.Enum):
         return set(cls.__members__.values())
 
 
+class DuplicateStrategy(str, enum.Enum):
+    """How ingest treats transaction_ids that are already stored"""
+
+    FAIL = "fail"
+    SKIP = "skip"
+
+
+class UploadFormat(str, enum.Enum):
+    """Format of an uploaded file, detected from its leading bytes"""
+
+    CSV = "csv"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
+    ARROW = "arrow"  # IPC file format
+    ARROW_STREAM = "arrow_stream"  # IPC streaming format
+
+
+class ExportFormat(str, enum.Enum):
+    CSV = "csv"  # Columns of an upload, can be uploaded again
+    NDJSON = "ndjson"
+
+
+class TotalCountKind(str, enum.Enum):
+    """How the total_count of a listing page was obtained"""
+
+    EXACT = "exact"
+    ESTIMATED = "estimated"  # Planner statistics of the whole table
+
+
+class DistinctCountMode(str, enum.Enum):
+    """How unique customer and product counts of a summary are obtained"""
+
+    EXACT = "exact"
+    APPROXIMATE = "approximate"  # HyperLogLog estimate, see unique_count_error
+
+
+class IngestJobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
 class Transaction(BaseModel):
     transaction_id: UUID
     timestamp: datetime
@@ -62,7 +121,7 @@ class Transaction(BaseModel):
     def to_active_record(self) -> TransactionActiveRecord:
         return TransactionActiveRecord(
             transaction_id=self.transaction_id,
-            timestamp=str(self.timestamp),
+            timestamp=self.timestamp,
             amount=self.amount,
             currency=self.currency.value,
             customer_id=self.customer_id,
@@ -74,12 +133,57 @@ class Transaction(BaseModel):
     def from_csv(cls, row: dict):
         return cls(**row)
 
+    @classmethod
+    def from_row(cls, row) -> "Transaction":
+        """Validated construction from a stored row or active record"""
+        return cls(
+            transaction_id=row.transaction_id,
+            timestamp=row.timestamp,
+            amount=row.amount,
+            currency=row.currency,
+            customer_id=row.customer_id,
+            product_id=row.product_id,
+            quantity=row.quantity,
+        )
+
+
+class TransactionRecord(NamedTuple):
+    """Validated transaction produced without building a pydantic model.
+
+    Field names follow Transaction, ids are kept as canonical UUID strings.
+    """
+
+    transaction_id: str
+    timestamp: datetime
+    amount: float
+    currency: Currency
+    customer_id: str
+    product_id: str
+    quantity: int
+
+    @classmethod
+    def from_transaction(cls, transaction: Transaction) -> "TransactionRecord":
+        return cls(
+            transaction_id=str(transaction.transaction_id),
+            timestamp=transaction.timestamp,
+            amount=transaction.amount,
+            currency=transaction.currency,
+            customer_id=str(transaction.customer_id),
+            product_id=str(transaction.product_id),
+            quantity=transaction.quantity,
+        )
+
 
 class CustomerSummary(BaseModel):
     customer_id: UUID
     total_revenue: Decimal
     unique_products_count: int
     last_transaction_date: Optional[datetime]
+    unique_count_mode: DistinctCountMode = DistinctCountMode.EXACT
+    unique_count_error: Optional[float] = None  # Relative standard error
+    version: Optional[str] = Field(
+        default=None, exclude=True
+    )  # Of the rollup it was read from, see etags
 
 
 class ProductSummary(BaseModel):
@@ -87,13 +191,32 @@ class ProductSummary(BaseModel):
     total_quantity: int
     total_revenue: Decimal
     unique_customers_count: int
+    unique_count_mode: DistinctCountMode = DistinctCountMode.EXACT
+    unique_count_error: Optional[float] = None  # Relative standard error
+    version: Optional[str] = Field(
+        default=None, exclude=True
+    )  # Of the rollup it was read from, see etags
+
+
+class CustomerSummariesRequest(BaseModel):
+    customer_ids: List[UUID] = Field(
+        min_length=1, max_length=settings.report_batch_max_ids
+    )
+
+
+class ProductSummariesRequest(BaseModel):
+    product_ids: List[UUID] = Field(
+        min_length=1, max_length=settings.report_batch_max_ids
+    )
 
 
 class TransactionsPaginated(BaseModel):
-    total_count: int
+    total_count: Optional[int]  # None when not requested
+    total_count_kind: Optional[TotalCountKind] = None
     page: int
     page_size: int
     items: List[Transaction]
+    next_cursor: Optional[str] = None  # Continues in cursor mode, if more items
 
     def dict(self, **kwargs):
         return {
@@ -106,6 +229,67 @@ class TransactionsPaginated(BaseModel):
         }
 
 
+class TransactionsCursorPage(BaseModel):
+    page_size: int
+    items: List[Transaction]
+    next_cursor: Optional[str] = None  # None on the last page
+
+
+class TransactionsBatchRequest(BaseModel):
+    transaction_ids: List[UUID] = Field(
+        min_length=1, max_length=settings.batch_get_max_ids
+    )
+
+
+class TransactionsBatch(BaseModel):
+    items: List[Transaction]  # In the order of the requested ids
+    missing: List[UUID]
+
+
+class IngestErrorGroup(BaseModel):
+    column: Optional[str]
+    reason: str
+    message: str  # Of the first error in the group
+    count: int = 0
+    rows: List[int] = Field(default_factory=list)  # First few examples
+
+
+class BulkTransactionMemberResult(BaseModel):
+    name: str
+    success: int = 0
+    failure: int = 0
+    skipped: int = 0
+    errors: List[IngestErrorGroup] = Field(default_factory=list)
+    error_report_id: Optional[UUID] = None
+    error: Optional[str] = None  # Member could not be read, e.g. invalid headers
+
+
 class BulkTransactionResult(BaseModel):
     success: int
     failure: int
+    skipped: int = 0  # Already stored, see DuplicateStrategy.SKIP
+    errors: List[IngestErrorGroup] = Field(default_factory=list)
+    error_report_id: Optional[UUID] = None  # Full per-row report, if any row failed
+    members: List[BulkTransactionMemberResult] = Field(
+        default_factory=list
+    )  # Per CSV of a zip archive, totals above cover all of them
+
+
+class IngestJob(BaseModel):
+    job_id: UUID
+    status: IngestJobStatus
+    file_name: Optional[str]
+    rows_validated: int
+    rows_persisted: int
+    rows_failed: int
+    rows_skipped: int
+    batches_committed: int
+    bytes_received: int  # Offset of the next chunk of an upload session
+    upload_complete: bool
+    rows_per_second: Optional[float]
+    eta_seconds: Optional[float]  # Estimated from the share of the file read so far
+    error: Optional[str]
+    errors: List[IngestErrorGroup]
+    error_report_id: Optional[UUID]
+    created_at: datetime
+    finished_at: Optional[datetime]
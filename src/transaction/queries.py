@@ -0,0 +1,264 @@
+"""Statements shared by the sync and async transaction repositories"""
+
+__all__ = (
+    "select_by_id",
+    "select_by_ids",
+    "select_filtered",
+    "select_paginated",
+    "select_export",
+    "select_after",
+    "count_filtered",
+    "estimate_count",
+    "summarize_customers",
+    "summarize_products",
+    "summarize_customer_sketch",
+    "summarize_product_sketch",
+    "select_customer_summaries",
+    "select_product_summaries",
+    "summarize_customer_sketches",
+    "summarize_product_sketches",
+)
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import (
+    BigInteger,
+    Select,
+    any_,
+    bindparam,
+    case,
+    cast,
+    column,
+    desc,
+    distinct,
+    func,
+    select,
+    table,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.sql.elements import ColumnElement
+
+from .models.access import (
+    CustomerSketchActiveRecord,
+    CustomerSummaryActiveRecord,
+    ProductSketchActiveRecord,
+    ProductSummaryActiveRecord,
+    TransactionActiveRecord,
+)
+
+
+# Reads select plain rows of the table, mapped without building ORM instances
+_TRANSACTIONS = TransactionActiveRecord.__table__
+
+# Unique, so pages of both pagination modes are stable
+_LISTING_ORDER = (
+    desc(TransactionActiveRecord.timestamp),
+    desc(TransactionActiveRecord.transaction_id),
+)
+
+
+def select_by_id(transaction_id: UUID) -> Select:
+    return select(_TRANSACTIONS).where(
+        TransactionActiveRecord.transaction_id == transaction_id
+    )
+
+
+def select_by_ids(transaction_ids: List[UUID]) -> Select:
+    return select(_TRANSACTIONS).where(
+        _any_of(TransactionActiveRecord.transaction_id, transaction_ids)
+    )
+
+
+def select_filtered(
+    customer_id: Optional[str] = None, product_id: Optional[str] = None
+) -> Select:
+    query = select(_TRANSACTIONS)
+
+    if customer_id:
+        query = query.where(TransactionActiveRecord.customer_id == customer_id)
+
+    if product_id:
+        query = query.where(TransactionActiveRecord.product_id == product_id)
+
+    return query
+
+
+def select_paginated(
+    page: int,
+    page_size: int,
+    customer_id: Optional[str] = None,
+    product_id: Optional[str] = None,
+) -> Select:
+    """Offset page in listing order.
+
+    One row more than ``page_size`` is selected to tell whether a next page
+    exists without counting.
+    """
+    return (
+        select_filtered(customer_id=customer_id, product_id=product_id)
+        .order_by(*_LISTING_ORDER)
+        .offset((page - 1) * page_size)
+        .limit(page_size + 1)
+    )
+
+
+def select_after(
+    after: Optional[Tuple[datetime, UUID]],
+    page_size: int,
+    customer_id: Optional[str] = None,
+    product_id: Optional[str] = None,
+) -> Select:
+    """Keyset page following the ``(timestamp, transaction_id)`` of ``after``.
+
+    One row more than ``page_size`` is selected to tell whether a next page
+    exists.
+    """
+    query = select_filtered(customer_id=customer_id, product_id=product_id)
+
+    if after:
+        query = query.where(
+            tuple_(
+                TransactionActiveRecord.timestamp,
+                TransactionActiveRecord.transaction_id,
+            )
+            < tuple_(*after)
+        )
+
+    return query.order_by(*_LISTING_ORDER).limit(page_size + 1)
+
+
+def select_export(
+    customer_id: Optional[UUID] = None,
+    product_id: Optional[UUID] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Select:
+    """Unordered, so the table or index is read in a single pass without a sort"""
+    query = select_filtered(customer_id=customer_id, product_id=product_id)
+
+    if since:
+        query = query.where(TransactionActiveRecord.timestamp >= since)
+
+    if until:
+        query = query.where(TransactionActiveRecord.timestamp < until)
+
+    return query
+
+
+def count_filtered(
+    customer_id: Optional[str] = None, product_id: Optional[str] = None
+) -> Select:
+    return select(func.count()).select_from(
+        select_filtered(customer_id=customer_id, product_id=product_id).subquery()
+    )
+
+
+def estimate_count() -> Select:
+    """Row count of the table from planner statistics, -1 before it is analyzed"""
+    return (
+        select(cast(column("reltuples"), BigInteger))
+        .where(column("oid") == func.to_regclass(TransactionActiveRecord.__tablename__))
+        .select_from(table("pg_class"))
+    )
+
+
+def summarize_customers(pln_rates: Dict[str, Decimal]) -> Select:
+    """Summary of every customer computed from its transactions"""
+    return select(
+        TransactionActiveRecord.customer_id,
+        func.sum(_pln_amount(pln_rates)).label("total_revenue"),
+        func.count(distinct(TransactionActiveRecord.product_id)).label(
+            "unique_products_count"
+        ),
+        func.max(TransactionActiveRecord.timestamp).label("last_transaction_date"),
+        func.count().label("transactions_count"),
+    ).group_by(TransactionActiveRecord.customer_id)
+
+
+def summarize_products(pln_rates: Dict[str, Decimal]) -> Select:
+    """Summary of every product computed from its transactions"""
+    return select(
+        TransactionActiveRecord.product_id,
+        func.sum(TransactionActiveRecord.quantity).label("total_quantity"),
+        func.sum(_pln_amount(pln_rates)).label("total_revenue"),
+        func.count(distinct(TransactionActiveRecord.customer_id)).label(
+            "unique_customers_count"
+        ),
+        func.count().label("transactions_count"),
+    ).group_by(TransactionActiveRecord.product_id)
+
+
+def summarize_customer_sketch(customer_id: UUID) -> Select:
+    """Set registers and their harmonic sum, see sketches.estimate"""
+    return _summarize_sketch(CustomerSketchActiveRecord).where(
+        CustomerSketchActiveRecord.customer_id == customer_id
+    )
+
+
+def summarize_product_sketch(product_id: UUID) -> Select:
+    """Set registers and their harmonic sum, see sketches.estimate"""
+    return _summarize_sketch(ProductSketchActiveRecord).where(
+        ProductSketchActiveRecord.product_id == product_id
+    )
+
+
+def select_customer_summaries(customer_ids: List[UUID]) -> Select:
+    return select(CustomerSummaryActiveRecord).where(
+        _any_of(CustomerSummaryActiveRecord.customer_id, customer_ids)
+    )
+
+
+def select_product_summaries(product_ids: List[UUID]) -> Select:
+    return select(ProductSummaryActiveRecord).where(
+        _any_of(ProductSummaryActiveRecord.product_id, product_ids)
+    )
+
+
+def summarize_customer_sketches(customer_ids: List[UUID]) -> Select:
+    """summarize_customer_sketch of every customer, with its customer_id"""
+    return (
+        _summarize_sketch(CustomerSketchActiveRecord)
+        .add_columns(CustomerSketchActiveRecord.customer_id)
+        .where(_any_of(CustomerSketchActiveRecord.customer_id, customer_ids))
+        .group_by(CustomerSketchActiveRecord.customer_id)
+    )
+
+
+def summarize_product_sketches(product_ids: List[UUID]) -> Select:
+    """summarize_product_sketch of every product, with its product_id"""
+    return (
+        _summarize_sketch(ProductSketchActiveRecord)
+        .add_columns(ProductSketchActiveRecord.product_id)
+        .where(_any_of(ProductSketchActiveRecord.product_id, product_ids))
+        .group_by(ProductSketchActiveRecord.product_id)
+    )
+
+
+def _any_of(column, ids: List[UUID]) -> ColumnElement:
+    # A single array parameter, the statement is the same for any number of ids
+    return column == any_(bindparam(f"{column.key}s", ids, type_=ARRAY(column.type)))
+
+
+def _summarize_sketch(model) -> Select:
+    return select(
+        func.count().label("registers"),
+        func.coalesce(func.sum(func.power(2.0, -model.rank)), 0).label("harmonic_sum"),
+    )
+
+
+def _pln_amount(pln_rates: Dict[str, Decimal]) -> ColumnElement:
+    """Amount converted to PLN, currencies without a rate are taken as is"""
+    return case(
+        *(
+            (
+                TransactionActiveRecord.currency == currency,
+                TransactionActiveRecord.amount * rate,
+            )
+            for currency, rate in pln_rates.items()
+        ),
+        else_=TransactionActiveRecord.amount,
+    )
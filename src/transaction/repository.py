@@ -1,25 +1,320 @@
-from typing import Optional
+import csv
+import io
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from itertools import islice
+from typing import AsyncIterator, Iterable, List, NamedTuple, Optional, Tuple
 from uuid import UUID
 
 from fastapi import Depends
-from sqlalchemy import desc
-from sqlalchemy.orm import Session
-
-from src.core.database import get_session, catch_errors
-from .models.access import TransactionActiveRecord
+from sqlalchemy import Row, and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+
+from src.core import etags
+from src.core.database import get_async_session, get_session, catch_errors
+from src.core.logging import logger
+from src.settings import settings
+from . import queries
+from .counts import count_cache
+from .cursor import encode_cursor
+from . import sketches
+from .sketches import hash_sql, rank_sql, register_sql
+from .models.access import (
+    CustomerSummaryActiveRecord,
+    IngestJobActiveRecord,
+    ProductSummaryActiveRecord,
+    TransactionActiveRecord,
+)
 from .models.dto import (
     CustomerSummary,
+    DistinctCountMode,
+    DuplicateStrategy,
+    IngestErrorGroup,
+    IngestJob,
+    IngestJobStatus,
     ProductSummary,
+    TotalCountKind,
     Transaction,
+    TransactionsCursorPage,
     TransactionsPaginated,
 )
 
 
-class TransactionRepository:
+class _TransactionMapper:
+    """Mapping of stored rows shared by the sync and async repositories.
+
+    Stored rows are typed and were validated on ingest, pages and summaries
+    wrapping them are built without validation.
+    """
 
     class CurrencyExchange:
-        EUR = 4.3
-        USD = 4.0
+        EUR = Decimal("4.3")
+        USD = Decimal("4.0")
+
+    # Applied in SQL, PLN and undefined currencies are taken as is
+    _PLN_RATES = {"EUR": CurrencyExchange.EUR, "USD": CurrencyExchange.USD}
+
+    class TotalCount(NamedTuple):
+        count: Optional[int]
+        kind: Optional[TotalCountKind]
+
+    class Sketch(NamedTuple):
+        registers: int
+        harmonic_sum: float
+
+    _EMPTY_SKETCH = Sketch(registers=0, harmonic_sum=0.0)  # Truthy, unlike None
+
+    def _to_paginated(
+        self,
+        total_count: TotalCount,
+        page: int,
+        page_size: int,
+        rows: List[Row],
+    ) -> TransactionsPaginated:
+        rows, rest = rows[:page_size], rows[page_size:]
+
+        return TransactionsPaginated.model_construct(
+            total_count=total_count.count,
+            total_count_kind=total_count.kind,
+            page=page,
+            page_size=page_size,
+            items=[Transaction.from_row(row) for row in rows],
+            next_cursor=self._cursor(rows[-1]) if rest else None,
+        )
+
+    def _cached_count(self, customer_id, product_id) -> Optional[TotalCount]:
+        count = count_cache.get(customer_id=customer_id, product_id=product_id)
+
+        return (
+            self.TotalCount(count, TotalCountKind.EXACT) if count is not None else None
+        )
+
+    def _estimated_count(self, estimate: Optional[int]) -> Optional[TotalCount]:
+        """Planner estimate of a large table, small or unanalyzed ones are counted"""
+        if estimate is None or estimate < settings.listing_estimate_threshold:
+            return None
+
+        return self.TotalCount(estimate, TotalCountKind.ESTIMATED)
+
+    def _exact_count(self, count: int, customer_id, product_id) -> TotalCount:
+        count_cache.set(count=count, customer_id=customer_id, product_id=product_id)
+
+        return self.TotalCount(count, TotalCountKind.EXACT)
+
+    def _to_cursor_page(
+        self, page_size: int, rows: List[Row]
+    ) -> TransactionsCursorPage:
+        rows, rest = rows[:page_size], rows[page_size:]
+
+        return TransactionsCursorPage.model_construct(
+            page_size=page_size,
+            items=[Transaction.from_row(row) for row in rows],
+            next_cursor=self._cursor(rows[-1]) if rest else None,
+        )
+
+    @staticmethod
+    def _cursor(row: Row) -> str:
+        return encode_cursor(timestamp=row.timestamp, transaction_id=row.transaction_id)
+
+    def _to_customer_summary(
+        self, customer_id: UUID, row, sketch=None
+    ) -> CustomerSummary:
+        distinct = DistinctCountMode.APPROXIMATE if sketch else DistinctCountMode.EXACT
+
+        return CustomerSummary.model_construct(
+            customer_id=customer_id,
+            total_revenue=row.total_revenue,
+            unique_products_count=(
+                self._estimate(sketch) if sketch else row.unique_products_count
+            ),
+            last_transaction_date=row.last_transaction_date,
+            unique_count_mode=distinct,
+            unique_count_error=sketches.standard_error() if sketch else None,
+            version=self._summary_version(row, distinct),
+        )
+
+    def _to_product_summary(self, product_id: UUID, row, sketch=None) -> ProductSummary:
+        distinct = DistinctCountMode.APPROXIMATE if sketch else DistinctCountMode.EXACT
+
+        return ProductSummary.model_construct(
+            product_id=product_id,
+            total_quantity=row.total_quantity,
+            total_revenue=row.total_revenue,
+            unique_customers_count=(
+                self._estimate(sketch) if sketch else row.unique_customers_count
+            ),
+            unique_count_mode=distinct,
+            unique_count_error=sketches.standard_error() if sketch else None,
+            version=self._summary_version(row, distinct),
+        )
+
+    def _to_customer_summaries(self, rows, sketch_rows) -> List[CustomerSummary]:
+        """Sketch rows are None in exact mode"""
+        by_id = {sketch.customer_id: sketch for sketch in sketch_rows or ()}
+        empty = self._EMPTY_SKETCH if sketch_rows is not None else None
+
+        return [
+            self._to_customer_summary(
+                row.customer_id, row, by_id.get(row.customer_id, empty)
+            )
+            for row in rows
+        ]
+
+    def _to_product_summaries(self, rows, sketch_rows) -> List[ProductSummary]:
+        """Sketch rows are None in exact mode"""
+        by_id = {sketch.product_id: sketch for sketch in sketch_rows or ()}
+        empty = self._EMPTY_SKETCH if sketch_rows is not None else None
+
+        return [
+            self._to_product_summary(
+                row.product_id, row, by_id.get(row.product_id, empty)
+            )
+            for row in rows
+        ]
+
+    @staticmethod
+    def _summary_version(row, distinct: DistinctCountMode) -> str:
+        """Sketches change only with the rollup row, unless the precision changes"""
+        return etags.version(
+            row.__tablename__,
+            *(getattr(row, column.key) for column in row.__table__.columns),
+            distinct.value,
+            (
+                settings.summary_sketch_precision
+                if distinct is DistinctCountMode.APPROXIMATE
+                else None
+            ),
+        )
+
+    @staticmethod
+    def _estimate(sketch) -> int:
+        """Distinct count of set registers and their harmonic sum"""
+        return round(sketches.estimate(sketch.registers, float(sketch.harmonic_sum)))
+
+
+class TransactionRepository(_TransactionMapper):
+
+    class BulkWriteResult(NamedTuple):
+        inserted: int
+        skipped: int
+
+    _COLUMNS = (
+        "transaction_id, timestamp, amount, currency, customer_id, product_id, quantity"
+    )
+    _TABLE = TransactionActiveRecord.__tablename__
+    _STAGING_TABLE = f"{_TABLE}_staging"
+
+    _COPY_STATEMENT = f"COPY {{table}} ({_COLUMNS}) FROM STDIN WITH (FORMAT csv)"
+    _CREATE_STAGING_STATEMENT = (
+        f"CREATE TEMP TABLE IF NOT EXISTS {_STAGING_TABLE} "
+        f"(LIKE {_TABLE} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    )
+    ROLLUP_COLUMNS = "customer_id, product_id, quantity, amount, currency, timestamp"
+    _PLN_AMOUNT = (
+        "CASE currency "
+        + " ".join(
+            f"WHEN '{currency}' THEN amount * {rate}"
+            for currency, rate in _TransactionMapper._PLN_RATES.items()
+        )
+        + " ELSE amount END"
+    )
+    # Inserts the rows of ``source`` and adds them to the summary rollups in
+    # one statement, so both commit together. A pair of customer and product
+    # seen for the first time increments both unique counts, and every pair
+    # is added to the HyperLogLog sketches. Upserts follow key order,
+    # concurrent batches lock rollup rows in the same order.
+    ROLLUP_STATEMENT = f"""
+        WITH inserted AS ({{source}}),
+        pairs AS (
+            INSERT INTO customer_product (customer_id, product_id)
+            SELECT DISTINCT customer_id, product_id FROM inserted
+            ORDER BY customer_id, product_id
+            ON CONFLICT DO NOTHING
+            RETURNING customer_id, product_id
+        ),
+        customers AS (
+            INSERT INTO customer_summary AS summary (
+                customer_id, total_revenue, unique_products_count,
+                last_transaction_date, transactions_count
+            )
+            SELECT delta.customer_id, delta.revenue, coalesce(new.pairs, 0),
+                delta.last_timestamp, delta.transactions
+            FROM (
+                SELECT customer_id, sum({_PLN_AMOUNT}) AS revenue,
+                    max(timestamp) AS last_timestamp, count(*) AS transactions
+                FROM inserted GROUP BY customer_id
+            ) AS delta
+            LEFT JOIN (
+                SELECT customer_id, count(*) AS pairs FROM pairs GROUP BY customer_id
+            ) AS new USING (customer_id)
+            ORDER BY delta.customer_id
+            ON CONFLICT (customer_id) DO UPDATE SET
+                total_revenue = summary.total_revenue + excluded.total_revenue,
+                unique_products_count =
+                    summary.unique_products_count + excluded.unique_products_count,
+                last_transaction_date = greatest(
+                    summary.last_transaction_date, excluded.last_transaction_date
+                ),
+                transactions_count =
+                    summary.transactions_count + excluded.transactions_count
+        ),
+        products AS (
+            INSERT INTO product_summary AS summary (
+                product_id, total_quantity, total_revenue,
+                unique_customers_count, transactions_count
+            )
+            SELECT delta.product_id, delta.quantity, delta.revenue,
+                coalesce(new.pairs, 0), delta.transactions
+            FROM (
+                SELECT product_id, sum(quantity) AS quantity,
+                    sum({_PLN_AMOUNT}) AS revenue, count(*) AS transactions
+                FROM inserted GROUP BY product_id
+            ) AS delta
+            LEFT JOIN (
+                SELECT product_id, count(*) AS pairs FROM pairs GROUP BY product_id
+            ) AS new USING (product_id)
+            ORDER BY delta.product_id
+            ON CONFLICT (product_id) DO UPDATE SET
+                total_quantity = summary.total_quantity + excluded.total_quantity,
+                total_revenue = summary.total_revenue + excluded.total_revenue,
+                unique_customers_count =
+                    summary.unique_customers_count + excluded.unique_customers_count,
+                transactions_count =
+                    summary.transactions_count + excluded.transactions_count
+        ),
+        customer_sketches AS (
+            INSERT INTO customer_sketch AS sketch (customer_id, register, rank)
+            SELECT customer_id, {register_sql("hash")}, max({rank_sql("hash")})
+            FROM (
+                SELECT customer_id, {hash_sql("product_id")} AS hash FROM inserted
+            ) AS hashed
+            GROUP BY 1, 2 ORDER BY 1, 2
+            ON CONFLICT (customer_id, register) DO UPDATE SET rank = excluded.rank
+            WHERE sketch.rank < excluded.rank
+        ),
+        product_sketches AS (
+            INSERT INTO product_sketch AS sketch (product_id, register, rank)
+            SELECT product_id, {register_sql("hash")}, max({rank_sql("hash")})
+            FROM (
+                SELECT product_id, {hash_sql("customer_id")} AS hash FROM inserted
+            ) AS hashed
+            GROUP BY 1, 2 ORDER BY 1, 2
+            ON CONFLICT (product_id, register) DO UPDATE SET rank = excluded.rank
+            WHERE sketch.rank < excluded.rank
+        )
+        SELECT count(*) FROM inserted
+    """
+    _MERGE_STAGING_STATEMENT = ROLLUP_STATEMENT.format(
+        source=f"INSERT INTO {_TABLE} ({_COLUMNS}) "
+        f"SELECT {_COLUMNS} FROM {_STAGING_TABLE} {{on_conflict}} "
+        f"RETURNING {ROLLUP_COLUMNS}"
+    )
+    _ROLLUP_CREATED_STATEMENT = ROLLUP_STATEMENT.format(
+        source=f"SELECT {ROLLUP_COLUMNS} FROM {_TABLE} "
+        "WHERE transaction_id = %(transaction_id)s"
+    )
 
     def __init__(self, session: Session):
         self.session = session
@@ -31,19 +326,91 @@ class TransactionRepository:
         self.session.add(model)
         self.session.flush()
 
-        return self._from_active_record(transaction_model=model)
+        cursor = self.session.connection().connection.cursor()
+        cursor.execute(
+            self._ROLLUP_CREATED_STATEMENT,
+            {"transaction_id": str(model.transaction_id)},
+        )
+
+        return Transaction.from_row(model)
+
+    @catch_errors
+    def create_many(
+        self,
+        transactions: Iterable[Transaction],
+        batch_size: int = settings.bulk_write_batch_size,
+        on_conflict: DuplicateStrategy = DuplicateStrategy.FAIL,
+    ) -> BulkWriteResult:
+        """Streams transactions into the table with COPY, one statement per batch.
+
+        Each batch is copied into a temporary staging table and merged into
+        the table together with its summary rollups. With
+        ``DuplicateStrategy.SKIP`` the merge uses ``ON CONFLICT DO NOTHING``,
+        so rows whose transaction_id is already stored are skipped instead of
+        failing the write.
+        """
+        cursor = self.session.connection().connection.cursor()
+        transactions = iter(transactions)
+        inserted, skipped = 0, 0
+        merge = self._MERGE_STAGING_STATEMENT.format(
+            on_conflict=(
+                "ON CONFLICT (transaction_id) DO NOTHING"
+                if on_conflict is DuplicateStrategy.SKIP
+                else ""
+            )
+        )
+
+        cursor.execute(self._CREATE_STAGING_STATEMENT)
+
+        started = time.perf_counter()
+
+        while batch := list(islice(transactions, batch_size)):
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(self._to_copy_row(item) for item in batch)
+            buffer.seek(0)
+
+            cursor.copy_expert(
+                self._COPY_STATEMENT.format(table=self._STAGING_TABLE), buffer
+            )
+            cursor.execute(merge)
+            (written,) = cursor.fetchone()
+
+            inserted += written
+            skipped += len(batch) - written
+
+            cursor.execute(f"TRUNCATE {self._STAGING_TABLE}")
+
+        elapsed = time.perf_counter() - started
+
+        logger.info(
+            f"Bulk inserted {inserted} transactions, skipped {skipped}",
+            extra={
+                "extra": {
+                    "rows": inserted,
+                    "skipped": skipped,
+                    "seconds": round(elapsed, 3),
+                    "rows_per_second": round(inserted / elapsed) if elapsed else None,
+                }
+            },
+        )
+
+        return self.BulkWriteResult(inserted=inserted, skipped=skipped)
 
     def persist(self) -> None:
         self.session.commit()
+        count_cache.invalidate()
+
+    def savepoint(self) -> SessionTransaction:
+        """Nested transaction, its ``rollback`` drops only the writes made since"""
+        return self.session.begin_nested()
+
+    def rollback(self) -> None:
+        self.session.rollback()
 
     def get_by_id(self, transaction_id: UUID) -> Optional[Transaction]:
-        model = (
-            self.session.query(TransactionActiveRecord)
-            .filter(TransactionActiveRecord.transaction_id == transaction_id)
-            .first()
-        )
+        row = self.session.execute(queries.select_by_id(transaction_id)).first()
 
-        return self._from_active_record(model) if model else None
+        return Transaction.from_row(row) if row else None
 
     def fetch_paginated(
         self,
@@ -51,109 +418,589 @@ class TransactionRepository:
         page_size: int,
         customer_id: Optional[str] = None,
         product_id: Optional[str] = None,
+        include_total: bool = True,
     ) -> TransactionsPaginated:
+        total_count = (
+            self._count_total(customer_id=customer_id, product_id=product_id)
+            if include_total
+            else self.TotalCount(None, None)
+        )
 
-        query = self.session.query(TransactionActiveRecord)
+        rows = self.session.execute(
+            queries.select_paginated(page, page_size, customer_id, product_id)
+        ).all()
 
-        if customer_id:
-            query = query.filter(TransactionActiveRecord.customer_id == customer_id)
+        return self._to_paginated(total_count, page, page_size, rows)
 
-        if product_id:
-            query = query.filter(TransactionActiveRecord.product_id == product_id)
+    def _count_total(
+        self, customer_id=None, product_id=None
+    ) -> _TransactionMapper.TotalCount:
+        if cached := self._cached_count(customer_id, product_id):
+            return cached
 
-        total_count = query.count()
+        if not customer_id and not product_id:
+            estimate = self.session.scalar(queries.estimate_count())
 
-        models = (
-            query.order_by(desc(TransactionActiveRecord.timestamp))
-            .offset((page - 1) * page_size)
-            .limit(page_size)
-            .all()
+            if estimated := self._estimated_count(estimate):
+                return estimated
+
+        count = self.session.scalar(
+            queries.count_filtered(customer_id=customer_id, product_id=product_id)
         )
 
-        return TransactionsPaginated(
-            total_count=total_count,
-            page=page,
-            page_size=page_size,
-            items=[
-                self._from_active_record(transaction_model=model) for model in models
-            ],
+        return self._exact_count(count, customer_id, product_id)
+
+    def fetch_after(
+        self,
+        after: Optional[Tuple[datetime, UUID]],
+        page_size: int,
+        customer_id: Optional[str] = None,
+        product_id: Optional[str] = None,
+    ) -> TransactionsCursorPage:
+        rows = self.session.execute(
+            queries.select_after(after, page_size, customer_id, product_id)
+        ).all()
+
+        return self._to_cursor_page(page_size, rows)
+
+    def get_customer_summary(
+        self, customer_id: UUID, distinct: DistinctCountMode = DistinctCountMode.EXACT
+    ) -> Optional[CustomerSummary]:
+        row = self.session.get(CustomerSummaryActiveRecord, customer_id)
+
+        if not row:
+            return None
+
+        sketch = None
+        if distinct is DistinctCountMode.APPROXIMATE:
+            sketch = self.session.execute(
+                queries.summarize_customer_sketch(customer_id)
+            ).one()
+
+        return self._to_customer_summary(customer_id, row, sketch)
+
+    def get_product_summary(
+        self, product_id: UUID, distinct: DistinctCountMode = DistinctCountMode.EXACT
+    ) -> Optional[ProductSummary]:
+        row = self.session.get(ProductSummaryActiveRecord, product_id)
+
+        if not row:
+            return None
+
+        sketch = None
+        if distinct is DistinctCountMode.APPROXIMATE:
+            sketch = self.session.execute(
+                queries.summarize_product_sketch(product_id)
+            ).one()
+
+        return self._to_product_summary(product_id, row, sketch)
+
+    def _to_copy_row(self, transaction: Transaction) -> tuple:
+        return (
+            transaction.transaction_id,
+            transaction.timestamp.isoformat(),
+            transaction.amount,
+            transaction.currency.value,
+            transaction.customer_id,
+            transaction.product_id,
+            transaction.quantity,
         )
 
-    def get_customer_summary(self, customer_id: UUID) -> Optional[CustomerSummary]:
-        models = (
-            self.session.query(TransactionActiveRecord)
-            .filter(TransactionActiveRecord.customer_id == customer_id)
-            .all()
+
+class AsyncTransactionRepository(_TransactionMapper):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_by_id(self, transaction_id: UUID) -> Optional[Transaction]:
+        result = await self.session.execute(queries.select_by_id(transaction_id))
+        row = result.first()
+
+        return Transaction.from_row(row) if row else None
+
+    async def get_by_ids(self, transaction_ids: List[UUID]) -> List[Transaction]:
+        """Stored transactions of the ids, in no particular order"""
+        result = await self.session.execute(queries.select_by_ids(transaction_ids))
+
+        return [Transaction.from_row(row) for row in result]
+
+    async def stream(
+        self,
+        customer_id: Optional[UUID] = None,
+        product_id: Optional[UUID] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        chunk_size: int = settings.export_chunk_size,
+    ) -> AsyncIterator[List[Transaction]]:
+        """Matching transactions in chunks, read through a server-side cursor"""
+        result = await self.session.stream(
+            queries.select_export(customer_id, product_id, since, until),
+            execution_options={"yield_per": chunk_size},
         )
 
-        if not models:
-            return None
+        async for rows in result.partitions():
+            yield [Transaction.from_row(row) for row in rows]
 
-        revenue = sum(
-            self._convert_to_pln(model.amount, model.currency) for model in models
+    async def fetch_paginated(
+        self,
+        page: int,
+        page_size: int,
+        customer_id: Optional[str] = None,
+        product_id: Optional[str] = None,
+        include_total: bool = True,
+    ) -> TransactionsPaginated:
+        total_count = (
+            await self._count_total(customer_id=customer_id, product_id=product_id)
+            if include_total
+            else self.TotalCount(None, None)
         )
 
-        products = len(set(model.product_id for model in models))
+        result = await self.session.execute(
+            queries.select_paginated(page, page_size, customer_id, product_id)
+        )
 
-        last_transaction_date = max(model.timestamp for model in models)
+        return self._to_paginated(total_count, page, page_size, result.all())
 
-        return CustomerSummary(
-            customer_id=customer_id,
-            total_revenue=revenue,
-            unique_products_count=products,
-            last_transaction_date=last_transaction_date,
+    async def _count_total(
+        self, customer_id=None, product_id=None
+    ) -> _TransactionMapper.TotalCount:
+        if cached := self._cached_count(customer_id, product_id):
+            return cached
+
+        if not customer_id and not product_id:
+            estimate = await self.session.scalar(queries.estimate_count())
+
+            if estimated := self._estimated_count(estimate):
+                return estimated
+
+        count = await self.session.scalar(
+            queries.count_filtered(customer_id=customer_id, product_id=product_id)
         )
 
-    def get_product_summary(self, product_id: UUID) -> Optional[ProductSummary]:
-        models = (
-            self.session.query(TransactionActiveRecord)
-            .filter(TransactionActiveRecord.product_id == product_id)
-            .all()
+        return self._exact_count(count, customer_id, product_id)
+
+    async def fetch_after(
+        self,
+        after: Optional[Tuple[datetime, UUID]],
+        page_size: int,
+        customer_id: Optional[str] = None,
+        product_id: Optional[str] = None,
+    ) -> TransactionsCursorPage:
+        result = await self.session.execute(
+            queries.select_after(after, page_size, customer_id, product_id)
         )
 
-        if not models:
+        return self._to_cursor_page(page_size, result.all())
+
+    async def get_customer_summary(
+        self, customer_id: UUID, distinct: DistinctCountMode = DistinctCountMode.EXACT
+    ) -> Optional[CustomerSummary]:
+        row = await self.session.get(CustomerSummaryActiveRecord, customer_id)
+
+        if not row:
+            return None
+
+        sketch = None
+        if distinct is DistinctCountMode.APPROXIMATE:
+            result = await self.session.execute(
+                queries.summarize_customer_sketch(customer_id)
+            )
+            sketch = result.one()
+
+        return self._to_customer_summary(customer_id, row, sketch)
+
+    async def get_product_summary(
+        self, product_id: UUID, distinct: DistinctCountMode = DistinctCountMode.EXACT
+    ) -> Optional[ProductSummary]:
+        row = await self.session.get(ProductSummaryActiveRecord, product_id)
+
+        if not row:
             return None
 
-        total_quantity = sum(model.quantity for model in models)
+        sketch = None
+        if distinct is DistinctCountMode.APPROXIMATE:
+            result = await self.session.execute(
+                queries.summarize_product_sketch(product_id)
+            )
+            sketch = result.one()
 
-        revenue = sum(
-            self._convert_to_pln(model.amount, model.currency) for model in models
+        return self._to_product_summary(product_id, row, sketch)
+
+    async def get_customer_summaries(
+        self,
+        customer_ids: List[UUID],
+        distinct: DistinctCountMode = DistinctCountMode.EXACT,
+    ) -> List[CustomerSummary]:
+        """Summaries of the customers with transactions, in no particular order"""
+        rows = await self.session.scalars(
+            queries.select_customer_summaries(customer_ids)
         )
+        sketch_rows = None
+        if distinct is DistinctCountMode.APPROXIMATE:
+            sketch_rows = await self.session.execute(
+                queries.summarize_customer_sketches(customer_ids)
+            )
 
-        customers = len(set(model.customer_id for model in models))
+        return self._to_customer_summaries(rows.all(), sketch_rows)
 
-        return ProductSummary(
-            product_id=product_id,
-            total_quantity=total_quantity,
-            total_revenue=revenue,
-            unique_customers_count=customers,
-        )
-
-    def _from_active_record(
-        self, transaction_model: TransactionActiveRecord
-    ) -> Transaction:
-        return Transaction(
-            transaction_id=transaction_model.transaction_id,
-            timestamp=transaction_model.timestamp,
-            amount=transaction_model.amount,
-            currency=transaction_model.currency,
-            customer_id=transaction_model.customer_id,
-            product_id=transaction_model.product_id,
-            quantity=transaction_model.quantity,
-        )
-
-    def _convert_to_pln(self, amount: float, currency: str) -> float:
-        if currency == "PLN":
-            return amount
-        elif currency == "EUR":
-            return amount * self.CurrencyExchange.EUR
-        elif currency == "USD":
-            return amount * self.CurrencyExchange.USD
-        else:
-            return amount  # safeguard for undefined
+    async def get_product_summaries(
+        self,
+        product_ids: List[UUID],
+        distinct: DistinctCountMode = DistinctCountMode.EXACT,
+    ) -> List[ProductSummary]:
+        """Summaries of the products with transactions, in no particular order"""
+        rows = await self.session.scalars(queries.select_product_summaries(product_ids))
+        sketch_rows = None
+        if distinct is DistinctCountMode.APPROXIMATE:
+            sketch_rows = await self.session.execute(
+                queries.summarize_product_sketches(product_ids)
+            )
+
+        return self._to_product_summaries(rows.all(), sketch_rows)
+
+    async def get_customer_summary_version(
+        self, customer_id: UUID, distinct: DistinctCountMode = DistinctCountMode.EXACT
+    ) -> Optional[str]:
+        row = await self.session.get(CustomerSummaryActiveRecord, customer_id)
+
+        return self._summary_version(row, distinct) if row else None
+
+    async def get_product_summary_version(
+        self, product_id: UUID, distinct: DistinctCountMode = DistinctCountMode.EXACT
+    ) -> Optional[str]:
+        row = await self.session.get(ProductSummaryActiveRecord, product_id)
+
+        return self._summary_version(row, distinct) if row else None
+
+
+class IngestJobRepository:
+    _UNFINISHED = (IngestJobStatus.PENDING.value, IngestJobStatus.RUNNING.value)
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    @catch_errors
+    def create(
+        self,
+        job_id: UUID,
+        file_name: Optional[str],
+        spool_path: str,
+        on_conflict: DuplicateStrategy,
+        batch_size: int,
+        bytes_total: int,
+        upload_complete: bool = True,
+    ) -> IngestJob:
+        now = datetime.now(timezone.utc)
+        model = IngestJobActiveRecord(
+            job_id=job_id,
+            status=IngestJobStatus.PENDING.value,
+            file_name=file_name,
+            spool_path=spool_path,
+            on_conflict=on_conflict.value,
+            batch_size=batch_size,
+            bytes_total=bytes_total,
+            upload_complete=upload_complete,
+            created_at=now,
+            received_at=None if upload_complete else now,
+        )
+
+        self.session.add(model)
+        self.session.flush()
+
+        return self._from_active_record(job_model=model)
+
+    def persist(self) -> None:
+        self.session.commit()
+
+    def get_by_id(self, job_id: UUID) -> Optional[IngestJob]:
+        # Progress is written by the runner's sessions, never from the identity map
+        model = self.session.get(IngestJobActiveRecord, job_id, populate_existing=True)
+
+        return self._from_active_record(job_model=model) if model else None
+
+    def get_active_record(
+        self, job_id: UUID, for_update: bool = False
+    ) -> Optional[IngestJobActiveRecord]:
+        """``for_update`` locks the row until the transaction ends"""
+        return self.session.get(
+            IngestJobActiveRecord,
+            job_id,
+            with_for_update=for_update or None,
+            populate_existing=for_update,
+        )
+
+    def release(self) -> None:
+        """Ends the transaction without writing, releasing its row locks"""
+        self.session.rollback()
+
+    @catch_errors
+    def claim_unfinished(self, owner: str, stale_after: float) -> List[UUID]:
+        """Claims pending jobs and running ones without a heartbeat for ``stale_after``.
+
+        Rows locked by another transaction are skipped, so workers sweeping
+        at once split the jobs between them. Ids are in submission order.
+        Pending upload sessions are left to be queued by their next chunk.
+        """
+        model = IngestJobActiveRecord
+        claimed = self._claim(
+            select(model.job_id)
+            .where(
+                self._claimable(stale_after),
+                or_(
+                    model.upload_complete,
+                    model.status != IngestJobStatus.PENDING.value,
+                ),
+            )
+            .with_for_update(skip_locked=True),
+            owner=owner,
+        )
+
+        return [row.job_id for row in sorted(claimed, key=lambda row: row.created_at)]
+
+    @catch_errors
+    def claim(self, job_id: UUID, owner: str, stale_after: float) -> bool:
+        """Marks the job as running for ``owner``, False when it is not claimable.
+
+        Waits for the row lock, so of workers claiming the job at once one
+        succeeds and the others see it running. A job already claimed by
+        ``owner`` is claimed again.
+        """
+        model = IngestJobActiveRecord
+        claimed = self._claim(
+            select(model.job_id)
+            .where(
+                model.job_id == job_id,
+                or_(
+                    self._claimable(stale_after),
+                    and_(
+                        model.status == IngestJobStatus.RUNNING.value,
+                        model.owner == owner,
+                    ),
+                ),
+            )
+            .with_for_update(),
+            owner=owner,
+        )
+
+        return bool(claimed)
+
+    @catch_errors
+    def heartbeat(self, owner: str) -> None:
+        """Keeps the running jobs of ``owner`` from being claimed as stale"""
+        model = IngestJobActiveRecord
+
+        self.session.query(model).filter(
+            model.owner == owner, model.status == IngestJobStatus.RUNNING.value
+        ).update({model.heartbeat_at: func.now()}, synchronize_session=False)
+
+    @catch_errors
+    def set_status(
+        self, job_id: UUID, status: IngestJobStatus, error: Optional[str] = None
+    ) -> None:
+        values = {"status": status.value, "error": error}
+
+        if status in (IngestJobStatus.COMPLETED, IngestJobStatus.FAILED):
+            values["finished_at"] = datetime.now(timezone.utc)
+
+        self._query(job_id).update(values)
+
+    @catch_errors
+    def record_batch(
+        self,
+        job_id: UUID,
+        owner: str,
+        persisted: int,
+        failed: int,
+        skipped: int,
+        bytes_processed: int,
+        seconds: float,
+    ) -> bool:
+        """Adds a batch to job progress, it commits together with the batch rows.
+
+        False when the job is no longer claimed by ``owner``.
+        """
+        model = IngestJobActiveRecord
+
+        return bool(
+            self._query(job_id)
+            .filter(model.owner == owner)
+            .update(
+                {
+                    model.batches_committed: model.batches_committed + 1,
+                    model.rows_persisted: model.rows_persisted + persisted,
+                    model.rows_failed: model.rows_failed + failed,
+                    model.rows_skipped: model.rows_skipped + skipped,
+                    model.bytes_processed: bytes_processed,
+                    model.elapsed_seconds: model.elapsed_seconds + seconds,
+                }
+            )
+        )
+
+    @catch_errors
+    def record_upload(
+        self, job_id: UUID, bytes_total: int, upload_complete: Optional[bool] = None
+    ) -> None:
+        """``upload_complete`` is left as stored unless it is given"""
+        values = {"bytes_total": bytes_total, "received_at": datetime.now(timezone.utc)}
+
+        if upload_complete is not None:
+            values["upload_complete"] = upload_complete
+
+        self._query(job_id).update(values)
+
+    @catch_errors
+    def park(self, job_id: UUID, owner: str, bytes_read: int) -> bool:
+        """Hands a session waiting for chunks back to the queue of pending jobs.
+
+        False when a chunk past ``bytes_read`` or the commit of the session
+        was recorded meanwhile, the worker reads on then.
+        """
+        model = IngestJobActiveRecord
+
+        return bool(
+            self._query(job_id)
+            .filter(
+                model.owner == owner,
+                model.status == IngestJobStatus.RUNNING.value,
+                model.bytes_total <= bytes_read,
+                model.upload_complete.is_(False),
+            )
+            .update(
+                {model.status: IngestJobStatus.PENDING.value, model.owner: None},
+                synchronize_session=False,
+            )
+        )
+
+    @catch_errors
+    def expire_sessions(self, timeout: float, error: str) -> List[str]:
+        """Fails pending sessions without a chunk for ``timeout``, returns spool paths"""
+        model = IngestJobActiveRecord
+
+        return list(
+            self.session.execute(
+                update(model)
+                .where(
+                    model.status == IngestJobStatus.PENDING.value,
+                    model.upload_complete.is_(False),
+                    model.received_at < func.now() - timedelta(seconds=timeout),
+                )
+                .values(
+                    status=IngestJobStatus.FAILED.value,
+                    error=error,
+                    finished_at=func.now(),
+                )
+                .returning(model.spool_path)
+                .execution_options(synchronize_session=False)
+            ).scalars()
+        )
+
+    def is_upload_complete(self, job_id: UUID) -> bool:
+        return bool(
+            self.session.query(IngestJobActiveRecord.upload_complete)
+            .filter(IngestJobActiveRecord.job_id == job_id)
+            .scalar()
+        )
+
+    @catch_errors
+    def record_errors(
+        self,
+        job_id: UUID,
+        errors: List[IngestErrorGroup],
+        error_report_id: Optional[UUID],
+    ) -> None:
+        self._query(job_id).update(
+            {
+                "errors": [group.model_dump() for group in errors],
+                "error_report_id": error_report_id,
+            }
+        )
+
+    def _claim(self, claimable, owner: str) -> List[Row]:
+        model = IngestJobActiveRecord
+
+        return self.session.execute(
+            update(model)
+            .where(model.job_id.in_(claimable))
+            .values(
+                status=IngestJobStatus.RUNNING.value,
+                owner=owner,
+                heartbeat_at=func.now(),
+            )
+            .returning(model.job_id, model.created_at)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+    def _claimable(self, stale_after: float):
+        model = IngestJobActiveRecord
+
+        return or_(
+            model.status == IngestJobStatus.PENDING.value,
+            and_(
+                model.status == IngestJobStatus.RUNNING.value,
+                or_(
+                    model.heartbeat_at.is_(None),
+                    model.heartbeat_at < func.now() - timedelta(seconds=stale_after),
+                ),
+            ),
+        )
+
+    def _query(self, job_id: UUID):
+        return self.session.query(IngestJobActiveRecord).filter(
+            IngestJobActiveRecord.job_id == job_id
+        )
+
+    def _from_active_record(self, job_model: IngestJobActiveRecord) -> IngestJob:
+        rows_validated = (
+            job_model.rows_persisted + job_model.rows_failed + job_model.rows_skipped
+        )
+        rows_per_second, eta_seconds = None, None
+
+        if job_model.elapsed_seconds:
+            rows_per_second = round(rows_validated / job_model.elapsed_seconds, 1)
+
+        if (
+            job_model.bytes_processed
+            and job_model.upload_complete  # Size of a session is known on commit
+            and job_model.status in self._UNFINISHED
+        ):
+            remaining = max(job_model.bytes_total - job_model.bytes_processed, 0)
+            eta_seconds = round(
+                job_model.elapsed_seconds * remaining / job_model.bytes_processed, 1
+            )
+
+        return IngestJob(
+            job_id=job_model.job_id,
+            status=job_model.status,
+            file_name=job_model.file_name,
+            rows_validated=rows_validated,
+            rows_persisted=job_model.rows_persisted,
+            rows_failed=job_model.rows_failed,
+            rows_skipped=job_model.rows_skipped,
+            batches_committed=job_model.batches_committed,
+            bytes_received=job_model.bytes_total,
+            upload_complete=job_model.upload_complete,
+            rows_per_second=rows_per_second,
+            eta_seconds=eta_seconds,
+            error=job_model.error,
+            errors=job_model.errors or [],
+            error_report_id=job_model.error_report_id,
+            created_at=job_model.created_at,
+            finished_at=job_model.finished_at,
+        )
 
 
 def get_transaction_repository(
     session: Session = Depends(get_session),
 ) -> TransactionRepository:
     return TransactionRepository(session=session)
+
+
+def get_async_transaction_repository(
+    session: AsyncSession = Depends(get_async_session),
+) -> AsyncTransactionRepository:
+    return AsyncTransactionRepository(session=session)
+
+
+def get_ingest_job_repository(
+    session: Session = Depends(get_session),
+) -> IngestJobRepository:
+    return IngestJobRepository(session=session)
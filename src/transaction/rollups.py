@@ -0,0 +1,186 @@
+"""Verification and rebuild of the customer and product summary rollups.
+
+Ingest keeps the rollups in step with the transactions, a rebuild is
+needed once for transactions stored before the rollups existed, or after
+rows were changed bypassing the repository. HyperLogLog sketches are
+rebuilt too, being approximate they are not verified.
+
+Both read the whole table, their statements are bounded by
+``MAINTENANCE_STATEMENT_TIMEOUT`` instead of ``DB_STATEMENT_TIMEOUT``. A
+rebuild blocks ingest until it commits.
+
+Usage:
+    python -m src.transaction.rollups            # reports drift, exits 1 on drift
+    python -m src.transaction.rollups --rebuild  # recomputes from transactions
+"""
+
+__all__ = ("SummaryRollups",)
+
+import argparse
+import sys
+from typing import List, NamedTuple
+from uuid import UUID
+
+from sqlalchemy import Engine, func, or_, select, text
+
+from src.core.database import engine as default_engine
+from src.core.logging import logger
+from src.settings import settings
+from . import queries
+from .models.access import (
+    CustomerProductActiveRecord,
+    CustomerSketchActiveRecord,
+    CustomerSummaryActiveRecord,
+    ProductSketchActiveRecord,
+    ProductSummaryActiveRecord,
+    TransactionActiveRecord,
+)
+from .repository import TransactionRepository
+
+_DRIFT_EXAMPLES = 10
+
+
+class SummaryRollups:
+
+    class Drift(NamedTuple):
+        customers: int  # Summaries that differ from the transactions, or are missing
+        products: int
+        customer_examples: List[UUID]
+        product_examples: List[UUID]
+
+    def __init__(self, engine: Engine = default_engine):
+        self._engine = engine
+
+    def verify(self) -> Drift:
+        pln_rates = TransactionRepository._PLN_RATES
+
+        with self._engine.connect() as connection:
+            self._lift_statement_timeout(connection)
+            customers, customer_examples = self._drift(
+                connection,
+                expected=queries.summarize_customers(pln_rates).subquery(),
+                actual=CustomerSummaryActiveRecord,
+                key="customer_id",
+            )
+            products, product_examples = self._drift(
+                connection,
+                expected=queries.summarize_products(pln_rates).subquery(),
+                actual=ProductSummaryActiveRecord,
+                key="product_id",
+            )
+
+        return self.Drift(
+            customers=customers,
+            products=products,
+            customer_examples=customer_examples,
+            product_examples=product_examples,
+        )
+
+    def rebuild(self) -> None:
+        """Recomputes the rollups, ingest waits until the rebuild commits.
+
+        The table is locked against writes for the whole rebuild, which scans it.
+        """
+        source = (
+            f"SELECT {TransactionRepository.ROLLUP_COLUMNS} "
+            f"FROM {TransactionActiveRecord.__tablename__}"
+        )
+
+        with self._engine.begin() as connection:
+            self._lift_statement_timeout(connection)
+            connection.execute(
+                text(
+                    f"LOCK TABLE {TransactionActiveRecord.__tablename__} "
+                    "IN SHARE MODE"
+                )
+            )
+            connection.execute(
+                text(
+                    "TRUNCATE "
+                    + ", ".join(
+                        model.__tablename__
+                        for model in (
+                            CustomerSummaryActiveRecord,
+                            ProductSummaryActiveRecord,
+                            CustomerProductActiveRecord,
+                            CustomerSketchActiveRecord,
+                            ProductSketchActiveRecord,
+                        )
+                    )
+                )
+            )
+            rows = connection.exec_driver_sql(
+                TransactionRepository.ROLLUP_STATEMENT.format(source=source)
+            ).scalar()
+
+        logger.info(f"Rebuilt summary rollups from {rows} transactions")
+
+    @staticmethod
+    def _lift_statement_timeout(connection) -> None:
+        connection.execute(
+            text(
+                "SET LOCAL statement_timeout = "
+                f"{settings.maintenance_statement_timeout}"
+            )
+        )
+
+    @staticmethod
+    def _drift(connection, expected, actual, key: str):
+        expected_key, actual_key = expected.c[key], getattr(actual, key)
+        columns = [name for name in expected.c.keys() if name != key]
+
+        differs = (
+            select(func.coalesce(expected_key, actual_key).label(key))
+            .select_from(
+                expected.outerjoin(actual, expected_key == actual_key, full=True)
+            )
+            .where(
+                or_(
+                    *(
+                        expected.c[name].is_distinct_from(getattr(actual, name))
+                        for name in columns
+                    )
+                )
+            )
+            .subquery()
+        )
+
+        count = connection.scalar(select(func.count()).select_from(differs))
+        examples = connection.scalars(
+            select(differs.c[key]).limit(_DRIFT_EXAMPLES)
+        ).all()
+
+        return count, examples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    rollups = SummaryRollups()
+
+    if args.rebuild:
+        rollups.rebuild()
+        return
+
+    drift = rollups.verify()
+
+    if drift.customers or drift.products:
+        logger.warning(
+            f"Summary rollups drifted: {drift.customers} customers, "
+            f"{drift.products} products",
+            extra={
+                "extra": {
+                    "customer_examples": [str(id_) for id_ in drift.customer_examples],
+                    "product_examples": [str(id_) for id_ in drift.product_examples],
+                }
+            },
+        )
+        sys.exit(1)
+
+    logger.info("Summary rollups match the transactions")
+
+
+if __name__ == "__main__":
+    main()
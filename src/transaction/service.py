@@ -1,151 +1,576 @@
-import csv
 import io
-from typing import List, NamedTuple, Optional
-from uuid import UUID
+import os
+from datetime import datetime
+from typing import (
+    AsyncIterator,
+    BinaryIO,
+    Callable,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+)
+from uuid import UUID, uuid4
 
 from fastapi import Depends
-from pydantic import ValidationError
 
-from src.core.logging import logger
+from src.core.cache import MISSING, ComputeCache, LRUCacheBackend
+from src.settings import settings
 
+from .compression import open_upload
+from .cursor import decode_cursor
 from .errors import (
-    InvalidFileStructure,
     TransactionNotFound,
     CustomerSummaryNotFound,
+    IngestErrorReportNotFound,
+    InvalidFileStructure,
     ProductSummaryNotFound,
+    UnsupportedTransactionFormat,
 )
+from .ingest_errors import ErrorCollector, remove_expired_reports
 from .models.dto import (
+    BulkTransactionMemberResult,
     BulkTransactionResult,
+    DistinctCountMode,
+    DuplicateStrategy,
     Transaction,
+    TransactionsBatch,
+    TransactionsCursorPage,
     TransactionsPaginated,
     CustomerSummary,
     ProductSummary,
+    TransactionRecord,
+    UploadFormat,
 )
-from .repository import TransactionRepository, get_transaction_repository
+from .repository import (
+    AsyncTransactionRepository,
+    TransactionRepository,
+    get_async_transaction_repository,
+    get_transaction_repository,
+)
+from .validator import VALIDATORS, TransactionValidator
+
+
+# Customer and product summaries, shared by the services of the process
+report_cache = ComputeCache(
+    LRUCacheBackend(max_size=settings.report_cache_size, ttl=settings.report_cache_ttl)
+)
+
+
+def _report_key(kind: str, id_, distinct: DistinctCountMode) -> Hashable:
+    return kind, str(id_), distinct
 
 
-class TransactionValidator:
+def _report_keys(
+    transactions: Iterable[Transaction | TransactionRecord],
+) -> Set[Hashable]:
+    """Keys of every summary the transactions change"""
+    customers, products = set(), set()
 
-    _CSV_EXPECTED_HEADERS = {
-        "transaction_id",
-        "timestamp",
-        "amount",
-        "currency",
-        "customer_id",
-        "product_id",
-        "quantity",
+    for transaction in transactions:
+        customers.add(transaction.customer_id)
+        products.add(transaction.product_id)
+
+    return {
+        _report_key(kind, id_, distinct)
+        for kind, ids in (("customer", customers), ("product", products))
+        for id_ in ids
+        for distinct in DistinctCountMode
     }
 
-    class Result(NamedTuple):
-        validated_items: List[Transaction]
-        success: int
-        failure: int
 
-    def validate(self, content: bytes) -> Result:
-        validated = []
-        success, failure = 0, 0
-        seen_ids = set()
+class TransactionService:
+    def __init__(
+        self,
+        transaction_repository: TransactionRepository,
+        validator: TransactionValidator,
+        report_cache: ComputeCache = report_cache,
+    ):
+        self.transaction_repository = transaction_repository
+        self.validator = validator
+        self.report_cache = report_cache
 
-        reader = csv.DictReader(io.StringIO(content.decode()))
+    def get_by_id(self, transaction_id: UUID) -> Transaction:
+        transaction = self.transaction_repository.get_by_id(transaction_id)
 
-        # Validate headers
+        if not transaction:
+            raise TransactionNotFound
 
-        headers = set(reader.fieldnames or [])
+        return transaction
 
-        if headers != self._CSV_EXPECTED_HEADERS:
-            raise InvalidFileStructure(
-                f"Invalid CSV headers.\n"
-                f"Expected: {self._CSV_EXPECTED_HEADERS}\n"
-                f"Received: {headers}"
-            )
+    def fetch_paginated(
+        self,
+        page: int,
+        page_size: int,
+        customer_id: Optional[str] = None,
+        product_id: Optional[str] = None,
+        include_total: bool = True,
+    ) -> TransactionsPaginated:
+        """Offset page, ``total_count`` is left out unless ``include_total``.
 
-        # Validate rows
+        The total is exact for filtered listings and small tables, reused for
+        a few seconds, and the planner estimate for a large unfiltered table.
+        """
+        return self.transaction_repository.fetch_paginated(
+            page, page_size, customer_id, product_id, include_total
+        )
 
-        for idx, row in enumerate(reader, start=1):
-            try:
-                transaction = Transaction(**row)
+    def fetch_after_cursor(
+        self,
+        cursor: Optional[str],
+        page_size: int,
+        customer_id: Optional[str] = None,
+        product_id: Optional[str] = None,
+    ) -> TransactionsCursorPage:
+        """Keyset page following ``cursor``, the first page when it is None"""
+        after = decode_cursor(cursor) if cursor else None
+
+        return self.transaction_repository.fetch_after(
+            after, page_size, customer_id, product_id
+        )
 
-                if transaction.transaction_id in seen_ids:
-                    logger.error(
-                        f"Duplicate transaction_id: {transaction.transaction_id} in row {idx}"
+    def create_from_csv(
+        self,
+        content: bytes,
+        on_conflict: DuplicateStrategy = DuplicateStrategy.FAIL,
+    ) -> BulkTransactionResult:
+        return self.create_from_stream(
+            stream=io.BytesIO(content), on_conflict=on_conflict
+        )
+
+    def create_from_upload(
+        self,
+        stream: BinaryIO,
+        on_conflict: DuplicateStrategy = DuplicateStrategy.FAIL,
+    ) -> BulkTransactionResult:
+        """Like ``create_from_stream`` for plain, gzip, zstd and zip uploads.
+
+        Files are decompressed while they are validated, CSV, NDJSON, Parquet
+        and Arrow IPC are told apart by their leading bytes. Each file of a zip
+        archive is reported in ``members``, a member with invalid structure is
+        rolled back and reported there instead of failing the upload.
+
+        With ``DuplicateStrategy.FAIL`` the whole archive is one transaction,
+        with ``DuplicateStrategy.SKIP`` each member is committed on its own.
+        """
+        members = []
+        commit_members = on_conflict is DuplicateStrategy.SKIP
+        stale_reports = set()
+
+        try:
+            for upload_member in open_upload(stream=stream):
+                if upload_member.name is None:
+                    return self.create_from_stream(
+                        stream=upload_member.stream,
+                        on_conflict=on_conflict,
+                        format=upload_member.format,
+                    )
+
+                savepoint = self.transaction_repository.savepoint()
+
+                try:
+                    result = self._write_stream(
+                        stream=upload_member.stream,
+                        on_conflict=on_conflict,
+                        format=upload_member.format,
+                        stale_reports=stale_reports,
+                    )
+                except (InvalidFileStructure, UnsupportedTransactionFormat) as error:
+                    savepoint.rollback()  # Batches written before the error
+                    members.append(
+                        BulkTransactionMemberResult(
+                            name=upload_member.name, error=error.as_dict["message"]
+                        )
                     )
                     continue
 
-                seen_ids.add(transaction.transaction_id)  # Check duplicates
-                validated.append(transaction)
-                success += 1
+                savepoint.commit()
 
-            except ValidationError as error:
-                errors = [
-                    error.get("msg", "Invalid content") for error in error.errors()
-                ]
-                logger.error(f"Invalid row content: {idx}. Reason: {errors}")
-                failure += 1
+                if commit_members:
+                    self._persist(stale_reports)
 
-        return self.Result(validated_items=validated, success=success, failure=failure)
+                members.append(
+                    BulkTransactionMemberResult(
+                        name=upload_member.name,
+                        **result.model_dump(exclude={"members"}),
+                    )
+                )
+
+            if not commit_members:
+                self._persist(stale_reports)
+        except Exception:
+            self.transaction_repository.rollback()
+            raise
+
+        return BulkTransactionResult(
+            success=sum(member.success for member in members),
+            failure=sum(member.failure for member in members),
+            skipped=sum(member.skipped for member in members),
+            members=members,
+        )
 
+    def create_from_stream(
+        self,
+        stream: BinaryIO,
+        on_conflict: DuplicateStrategy = DuplicateStrategy.FAIL,
+        batch_size: int = settings.ingest_batch_size,
+        skip_batches: int = 0,
+        on_batch: Optional[
+            Callable[
+                [TransactionValidator.Result, TransactionRepository.BulkWriteResult],
+                None,
+            ]
+        ] = None,
+        format: UploadFormat = UploadFormat.CSV,
+        commit_batches: bool = False,
+    ) -> BulkTransactionResult:
+        """Validates and persists the stream in batches.
+
+        With ``DuplicateStrategy.FAIL`` the whole stream is one transaction, so
+        an already stored transaction_id rolls back every batch. Batches are
+        committed one by one with ``DuplicateStrategy.SKIP``, whose retries are
+        idempotent, or when ``commit_batches`` is set.
+
+        ``skip_batches`` leading batches are validated but not written again,
+        which resumes an interrupted ingest of the same stream. ``on_batch`` is
+        called after each batch is written, so writes it makes share its transaction.
+
+        Errors are summarized in the result, every invalid row is written to
+        an error report available through ``get_error_report_path``.
+        """
+        commit_batches = commit_batches or on_conflict is DuplicateStrategy.SKIP
+        stale_reports = set()
+
+        result = self._write_stream(
+            stream=stream,
+            on_conflict=on_conflict,
+            batch_size=batch_size,
+            skip_batches=skip_batches,
+            on_batch=on_batch,
+            format=format,
+            commit_batches=commit_batches,
+            stale_reports=stale_reports,
+        )
+
+        if not commit_batches:
+            self._persist(stale_reports)
+
+        return result
+
+    def _write_stream(
+        self,
+        stream: BinaryIO,
+        on_conflict: DuplicateStrategy,
+        stale_reports: Set[Hashable],
+        batch_size: int = settings.ingest_batch_size,
+        skip_batches: int = 0,
+        on_batch: Optional[Callable] = None,
+        format: UploadFormat = UploadFormat.CSV,
+        commit_batches: bool = False,
+    ) -> BulkTransactionResult:
+        """Batches of ``create_from_stream``, committed only with ``commit_batches``.
+
+        Summaries changed by uncommitted batches are added to ``stale_reports``,
+        the caller drops them once it commits.
+        """
+        success, failure, skipped = 0, 0, 0
+        report_id = uuid4()
+
+        os.makedirs(settings.ingest_report_directory, exist_ok=True)
+        errors = ErrorCollector(report_path=self._error_report_path(report_id))
+
+        try:
+            batches = self.validator.validate_stream(
+                stream=stream, batch_size=batch_size, errors=errors, format=format
+            )
+
+            for index, batch in enumerate(batches):
+                if index < skip_batches:
+                    continue  # Committed before the ingest was interrupted
+
+                written = self.transaction_repository.create_many(
+                    transactions=batch.validated_items, on_conflict=on_conflict
+                )
+
+                if on_batch:
+                    on_batch(batch, written)
+
+                if written.inserted:
+                    stale_reports |= _report_keys(batch.validated_items)
+
+                if commit_batches:
+                    self._persist(stale_reports)
+
+                success += written.inserted
+                failure += batch.failure
+                skipped += written.skipped
+        finally:
+            errors.close()
+
+        if errors.has_errors:
+            remove_expired_reports()
+
+        return BulkTransactionResult(
+            success=success,
+            failure=failure,
+            skipped=skipped,
+            errors=errors.summary(),
+            error_report_id=report_id if errors.has_errors else None,
+        )
+
+    def _persist(self, stale_reports: Set[Hashable]) -> None:
+        """Commits the written batches and drops the summaries they changed"""
+        self.transaction_repository.persist()
+
+        if stale_reports:
+            self.report_cache.invalidate(stale_reports)
+            stale_reports.clear()
+
+    def get_error_report_path(self, report_id: UUID) -> str:
+        path = self._error_report_path(report_id)
+
+        if not os.path.exists(path):
+            raise IngestErrorReportNotFound
+
+        return path
+
+    @staticmethod
+    def _error_report_path(report_id: UUID) -> str:
+        return os.path.join(settings.ingest_report_directory, f"{report_id}.csv")
+
+    def get_customer_summary(
+        self, customer_id: UUID, distinct: DistinctCountMode = DistinctCountMode.EXACT
+    ) -> CustomerSummary:
+        """Cached until ingest adds transactions of the customer"""
+
+        def compute() -> CustomerSummary:
+            summary = self.transaction_repository.get_customer_summary(
+                customer_id=customer_id, distinct=distinct
+            )
+
+            if not summary:
+                raise CustomerSummaryNotFound
+
+            return summary
+
+        return self.report_cache.get_or_compute(
+            _report_key("customer", customer_id, distinct), compute
+        )
+
+    def get_product_summary(
+        self, product_id: UUID, distinct: DistinctCountMode = DistinctCountMode.EXACT
+    ) -> ProductSummary:
+        """Cached until ingest adds transactions of the product"""
+
+        def compute() -> ProductSummary:
+            summary = self.transaction_repository.get_product_summary(
+                product_id=product_id, distinct=distinct
+            )
+
+            if not summary:
+                raise ProductSummaryNotFound
+
+            return summary
+
+        return self.report_cache.get_or_compute(
+            _report_key("product", product_id, distinct), compute
+        )
+
+
+class AsyncTransactionService:
+    """Read side of TransactionService for async request handlers"""
 
-class TransactionService:
     def __init__(
         self,
-        transaction_repository: TransactionRepository,
-        validator: TransactionValidator,
+        transaction_repository: AsyncTransactionRepository,
+        report_cache: ComputeCache = report_cache,
     ):
         self.transaction_repository = transaction_repository
-        self.validator = validator
+        self.report_cache = report_cache
 
-    def get_by_id(self, transaction_id: UUID) -> Transaction:
-        transaction = self.transaction_repository.get_by_id(transaction_id)
+    async def get_by_id(self, transaction_id: UUID) -> Transaction:
+        transaction = await self.transaction_repository.get_by_id(transaction_id)
 
         if not transaction:
             raise TransactionNotFound
 
         return transaction
 
-    def fetch_paginated(
+    def stream(
+        self,
+        customer_id: Optional[UUID] = None,
+        product_id: Optional[UUID] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> AsyncIterator[List[Transaction]]:
+        return self.transaction_repository.stream(
+            customer_id=customer_id, product_id=product_id, since=since, until=until
+        )
+
+    async def get_by_ids(self, transaction_ids: List[UUID]) -> TransactionsBatch:
+        transaction_ids = list(dict.fromkeys(transaction_ids))
+        found = {
+            transaction.transaction_id: transaction
+            for transaction in await self.transaction_repository.get_by_ids(
+                transaction_ids
+            )
+        }
+
+        return TransactionsBatch(
+            items=[found[id_] for id_ in transaction_ids if id_ in found],
+            missing=[id_ for id_ in transaction_ids if id_ not in found],
+        )
+
+    async def fetch_paginated(
         self,
         page: int,
         page_size: int,
         customer_id: Optional[str] = None,
         product_id: Optional[str] = None,
+        include_total: bool = True,
     ) -> TransactionsPaginated:
+        return await self.transaction_repository.fetch_paginated(
+            page, page_size, customer_id, product_id, include_total
+        )
 
-        return self.transaction_repository.fetch_paginated(
-            page, page_size, customer_id, product_id
+    async def fetch_after_cursor(
+        self,
+        cursor: Optional[str],
+        page_size: int,
+        customer_id: Optional[str] = None,
+        product_id: Optional[str] = None,
+    ) -> TransactionsCursorPage:
+        after = decode_cursor(cursor) if cursor else None
+
+        return await self.transaction_repository.fetch_after(
+            after, page_size, customer_id, product_id
         )
 
-    def create_from_csv(self, content: bytes) -> BulkTransactionResult:
-        result = self.validator.validate(content=content)
+    async def get_customer_summary(
+        self, customer_id: UUID, distinct: DistinctCountMode = DistinctCountMode.EXACT
+    ) -> CustomerSummary:
+        async def compute() -> CustomerSummary:
+            summary = await self.transaction_repository.get_customer_summary(
+                customer_id=customer_id, distinct=distinct
+            )
 
-        for transaction in result.validated_items:
-            self.transaction_repository.create(transaction=transaction)
+            if not summary:
+                raise CustomerSummaryNotFound
 
-        self.transaction_repository.persist()
+            return summary
+
+        return await self.report_cache.get_or_compute_async(
+            _report_key("customer", customer_id, distinct), compute
+        )
 
-        return BulkTransactionResult(success=result.success, failure=result.failure)
+    async def get_product_summary(
+        self, product_id: UUID, distinct: DistinctCountMode = DistinctCountMode.EXACT
+    ) -> ProductSummary:
+        async def compute() -> ProductSummary:
+            summary = await self.transaction_repository.get_product_summary(
+                product_id=product_id, distinct=distinct
+            )
+
+            if not summary:
+                raise ProductSummaryNotFound
 
-    def get_customer_summary(self, customer_id: UUID) -> CustomerSummary:
-        summary = self.transaction_repository.get_customer_summary(
-            customer_id=customer_id
+            return summary
+
+        return await self.report_cache.get_or_compute_async(
+            _report_key("product", product_id, distinct), compute
         )
 
-        if not summary:
+    async def get_customer_summaries(
+        self,
+        customer_ids: List[UUID],
+        distinct: DistinctCountMode = DistinctCountMode.EXACT,
+    ) -> List[CustomerSummary]:
+        """In the order of the ids, customers without transactions are left out.
+
+        Not cached, a bulk refresh would evict every single summary.
+        """
+        customer_ids = list(dict.fromkeys(customer_ids))
+        found = {
+            summary.customer_id: summary
+            for summary in await self.transaction_repository.get_customer_summaries(
+                customer_ids=customer_ids, distinct=distinct
+            )
+        }
+
+        return [found[id_] for id_ in customer_ids if id_ in found]
+
+    async def get_product_summaries(
+        self,
+        product_ids: List[UUID],
+        distinct: DistinctCountMode = DistinctCountMode.EXACT,
+    ) -> List[ProductSummary]:
+        """In the order of the ids, products without transactions are left out.
+
+        Not cached, a bulk refresh would evict every single summary.
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        found = {
+            summary.product_id: summary
+            for summary in await self.transaction_repository.get_product_summaries(
+                product_ids=product_ids, distinct=distinct
+            )
+        }
+
+        return [found[id_] for id_ in product_ids if id_ in found]
+
+    async def get_customer_summary_version(
+        self, customer_id: UUID, distinct: DistinctCountMode = DistinctCountMode.EXACT
+    ) -> str:
+        """Version of the summary get_customer_summary returns, without building it"""
+        summary = self.report_cache.peek(_report_key("customer", customer_id, distinct))
+
+        if summary is not MISSING:
+            return summary.version
+
+        version = await self.transaction_repository.get_customer_summary_version(
+            customer_id=customer_id, distinct=distinct
+        )
+
+        if not version:
             raise CustomerSummaryNotFound
 
-        return summary
+        return version
+
+    async def get_product_summary_version(
+        self, product_id: UUID, distinct: DistinctCountMode = DistinctCountMode.EXACT
+    ) -> str:
+        """Version of the summary get_product_summary returns, without building it"""
+        summary = self.report_cache.peek(_report_key("product", product_id, distinct))
 
-    def get_product_summary(self, product_id: UUID) -> ProductSummary:
-        summary = self.transaction_repository.get_product_summary(product_id=product_id)
+        if summary is not MISSING:
+            return summary.version
 
-        if not summary:
+        version = await self.transaction_repository.get_product_summary_version(
+            product_id=product_id, distinct=distinct
+        )
+
+        if not version:
             raise ProductSummaryNotFound
 
-        return summary
+        return version
 
 
 def get_transaction_service(
     transaction_repository: TransactionRepository = Depends(get_transaction_repository),
 ) -> TransactionService:
     return TransactionService(
-        transaction_repository=transaction_repository, validator=TransactionValidator()
+        transaction_repository=transaction_repository,
+        validator=VALIDATORS[settings.ingest_validator](
+            workers=settings.validation_workers,
+            part_size=settings.validation_chunk_size,
+        ),
     )
+
+
+def get_async_transaction_service(
+    transaction_repository: AsyncTransactionRepository = Depends(
+        get_async_transaction_repository
+    ),
+) -> AsyncTransactionService:
+    return AsyncTransactionService(transaction_repository=transaction_repository)
@@ -0,0 +1,57 @@
+"""HyperLogLog sketches of distinct customers per product and products per customer.
+
+A sketch has ``2 ** precision`` registers stored as rows, register and rank
+of every id come from its 64 bit hash: the leading ``precision`` bits pick
+the register, the rank is the position of the first set bit in the rest.
+Registers keep the highest rank seen, so sketches merge by taking the
+maximum per register, in any order and any number of times.
+
+Changing ``settings.summary_sketch_precision`` needs a rollup rebuild.
+"""
+
+__all__ = ("hash_sql", "register_sql", "rank_sql", "estimate", "standard_error")
+
+import math
+
+from src.settings import settings
+
+
+def hash_sql(column: str) -> str:
+    return f"uuid_hash_extended({column}, 0)"
+
+
+def register_sql(hash: str, precision: int = settings.summary_sketch_precision) -> str:
+    # The shift keeps the sign, the mask drops it
+    return f"(({hash} >> {64 - precision}) & {(1 << precision) - 1})"
+
+
+def rank_sql(hash: str, precision: int = settings.summary_sketch_precision) -> str:
+    return (
+        f"coalesce(nullif(position(B'1' in substring({hash}::bit(64) "
+        f"from {precision + 1})), 0), {65 - precision})"
+    )
+
+
+def estimate(
+    registers: int,
+    harmonic_sum: float,
+    precision: int = settings.summary_sketch_precision,
+) -> float:
+    """Distinct count from the set registers and the sum of ``2 ** -rank`` over them"""
+    size = 1 << precision
+    empty = size - registers
+    raw = _alpha(size) * size * size / (harmonic_sum + empty)
+
+    if raw <= 2.5 * size and empty:
+        return size * math.log(size / empty)  # Linear counting, small cardinalities
+
+    return raw
+
+
+def standard_error(precision: int = settings.summary_sketch_precision) -> float:
+    """Relative standard error of an estimate"""
+    return 1.04 / math.sqrt(1 << precision)
+
+
+def _alpha(size: int) -> float:
+    return {16: 0.673, 32: 0.697, 64: 0.709}.get(size, 0.7213 / (1 + 1.079 / size))
@@ -0,0 +1,1030 @@
+__all__ = (
+    "TransactionValidator",
+    "ColumnarTransactionValidator",
+    "VALIDATORS",
+)
+
+import codecs
+import csv
+import io
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from itertools import chain, islice, repeat
+from operator import attrgetter
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import orjson
+from pydantic import ValidationError
+
+from src.settings import settings
+
+from .errors import InvalidFileStructure
+from .formats import iter_record_batches
+from .ingest_errors import ErrorCollector, RowError
+from .models.dto import Currency, Transaction, TransactionRecord, UploadFormat
+
+try:
+    import pyarrow
+    import pyarrow.compute
+except ImportError:  # Optional, see formats.iter_record_batches
+    pyarrow = None
+
+Row = List[str]
+
+
+class _Block(NamedTuple):
+    """Consecutive non blank CSV rows.
+
+    Blocks of plain (unquoted) lines with the expected number of fields are
+    split straight into columns, any other block is kept as rows.
+    """
+
+    start: int  # Number of the first row in the file
+    size: int
+    rows: Optional[List[Row]] = None
+    columns: Optional[List[List[str]]] = None
+
+    def row(self, position: int) -> Row:
+        if self.rows is not None:
+            return self.rows[position]
+
+        return [column[position] for column in self.columns]
+
+
+class TransactionValidator:
+
+    _CSV_EXPECTED_HEADERS = {
+        "transaction_id",
+        "timestamp",
+        "amount",
+        "currency",
+        "customer_id",
+        "product_id",
+        "quantity",
+    }
+
+    _BLOCK_SIZE = 4096  # Rows handed to _validate_block at once
+
+    class Result(NamedTuple):
+        validated_items: List[Transaction | TransactionRecord]
+        success: int
+        failure: int
+
+    def __init__(
+        self,
+        workers: int = settings.validation_workers,
+        part_size: int = settings.validation_chunk_size,
+    ):
+        """
+        :param workers: processes validating in parallel, 1 validates in place
+        :param part_size: approximate size in bytes of the file chunk given
+            to a single worker
+        """
+        self._workers = workers
+        self._part_size = part_size
+
+    def validate(self, content: bytes) -> Result:
+        validated = []
+        success, failure = 0, 0
+
+        for batch in self.validate_stream(stream=io.BytesIO(content)):
+            validated.extend(batch.validated_items)
+            success += batch.success
+            failure += batch.failure
+
+        return self.Result(validated_items=validated, success=success, failure=failure)
+
+    def validate_stream(
+        self,
+        stream: BinaryIO,
+        batch_size: int = settings.ingest_batch_size,
+        chunk_size: int = settings.ingest_read_chunk_size,
+        errors: Optional[ErrorCollector] = None,
+        format: UploadFormat = UploadFormat.CSV,
+    ) -> Iterator[Result]:
+        """Validates a file read from a binary stream, yielding bounded batches.
+
+        Counts in each yielded result refer to that batch only. Invalid and
+        duplicate rows are reported to ``errors``. Typed formats skip text
+        parsing for the columns they store typed, see ``_validate_record_batch``.
+        """
+        errors = ErrorCollector() if errors is None else errors
+
+        if format is UploadFormat.CSV:
+            blocks = self._validate_csv(stream=stream, chunk_size=chunk_size)
+        elif format is UploadFormat.NDJSON:
+            blocks = self._validate_ndjson(
+                lines=_iter_lines(stream=stream, chunk_size=chunk_size)
+            )
+        else:
+            blocks = self._validate_record_batches(
+                batches=iter_record_batches(
+                    stream=stream, format=format, batch_rows=self._BLOCK_SIZE
+                )
+            )
+
+        yield from self._batch(blocks=blocks, batch_size=batch_size, errors=errors)
+
+    def _validate_csv(
+        self, stream: BinaryIO, chunk_size: int
+    ) -> Iterator[Tuple[int, list, List[RowError]]]:
+        if self._workers > 1:
+            header, stream = _split_header(stream=stream, chunk_size=chunk_size)
+            headers = _read_row(header.decode(), iter(()))
+        else:
+            lines = _iter_lines(stream=stream, chunk_size=chunk_size)
+            headers = _read_row(next(lines, ""), lines)
+
+        # Validate headers
+
+        if set(headers) != self._CSV_EXPECTED_HEADERS:
+            raise InvalidFileStructure(
+                f"Invalid CSV headers.\n"
+                f"Expected: {self._CSV_EXPECTED_HEADERS}\n"
+                f"Received: {set(headers)}"
+            )
+
+        # Validate rows
+
+        if self._workers > 1:
+            yield from self._validate_parallel(
+                headers=headers, stream=stream, chunk_size=chunk_size
+            )
+        else:
+            yield from self._validate_sequential(headers=headers, lines=lines)
+
+    def _batch(
+        self,
+        blocks: Iterator[Tuple[int, list, List[RowError]]],
+        batch_size: int,
+        errors: ErrorCollector,
+    ) -> Iterator[Result]:
+        """Drops duplicate rows of validated blocks and regroups them in batches"""
+        validated = []
+        failure = 0
+        seen_ids = set()
+
+        for start, items, block_errors in blocks:
+            errors.extend(block_errors)
+
+            valid = list(filter(None, items))
+            ids = list(map(attrgetter("transaction_id"), valid))
+            failure += len(items) - len(valid)
+
+            # Check duplicates, row by row only when the block has any
+            if len(set(ids)) == len(ids) and seen_ids.isdisjoint(ids):
+                seen_ids.update(ids)
+                validated.extend(valid)
+            else:
+                for idx, transaction in enumerate(items, start=start):
+                    if transaction is None:
+                        continue
+
+                    if transaction.transaction_id in seen_ids:
+                        errors.add(
+                            RowError(
+                                row=idx,
+                                column="transaction_id",
+                                reason="duplicate",
+                                message=f"Duplicate transaction_id: {transaction.transaction_id}",
+                            )
+                        )
+                        continue
+
+                    seen_ids.add(transaction.transaction_id)
+                    validated.append(transaction)
+
+            while len(validated) >= batch_size:
+                yield self.Result(
+                    validated_items=validated[:batch_size],
+                    success=batch_size,
+                    failure=failure,
+                )
+                validated = validated[batch_size:]
+                failure = 0
+
+        yield self.Result(
+            validated_items=validated, success=len(validated), failure=failure
+        )
+
+    def _validate_ndjson(
+        self, lines: Iterator[str]
+    ) -> Iterator[Tuple[int, list, List[RowError]]]:
+        """Validates one JSON object per line with the CSV row validation.
+
+        Values are passed on as text and matched to columns by key, each
+        missing or unknown key of an object is reported as an error of its row.
+        """
+        headers = sorted(self._CSV_EXPECTED_HEADERS)
+        rows, start = [], 1
+
+        for idx, line in enumerate(lines, start=1):
+            try:
+                item = orjson.loads(line) if line.strip() else None
+            except orjson.JSONDecodeError as error:
+                item = error
+
+            row_errors = self._object_errors(idx=idx, line=line, item=item)
+
+            if isinstance(item, dict) and not row_errors:
+                rows.append(
+                    ["" if item[key] is None else str(item[key]) for key in headers]
+                )
+
+                if len(rows) < self._BLOCK_SIZE:
+                    continue
+
+            if rows:
+                errors = []
+                block = _Block(start=start, size=len(rows), rows=rows)
+                yield start, self._validate_block(
+                    headers=headers, block=block, errors=errors
+                ), errors
+
+            if row_errors:
+                yield idx, [None], row_errors
+
+            rows, start = [], idx + 1
+
+        if rows:
+            errors = []
+            block = _Block(start=start, size=len(rows), rows=rows)
+            yield start, self._validate_block(
+                headers=headers, block=block, errors=errors
+            ), errors
+
+    def _object_errors(self, idx: int, line: str, item: Any) -> List[RowError]:
+        if item is None:
+            return []
+
+        if not isinstance(item, dict):
+            return [
+                RowError(
+                    row=idx,
+                    column=None,
+                    reason="json_invalid",
+                    message=f"Expected a JSON object, received: {line.strip()[:100]}",
+                )
+            ]
+
+        return [
+            RowError(row=idx, column=key, reason="missing", message="Field required")
+            for key in sorted(self._CSV_EXPECTED_HEADERS - item.keys())
+        ] + [
+            RowError(
+                row=idx,
+                column=str(key),
+                reason="unknown_field",
+                message=f"Unknown field: {key}",
+            )
+            for key in sorted(item.keys() - self._CSV_EXPECTED_HEADERS)
+        ]
+
+    def _validate_record_batches(
+        self, batches: Iterator["pyarrow.RecordBatch"]
+    ) -> Iterator[Tuple[int, list, List[RowError]]]:
+        start = 1
+
+        for batch in batches:
+            if set(batch.schema.names) != self._CSV_EXPECTED_HEADERS:
+                raise InvalidFileStructure(
+                    f"Invalid columns.\n"
+                    f"Expected: {self._CSV_EXPECTED_HEADERS}\n"
+                    f"Received: {set(batch.schema.names)}"
+                )
+
+            errors = []
+            items = self._validate_record_batch(batch=batch, start=start, errors=errors)
+
+            yield start, items, errors
+            start += batch.num_rows
+
+    def _validate_record_batch(
+        self, batch: "pyarrow.RecordBatch", start: int, errors: List[RowError]
+    ) -> List[Optional[Transaction | TransactionRecord]]:
+        """Validates rows of typed values with the Transaction model"""
+        headers = batch.schema.names
+
+        return [
+            self._validate_row(
+                idx=start + position,
+                headers=headers,
+                row=list(item.values()),
+                errors=errors,
+            )
+            for position, item in enumerate(batch.to_pylist())
+        ]
+
+    def _validate_sequential(
+        self, headers: Row, lines: Iterator[str]
+    ) -> Iterator[Tuple[int, list, List[RowError]]]:
+        for block in _iter_blocks(lines, width=len(headers), size=self._BLOCK_SIZE):
+            errors = []
+            items = self._validate_block(headers=headers, block=block, errors=errors)
+
+            yield block.start, items, errors
+
+    def _validate_parallel(
+        self, headers: Row, stream: BinaryIO, chunk_size: int
+    ) -> Iterator[Tuple[int, list, List[RowError]]]:
+        """Validates parts of the file in a process pool, in the file order.
+
+        Parts are cut at row boundaries. Row numbers of a part are counted
+        from the lines of previous parts, so they match the row numbers of
+        sequential validation unless the file has blank or multi line rows.
+        """
+        first_row = 1
+        pending = deque()
+
+        with ProcessPoolExecutor(max_workers=self._workers) as executor:
+            for part in _iter_parts(
+                stream=stream, part_size=self._part_size, chunk_size=chunk_size
+            ):
+                pending.append(
+                    executor.submit(_validate_part, self, headers, part, first_row)
+                )
+                first_row += part.count(b"\n")
+
+                if len(pending) >= 2 * self._workers:  # Bounds memory in flight
+                    for start, packed, errors in pending.popleft().result():
+                        yield start, self._unpack_items(packed), errors
+
+            while pending:
+                for start, packed, errors in pending.popleft().result():
+                    yield start, self._unpack_items(packed), errors
+
+    @staticmethod
+    def _pack_items(items: list) -> object:
+        """Prepares validated items to be sent back from a worker process"""
+        return items
+
+    @staticmethod
+    def _unpack_items(packed: object) -> list:
+        return packed
+
+    def _validate_block(
+        self, headers: Row, block: _Block, errors: List[RowError]
+    ) -> List[Optional[Transaction | TransactionRecord]]:
+        """Returns validated items aligned with the block, None for invalid rows.
+
+        Reasons of invalid rows are appended to ``errors``.
+        """
+        return [
+            self._validate_row(
+                idx=block.start + position,
+                headers=headers,
+                row=block.row(position),
+                errors=errors,
+            )
+            for position in range(block.size)
+        ]
+
+    def _validate_row(
+        self, idx: int, headers: Row, row: Row, errors: List[RowError]
+    ) -> Optional[Transaction]:
+        if len(row) != len(headers):
+            errors.append(
+                RowError(
+                    row=idx,
+                    column=None,
+                    reason="field_count",
+                    message=f"Expected {len(headers)} fields, received {len(row)}",
+                )
+            )
+            return None
+
+        try:
+            return Transaction(**dict(zip(headers, row)))
+
+        except ValidationError as error:
+            errors.extend(
+                RowError(
+                    row=idx,
+                    column=str(detail["loc"][0]) if detail["loc"] else None,
+                    reason=detail["type"],
+                    message=detail.get("msg", "Invalid content"),
+                )
+                for detail in error.errors()
+            )
+            return None
+
+
+class _Column:
+    """Parses a whole CSV column at once.
+
+    ``pattern`` describes the canonical textual form of a value. When every
+    value of the column matches it, the column is checked with a single regex
+    run over the joined values and parsed with ``parse`` in one pass. Values
+    outside of the canonical form are reported as invalid and left to the
+    pydantic model to judge.
+    """
+
+    def __init__(self, pattern: str, parse: Callable[[str], object]):
+        self._value = re.compile(pattern)
+        self._column = re.compile(f"(?:{pattern}\n)*")
+        self._parse = parse
+
+    def parse(self, values: Sequence[str]) -> Tuple[list, Set[int]]:
+        """Returns parsed values and positions of the invalid ones"""
+        joined = "\n".join(values) + "\n"
+
+        if joined.count("\n") == len(values) and self._matches(joined, len(values)):
+            try:
+                return self._parse_joined(joined, values), set()
+            except ValueError:
+                pass  # e.g. a calendar invalid date, resolved value by value below
+
+        parsed, invalid = [], set()
+
+        for position, value in enumerate(values):
+            try:
+                if not self._value.fullmatch(value):
+                    raise ValueError
+                parsed.append(self._parse(value))
+            except ValueError:
+                parsed.append(None)
+                invalid.add(position)
+
+        return parsed, invalid
+
+    def _matches(self, joined: str, count: int) -> bool:
+        return self._column.fullmatch(joined) is not None
+
+    def _parse_joined(self, joined: str, values: Sequence[str]) -> list:
+        return list(map(self._parse, values))
+
+
+class _UUIDColumn(_Column):
+    """Keeps canonical, lower case UUID strings as they are"""
+
+    _PATTERN = "[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+    _HEX_CHARACTERS = str.maketrans("", "", "0123456789abcdef-\n")
+
+    def __init__(self):
+        super().__init__(self._PATTERN, str)
+
+    def _matches(self, joined: str, count: int) -> bool:
+        # Fixed width values: check separators by position instead of a regex
+        return (
+            len(joined) == 37 * count
+            and joined[8::37] == joined[13::37] == joined[18::37] == joined[23::37]
+            and joined[8::37] == "-" * count
+            and joined[36::37] == "\n" * count
+            and joined.count("-") == 4 * count
+            and not joined.translate(self._HEX_CHARACTERS)
+        )
+
+    def _parse_joined(self, joined: str, values: Sequence[str]) -> list:
+        return list(values)
+
+
+class _TimestampColumn(_Column):
+    _PATTERN = (
+        r"\d{4}-\d{2}-\d{2}[T ](?:[01]\d|2[0-3]):[0-5]\d:[0-5]\d(?:\.\d{1,6})?"
+        r"(?:Z|[+-](?:[01]\d|2[0-3]):[0-5]\d)?"
+    )
+
+    def __init__(self):
+        super().__init__(self._PATTERN, self._parse_timestamp)
+
+    def _parse_joined(self, joined: str, values: Sequence[str]) -> list:
+        # datetime.fromisoformat accepts "Z" only since Python 3.11
+        values = joined.replace("Z\n", "+00:00\n").split("\n")
+        values.pop()
+
+        return list(map(datetime.fromisoformat, values))
+
+    @staticmethod
+    def _parse_timestamp(value: str) -> datetime:
+        if value[-1] == "Z":
+            value = value[:-1] + "+00:00"
+
+        return datetime.fromisoformat(value)
+
+
+_CURRENCIES: Dict[str, Currency] = {currency.value: currency for currency in Currency}
+
+
+class ColumnarTransactionValidator(TransactionValidator):
+    """Validates blocks of rows column by column, without a pydantic model per row.
+
+    UUIDs, numbers and timestamps in their canonical form are checked for
+    the whole block at once and emitted as TransactionRecord. Rows with any
+    other value fall back to the Transaction model, so counts and validated
+    rows are the same as with TransactionValidator.
+    """
+
+    _UUID = _UUIDColumn()
+    _TIMESTAMP = _TimestampColumn()
+    _AMOUNT = _Column(r"\d+(?:\.\d+)?", float)
+    _QUANTITY = _Column(r"\d+", int)
+
+    def _validate_block(
+        self, headers: Row, block: _Block, errors: List[RowError]
+    ) -> List[Optional[TransactionRecord]]:
+        if block.columns is not None:
+            regular = range(block.size)
+            columns = dict(zip(headers, block.columns))
+        else:
+            regular = [
+                position
+                for position, row in enumerate(block.rows)
+                if len(row) == len(headers)
+            ]
+            columns = dict(
+                zip(headers, zip(*(block.rows[position] for position in regular)))
+            )
+
+        if not columns:
+            return [
+                self._fallback(
+                    block=block, headers=headers, position=position, errors=errors
+                )
+                for position in range(block.size)
+            ]
+
+        invalid = set()
+
+        transaction_ids, invalid_ = self._UUID.parse(columns["transaction_id"])
+        invalid |= invalid_
+        customer_ids, invalid_ = self._UUID.parse(columns["customer_id"])
+        invalid |= invalid_
+        product_ids, invalid_ = self._UUID.parse(columns["product_id"])
+        invalid |= invalid_
+        timestamps, invalid_ = self._TIMESTAMP.parse(columns["timestamp"])
+        invalid |= invalid_
+
+        amounts, invalid_ = self._AMOUNT.parse(columns["amount"])
+        invalid |= invalid_ | self._not_positive(amounts)
+        quantities, invalid_ = self._QUANTITY.parse(columns["quantity"])
+        invalid |= invalid_ | self._not_positive(quantities)
+
+        currencies = list(map(_CURRENCIES.get, columns["currency"]))
+        if None in currencies:
+            invalid |= {
+                position for position, value in enumerate(currencies) if value is None
+            }
+
+        records = list(
+            map(
+                partial(tuple.__new__, TransactionRecord),  # _make without the overhead
+                zip(
+                    transaction_ids,
+                    timestamps,
+                    amounts,
+                    currencies,
+                    customer_ids,
+                    product_ids,
+                    quantities,
+                ),
+            )
+        )
+
+        if len(records) == block.size and not invalid:
+            return records
+
+        results = [None] * block.size
+
+        for position, record in zip(regular, records):
+            results[position] = record
+
+        irregular = set(range(block.size)) - set(regular)
+
+        for position in sorted(irregular | {regular[i] for i in invalid}):
+            results[position] = self._fallback(
+                block=block, headers=headers, position=position, errors=errors
+            )
+
+        return results
+
+    def _validate_record_batch(
+        self, batch: "pyarrow.RecordBatch", start: int, errors: List[RowError]
+    ) -> List[Optional[TransactionRecord]]:
+        """Checks typed columns with vectorized compute kernels.
+
+        Values stored typed are taken as they are, only text columns go
+        through the CSV column parsers. Rows with any invalid value fall back
+        to the Transaction model.
+        """
+        invalid = set()
+
+        transaction_ids, invalid_ = _arrow_uuids(batch.column("transaction_id"))
+        invalid |= invalid_
+        customer_ids, invalid_ = _arrow_uuids(batch.column("customer_id"))
+        invalid |= invalid_
+        product_ids, invalid_ = _arrow_uuids(batch.column("product_id"))
+        invalid |= invalid_
+        timestamps, invalid_ = _arrow_timestamps(batch.column("timestamp"))
+        invalid |= invalid_
+
+        amounts, invalid_ = _arrow_positive(
+            batch.column("amount"), text=self._AMOUNT, integer=False
+        )
+        invalid |= invalid_
+        quantities, invalid_ = _arrow_positive(
+            batch.column("quantity"), text=self._QUANTITY, integer=True
+        )
+        invalid |= invalid_
+
+        currency = batch.column("currency")
+
+        if pyarrow.types.is_dictionary(currency.type) and _is_text(currency.dictionary):
+            # Each distinct value is looked up once
+            dictionary = list(
+                map(_CURRENCIES.get, currency.dictionary.to_pylist())
+            ) or [None]
+            indices = pyarrow.compute.fill_null(currency.indices, 0).to_pylist()
+            currencies = list(map(dictionary.__getitem__, indices))
+            invalid |= _positions(currency.is_null())
+            invalid |= {
+                position for position, value in enumerate(currencies) if value is None
+            }
+        elif _is_text(currency):
+            currencies = list(map(_CURRENCIES.get, currency.to_pylist()))
+            invalid |= {
+                position for position, value in enumerate(currencies) if value is None
+            }
+        else:
+            currencies = [None] * batch.num_rows
+            invalid |= set(range(batch.num_rows))
+
+        if invalid == set(range(batch.num_rows)):
+            records = [None] * batch.num_rows
+        else:
+            records = list(
+                map(
+                    partial(tuple.__new__, TransactionRecord),
+                    zip(
+                        transaction_ids,
+                        timestamps,
+                        amounts,
+                        currencies,
+                        customer_ids,
+                        product_ids,
+                        quantities,
+                    ),
+                )
+            )
+
+        for position in sorted(invalid):
+            item = batch.slice(position, 1).to_pylist()[0]
+            transaction = self._validate_row(
+                idx=start + position,
+                headers=list(item),
+                row=list(item.values()),
+                errors=errors,
+            )
+            records[position] = (
+                TransactionRecord.from_transaction(transaction) if transaction else None
+            )
+
+        return records
+
+    @staticmethod
+    def _pack_items(items: list) -> object:
+        """Transposes records to columns, which pickle several times faster.
+
+        Timestamps travel as ISO strings and currencies as their values.
+        """
+        missing = [position for position, item in enumerate(items) if item is None]
+        columns = list(zip(*filter(None, items)))
+
+        if columns:
+            columns[1] = list(map(datetime.isoformat, columns[1]))
+            columns[3] = list(map(attrgetter("value"), columns[3]))
+
+        return len(items), missing, columns
+
+    @staticmethod
+    def _unpack_items(packed: object) -> list:
+        size, missing, columns = packed
+
+        if columns:
+            columns[1] = list(map(datetime.fromisoformat, columns[1]))
+            columns[3] = list(map(_CURRENCIES.__getitem__, columns[3]))
+
+        records = map(partial(tuple.__new__, TransactionRecord), zip(*columns))
+
+        if not missing:
+            return list(records)
+
+        missing = set(missing)
+
+        return [
+            None if position in missing else next(records) for position in range(size)
+        ]
+
+    def _fallback(
+        self, block: _Block, headers: Row, position: int, errors: List[RowError]
+    ) -> Optional[TransactionRecord]:
+        transaction = self._validate_row(
+            idx=block.start + position,
+            headers=headers,
+            row=block.row(position),
+            errors=errors,
+        )
+
+        return TransactionRecord.from_transaction(transaction) if transaction else None
+
+    @staticmethod
+    def _not_positive(values: list) -> Set[int]:
+        present = [value for value in values if value is not None]
+
+        if not present or min(present) > 0:
+            return set()
+
+        return {
+            position
+            for position, value in enumerate(values)
+            if value is not None and value <= 0
+        }
+
+
+def _is_text(array: "pyarrow.Array") -> bool:
+    return pyarrow.types.is_string(array.type) or pyarrow.types.is_large_string(
+        array.type
+    )
+
+
+def _positions(mask: "pyarrow.Array") -> Set[int]:
+    """Positions where ``mask`` is true or null"""
+    return set(
+        pyarrow.compute.indices_nonzero(
+            pyarrow.compute.fill_null(mask, True)
+        ).to_pylist()
+    )
+
+
+# Position of each hex digit of a UUID in its canonical form
+_UUID_DIGITS = [
+    digit + (digit >= 8) + (digit >= 12) + (digit >= 16) + (digit >= 20)
+    for digit in range(32)
+]
+
+
+def _format_uuids(data: bytes, count: int) -> List[str]:
+    """Canonical strings of ``count`` consecutive 16 byte UUIDs.
+
+    Digits are copied with one strided slice assignment per digit position
+    instead of formatting every UUID on its own.
+    """
+    hexed = data.hex().encode()
+    text = bytearray(b"-" * (37 * count))
+    text[36::37] = b"\n" * count
+
+    for source, target in enumerate(_UUID_DIGITS):
+        text[target::37] = hexed[source::32]
+
+    values = text.decode().split("\n")
+    values.pop()
+
+    return values
+
+
+def _arrow_uuids(array: "pyarrow.Array") -> Tuple[list, Set[int]]:
+    """Canonical UUID strings from a text, 16 byte binary or uuid column"""
+    if isinstance(array, pyarrow.ExtensionArray):
+        array = array.storage
+
+    if _is_text(array):
+        matches = pyarrow.compute.match_substring_regex(
+            array, f"^{_UUIDColumn._PATTERN}$"
+        )
+
+        return array.to_pylist(), _positions(pyarrow.compute.invert(matches))
+
+    if pyarrow.types.is_fixed_size_binary(array.type) and array.type.byte_width == 16:
+        # Straight from the data buffer, null slots hold arbitrary bytes
+        data = array.buffers()[1].to_pybytes()
+        data = data[array.offset * 16 : (array.offset + len(array)) * 16]
+
+        return _format_uuids(data, count=len(array)), _positions(array.is_null())
+
+    return [None] * len(array), set(range(len(array)))
+
+
+_EPOCH = datetime(1970, 1, 1)
+_UTC_EPOCH = _EPOCH.replace(tzinfo=timezone.utc)
+
+
+def _arrow_timestamps(array: "pyarrow.Array") -> Tuple[list, Set[int]]:
+    if pyarrow.types.is_timestamp(array.type):
+        # Offsets from the epoch build datetimes several times faster than
+        # to_pylist, which resolves the time zone of every value. Nanoseconds
+        # do not fit datetime.
+        epoch = _UTC_EPOCH if array.type.tz else _EPOCH
+        micros = array.cast(pyarrow.timestamp("us", tz=array.type.tz), safe=False)
+        micros = pyarrow.compute.fill_null(micros.cast(pyarrow.int64()), 0)
+        values = map(partial(timedelta, 0, 0), micros.to_pylist())
+
+        return list(map(epoch.__add__, values)), _positions(array.is_null())
+
+    if _is_text(array):
+        values, invalid = ColumnarTransactionValidator._TIMESTAMP.parse(
+            pyarrow.compute.fill_null(array, "").to_pylist()
+        )
+
+        return values, invalid
+
+    return [None] * len(array), set(range(len(array)))
+
+
+def _arrow_positive(
+    array: "pyarrow.Array", text: _Column, integer: bool
+) -> Tuple[list, Set[int]]:
+    types = pyarrow.types
+
+    if types.is_integer(array.type) or (
+        not integer and (types.is_floating(array.type) or types.is_decimal(array.type))
+    ):
+        array = array.cast(pyarrow.int64() if integer else pyarrow.float64())
+
+        return array.to_pylist(), _positions(pyarrow.compute.less_equal(array, 0))
+
+    if _is_text(array):
+        values, invalid = text.parse(pyarrow.compute.fill_null(array, "").to_pylist())
+
+        return values, invalid | ColumnarTransactionValidator._not_positive(values)
+
+    return [None] * len(array), set(range(len(array)))
+
+
+VALIDATORS = {
+    "model": TransactionValidator,
+    "columnar": ColumnarTransactionValidator,
+}
+
+
+def _iter_lines(stream: BinaryIO, chunk_size: int) -> Iterator[str]:
+    """Incrementally decodes a binary stream into lines, keeping line endings"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+
+    while chunk := stream.read(chunk_size):
+        *lines, buffer = (buffer + decoder.decode(chunk)).split("\n")
+
+        for line in lines:
+            yield line + "\n"
+
+    buffer += decoder.decode(b"", final=True)
+
+    if buffer:
+        yield buffer
+
+
+def _validate_part(
+    validator: TransactionValidator, headers: Row, part: bytes, first_row: int
+) -> List[Tuple[int, object, List[RowError]]]:
+    """Process pool entry point, see TransactionValidator._validate_parallel"""
+    lines = _iter_lines(stream=io.BytesIO(part), chunk_size=len(part))
+    results = []
+
+    for block in _iter_blocks(
+        lines, width=len(headers), size=validator._BLOCK_SIZE, start=first_row
+    ):
+        errors = []
+        items = validator._validate_block(headers=headers, block=block, errors=errors)
+        results.append((block.start, validator._pack_items(items), errors))
+
+    return results
+
+
+def _split_header(stream: BinaryIO, chunk_size: int) -> Tuple[bytes, BinaryIO]:
+    """Reads the header line, returns it with a stream of the remaining bytes"""
+    buffer = b""
+
+    while b"\n" not in buffer and (chunk := stream.read(chunk_size)):
+        buffer += chunk
+
+    header, _, rest = buffer.partition(b"\n")
+
+    return header, _PrefixedStream(prefix=rest, stream=stream)
+
+
+class _PrefixedStream(io.RawIOBase):
+    def __init__(self, prefix: bytes, stream: BinaryIO):
+        self._prefix = prefix
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if self._prefix:
+            data, self._prefix = self._prefix, b""
+            return data
+
+        return self._stream.read(size)
+
+
+_PART_SIZE_LIMIT = 4  # Parts a quoted field may span before the file is rejected
+
+
+def _iter_parts(stream: BinaryIO, part_size: int, chunk_size: int) -> Iterator[bytes]:
+    """Cuts a CSV byte stream into parts of about ``part_size`` at row boundaries.
+
+    A line break ends a row when an even number of quotes precedes it, as
+    quotes inside quoted fields are escaped by doubling them. Quotes are
+    counted once as the stream is read, the parity is carried between chunks.
+    A quoted field still open after ``_PART_SIZE_LIMIT`` parts, e.g. one
+    opened by a stray quote, fails the file.
+    """
+    limit = _PART_SIZE_LIMIT * max(part_size, chunk_size)
+    buffer = b""
+    scanned, odd = 0, False  # Parity of the quotes before `scanned`
+    boundary = 0  # End of the last complete row
+
+    while chunk := stream.read(chunk_size):
+        buffer += chunk
+        end = buffer.rfind(b"\n", scanned) + 1
+
+        if end:
+            odd ^= buffer.count(b'"', scanned, end) % 2 == 1
+            position, parity = end, odd
+
+            # Back over the rows of the chunk to the last one outside quotes
+            while parity and position > scanned:
+                previous = buffer.rfind(b"\n", scanned, position - 1) + 1 or scanned
+                parity ^= buffer.count(b'"', previous, position) % 2 == 1
+                position = previous
+
+            if not parity and position > boundary:
+                boundary = position
+
+            scanned = end
+
+        if len(buffer) < part_size:
+            continue
+
+        if boundary:
+            yield buffer[:boundary]
+            buffer = buffer[boundary:]
+            scanned -= boundary
+            boundary = 0
+
+        elif len(buffer) > limit:
+            raise InvalidFileStructure(
+                "Invalid CSV file: quoted field is not closed, check for a stray quote"
+            )
+
+    if buffer:
+        yield buffer
+
+
+def _iter_blocks(
+    lines: Iterator[str], width: int, size: int, start: int = 1
+) -> Iterator[_Block]:
+    """Groups lines into blocks of rows, the same rows csv.reader would produce"""
+
+    while chunk := list(islice(lines, size)):
+        text = "".join(chunk).replace("\r\n", "\n")
+
+        if '"' not in text and "\r" not in text:
+            plain = list(filter(None, text.split("\n")))
+
+            if set(map(str.count, plain, repeat(","))) == {width - 1}:
+                fields = ",".join(plain).split(",")
+                columns = [fields[column::width] for column in range(width)]
+
+                yield _Block(start=start, size=len(plain), columns=columns)
+                start += len(plain)
+                continue
+
+        # Quoted fields may span lines, so rows are read on from `lines`
+        chunk = iter(chunk)
+        rest = chain(chunk, lines)
+        rows = list(filter(None, (_read_row(line, rest) for line in chunk)))
+
+        if rows:
+            yield _Block(start=start, size=len(rows), rows=rows)
+            start += len(rows)
+
+
+def _read_row(line: str, lines: Iterator[str]) -> Row:
+    """Reads the row starting at ``line``, pulling continuation lines if quoted"""
+    if line.endswith("\r\n"):
+        stripped = line[:-2]
+    elif line.endswith("\n"):
+        stripped = line[:-1]
+    else:
+        stripped = line
+
+    if '"' in stripped or "\r" in stripped:
+        return next(csv.reader(chain([line], lines)), [])
+
+    return stripped.split(",") if stripped else []
@@ -1,9 +1,26 @@
 import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from starlette.testclient import TestClient
 
-from src.core.database import Base, engine, get_session
+from src.core.database import (
+    Base,
+    async_engine,
+    engine,
+    get_async_session,
+    get_async_session_factory,
+    get_session,
+)
 from src.main import app
+from src.transaction.counts import count_cache
+from src.transaction.service import report_cache
+
+# Pooled connections are bound to the event loop that opened them,
+# while each async test and TestClient runs its own loop
+AsyncTestSessionLocal = async_sessionmaker(
+    bind=create_async_engine(async_engine.url, poolclass=NullPool), autoflush=False
+)
 
 
 @pytest.fixture(scope="session")
@@ -12,6 +29,7 @@ def db_engine():
 
     yield engine
 
+    engine.dispose()  # Pooled connections hold temporary staging tables
     Base.metadata.drop_all(bind=engine)
     engine.dispose()
 
@@ -28,6 +46,28 @@ def db_session(db_engine):
         session.close()
 
 
+@pytest.fixture(autouse=True)
+def clear_count_cache():
+    # Tables are truncated between tests without going through ingest
+    count_cache.invalidate()
+
+
+@pytest.fixture(autouse=True)
+def clear_report_cache():
+    report_cache.backend.reset()
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def async_db_session(db_engine):
+    async with AsyncTestSessionLocal() as session:
+        yield session
+
+
 @pytest.fixture
 def client(db_session):
     def override_get_db():
@@ -36,8 +76,14 @@ def client(db_session):
         finally:
             pass
 
+    async def override_get_async_db():
+        async with AsyncTestSessionLocal() as session:
+            yield session
+
     # https://fastapi.tiangolo.com/advanced/testing-dependencies/
     app.dependency_overrides[get_session] = override_get_db
+    app.dependency_overrides[get_async_session] = override_get_async_db
+    app.dependency_overrides[get_async_session_factory] = lambda: AsyncTestSessionLocal
 
     with TestClient(app) as test_client:
         yield test_client
@@ -1,7 +1,25 @@
 """Example"""
 
+import gzip
+import io
+import json
+import time
+import zipfile
 from uuid import uuid4
 
+import pytest
+
+from src.core import etags
+from src.settings import settings
+
+from tests.generators import (
+    generate_csv,
+    invalid_data,
+    invalid_headers,
+    valid_data,
+    valid_headers,
+)
+
 
 def test_fetch_transactions_returns_200_on_success(client):
     response = client.get(f"/transactions?page=1&size=10")
@@ -12,3 +30,465 @@ def test_get_transaction_details_not_found_returns_404(client):
     fake_id = str(uuid4())
     response = client.get(f"/transactions/{fake_id}")
     assert response.status_code == 404
+
+
+def test_upload_transactions_returns_201_on_success(client):
+    csv_content = generate_csv(valid_headers(), valid_data())
+
+    response = client.post(
+        "/transactions/upload",
+        files={"file": ("transactions.csv", csv_content, "text/csv")},
+    )
+
+    assert response.status_code == 201
+    assert response.json() == {
+        "success": 2,
+        "failure": 0,
+        "skipped": 0,
+        "errors": [],
+        "error_report_id": None,
+        "members": [],
+    }
+
+
+def test_upload_transactions_twice_with_skip_returns_200(client):
+    csv_content = generate_csv(valid_headers(), valid_data())
+    files = {"file": ("transactions.csv", csv_content, "text/csv")}
+
+    client.post("/transactions/upload", files=files)
+    response = client.post("/transactions/upload?on_conflict=skip", files=files)
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "success": 0,
+        "failure": 0,
+        "skipped": 2,
+        "errors": [],
+        "error_report_id": None,
+        "members": [],
+    }
+
+
+def test_upload_transactions_with_invalid_rows_links_error_report(client):
+    csv_content = generate_csv(valid_headers(), invalid_data())
+
+    response = client.post(
+        "/transactions/upload",
+        files={"file": ("transactions.csv", csv_content, "text/csv")},
+    )
+    report_id = response.json()["error_report_id"]
+    report = client.get(f"/transactions/error-reports/{report_id}")
+
+    assert response.status_code == 207
+    assert sum(group["count"] for group in response.json()["errors"]) == 7
+    assert report.status_code == 200
+    assert len(report.text.splitlines()) == 1 + 7
+
+
+def test_upload_gzip_transactions_returns_201_on_success(client):
+    content = gzip.compress(generate_csv(valid_headers(), valid_data()))
+
+    response = client.post(
+        "/transactions/upload",
+        files={"file": ("transactions.csv.gz", content, "application/gzip")},
+    )
+
+    assert response.status_code == 201
+    assert response.json()["success"] == 2
+
+
+def test_upload_parquet_transactions_returns_201_on_success(client):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    content = io.BytesIO()
+    pyarrow.parquet.write_table(pyarrow.Table.from_pylist(valid_data()), content)
+
+    response = client.post(
+        "/transactions/upload",
+        files={
+            "file": (
+                "transactions.parquet",
+                content.getvalue(),
+                "application/vnd.apache.parquet",
+            )
+        },
+    )
+
+    assert response.status_code == 201
+    assert response.json()["success"] == 2
+
+
+def test_upload_zip_transactions_reports_each_member(client):
+    archive = io.BytesIO()
+
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("valid.csv", generate_csv(valid_headers(), valid_data()))
+        zip_file.writestr("broken.csv", generate_csv(invalid_headers()))
+        zip_file.writestr("readme.txt", "not ingested")
+
+    response = client.post(
+        "/transactions/upload",
+        files={"file": ("transactions.zip", archive.getvalue(), "application/zip")},
+    )
+    members = {member["name"]: member for member in response.json()["members"]}
+
+    assert response.status_code == 201
+    assert response.json()["success"] == 2
+    assert members.keys() == {"valid.csv", "broken.csv"}
+    assert members["valid.csv"]["success"] == 2
+    assert "Invalid CSV headers" in members["broken.csv"]["error"]
+
+
+def test_submit_upload_job_returns_202_and_completes(client):
+    csv_content = generate_csv(valid_headers(), valid_data())
+
+    response = client.post(
+        "/transactions/uploads",
+        files={"file": ("transactions.csv", csv_content, "text/csv")},
+    )
+
+    assert response.status_code == 202
+    location = response.headers["location"]
+
+    for _ in range(100):
+        job = client.get(location).json()
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(0.05)
+
+    assert job["status"] == "completed"
+    assert job["rows_persisted"] == 2
+    assert job["rows_validated"] == 2
+
+
+def test_upload_session_accepts_retried_chunks_and_completes(client):
+    csv_content = generate_csv(valid_headers(), valid_data())
+    first, second = csv_content[:100], csv_content[100:]
+
+    response = client.post("/transactions/upload-sessions?file_name=chunked.csv")
+
+    assert response.status_code == 201
+    location = response.headers["location"]
+
+    assert client.put(f"{location}?offset=0", content=first).status_code == 200
+    # A retry of the first chunk overlaps the received bytes and is ignored
+    assert client.put(f"{location}?offset=0", content=first).status_code == 200
+    # A chunk past the received bytes would leave a gap
+    gap = client.put(f"{location}?offset={len(csv_content)}", content=second)
+    assert gap.status_code == 409
+
+    chunk = client.put(f"{location}?offset={len(first)}", content=second)
+    assert chunk.status_code == 200
+    assert chunk.json()["bytes_received"] == len(csv_content)
+
+    response = client.post(f"{location}/commit?size={len(csv_content)}")
+
+    assert response.status_code == 202
+    assert client.put(f"{location}?offset=0", content=first).status_code == 409
+
+    for _ in range(100):
+        job = client.get(response.headers["location"]).json()
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(0.05)
+
+    assert job["status"] == "completed"
+    assert job["rows_persisted"] == 2
+
+
+def test_get_transaction_details_with_matching_etag_returns_304(client):
+    data = valid_data()
+    client.post(
+        "/transactions/upload",
+        files={
+            "file": (
+                "transactions.csv",
+                generate_csv(valid_headers(), data),
+                "text/csv",
+            )
+        },
+    )
+
+    response = client.get(f"/transactions/{data[0]['transaction_id']}")
+    revalidated = client.get(
+        f"/transactions/{data[0]['transaction_id']}",
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+
+    assert response.status_code == 200
+    assert "immutable" in response.headers["Cache-Control"]
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == response.headers["ETag"]
+
+
+def test_get_missing_transaction_with_etag_returns_404(client):
+    transaction_id = uuid4()
+    etag = etags.etag(etags.version("transaction", transaction_id))
+
+    response = client.get(
+        f"/transactions/{transaction_id}", headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == 404
+
+
+def test_get_customer_summary_etag_changes_after_upload(client):
+    data = valid_data()
+    data[1]["customer_id"] = data[0]["customer_id"]
+
+    def upload(rows):
+        client.post(
+            "/transactions/upload",
+            files={
+                "file": (
+                    "transactions.csv",
+                    generate_csv(valid_headers(), rows),
+                    "text/csv",
+                )
+            },
+        )
+
+    url = f"/reports/customer-summary/{data[0]['customer_id']}"
+    upload(data[:1])
+    etag = client.get(url).headers["ETag"]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    upload(data[1:])
+    response = client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert "version" not in response.json()
+
+
+def test_get_customer_summary_with_etag_not_found_returns_404(client):
+    response = client.get(
+        f"/reports/customer-summary/{uuid4()}", headers={"If-None-Match": '"x"'}
+    )
+    assert response.status_code == 404
+
+
+def test_get_transactions_batch_returns_items_and_missing_ids(client):
+    data = valid_data()
+    client.post(
+        "/transactions/upload",
+        files={
+            "file": (
+                "transactions.csv",
+                generate_csv(valid_headers(), data),
+                "text/csv",
+            )
+        },
+    )
+    missing_id = str(uuid4())
+    ids = [data[1]["transaction_id"], missing_id, data[0]["transaction_id"]]
+
+    response = client.post("/transactions/batch-get", json={"transaction_ids": ids})
+    details = client.get(f"/transactions/{data[1]['transaction_id']}")
+
+    assert response.status_code == 200
+    assert [item["transaction_id"] for item in response.json()["items"]] == [
+        ids[0],
+        ids[2],
+    ]
+    assert response.json()["items"][0] == details.json()
+    assert response.json()["missing"] == [missing_id]
+
+
+def test_get_transactions_batch_over_limit_returns_422(client):
+    ids = [str(uuid4()) for _ in range(settings.batch_get_max_ids + 1)]
+
+    response = client.post("/transactions/batch-get", json={"transaction_ids": ids})
+
+    assert response.status_code == 422
+
+
+def test_get_customer_summaries_batch_streams_ndjson(client):
+    data = valid_data()
+    client.post(
+        "/transactions/upload",
+        files={
+            "file": (
+                "transactions.csv",
+                generate_csv(valid_headers(), data),
+                "text/csv",
+            )
+        },
+    )
+    ids = [data[1]["customer_id"], str(uuid4()), data[0]["customer_id"]]
+
+    response = client.post(
+        "/reports/customer-summary:batch", json={"customer_ids": ids}
+    )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert lines == [
+        client.get(f"/reports/customer-summary/{id_}").json()
+        for id_ in (ids[0], ids[2])
+    ]
+
+
+def test_get_product_summaries_batch_with_approximate_distinct(client):
+    data = valid_data()
+    client.post(
+        "/transactions/upload",
+        files={
+            "file": (
+                "transactions.csv",
+                generate_csv(valid_headers(), data),
+                "text/csv",
+            )
+        },
+    )
+
+    response = client.post(
+        "/reports/product-summary:batch?distinct=approximate",
+        json={"product_ids": [data[0]["product_id"]]},
+    )
+
+    assert response.status_code == 200
+    assert (
+        json.loads(response.text)
+        == client.get(
+            f"/reports/product-summary/{data[0]['product_id']}?distinct=approximate"
+        ).json()
+    )
+
+
+def test_export_transactions_csv_can_be_uploaded_again(client):
+    data = valid_data()
+    client.post(
+        "/transactions/upload",
+        files={
+            "file": (
+                "transactions.csv",
+                generate_csv(valid_headers(), data),
+                "text/csv",
+            )
+        },
+    )
+
+    response = client.get("/transactions/export")
+    lines = response.text.splitlines()
+    reuploaded = client.post(
+        "/transactions/upload?on_conflict=skip",
+        files={"file": ("export.csv", response.content, "text/csv")},
+    )
+
+    assert response.status_code == 200
+    assert lines[0] == ",".join(valid_headers())
+    assert {row["transaction_id"] for row in data} <= {
+        line.split(",")[0] for line in lines[1:]
+    }
+    assert reuploaded.json()["skipped"] == len(lines) - 1
+
+
+def test_export_transactions_ndjson_with_filters(client):
+    data = valid_data()
+    client.post(
+        "/transactions/upload",
+        files={
+            "file": (
+                "transactions.csv",
+                generate_csv(valid_headers(), data),
+                "text/csv",
+            )
+        },
+    )
+
+    def export(query: str):
+        response = client.get(f"/transactions/export?format=ndjson&{query}")
+
+        assert response.headers["content-type"] == "application/x-ndjson"
+        return [json.loads(line)["transaction_id"] for line in response.iter_lines()]
+
+    customer_id = data[1]["customer_id"]
+
+    assert export(f"customer_id={customer_id}") == [data[1]["transaction_id"]]
+    assert export(f"customer_id={customer_id}&since=2024-01-02T11:00:00Z") == [
+        data[1]["transaction_id"]
+    ]
+    assert export(f"customer_id={customer_id}&until=2024-01-02T11:00:00Z") == []
+
+
+def test_get_upload_job_not_found_returns_404(client):
+    response = client.get(f"/transactions/uploads/{uuid4()}")
+    assert response.status_code == 404
+
+
+def test_get_pool_stats_returns_200(client):
+    response = client.get("/internal/pool-stats")
+
+    assert response.status_code == 200
+    assert {"sync", "async"} <= response.json().keys()
+
+
+def test_get_cache_stats_counts_report_hits(client):
+    product_id = uuid4()
+    client.get(f"/reports/product-summary/{product_id}")
+
+    response = client.get("/internal/cache-stats")
+
+    assert response.status_code == 200
+    assert response.json()["reports"]["misses"] >= 1
+
+
+def test_fetch_transactions_with_cursor_returns_next_page(client):
+    client.post(
+        "/transactions/upload",
+        files={
+            "file": (
+                "transactions.csv",
+                generate_csv(valid_headers(), valid_data()),
+                "text/csv",
+            )
+        },
+    )
+
+    first = client.get("/transactions?page_size=1").json()
+    following = client.get(
+        f"/transactions?page_size=1&cursor={first['next_cursor']}"
+    ).json()
+
+    assert following["items"] != first["items"]
+    assert len(following["items"]) == 1
+
+
+def test_fetch_transactions_with_invalid_cursor_returns_400(client):
+    response = client.get("/transactions?cursor=invalid")
+    assert response.status_code == 400
+
+
+def test_fetch_transactions_without_total_skips_count(client):
+    response = client.get("/transactions?page_size=1&include_total=false")
+
+    assert response.status_code == 200
+    assert response.json()["total_count"] is None
+    assert response.json()["total_count_kind"] is None
+
+
+def test_get_product_summary_with_approximate_distinct_returns_error_bound(client):
+    data = valid_data()
+    client.post(
+        "/transactions/upload",
+        files={
+            "file": (
+                "transactions.csv",
+                generate_csv(valid_headers(), data),
+                "text/csv",
+            )
+        },
+    )
+
+    response = client.get(
+        f"/reports/product-summary/{data[0]['product_id']}?distinct=approximate"
+    )
+
+    assert response.status_code == 200
+    assert response.json()["unique_customers_count"] == 1
+    assert response.json()["unique_count_mode"] == "approximate"
+    assert response.json()["unique_count_error"] > 0
@@ -3,6 +3,7 @@ __all__ = (
     "invalid_headers",
     "valid_data",
     "invalid_data",
+    "edge_case_data",
     "generate_csv",
     "generate_transaction",
 )
@@ -138,6 +139,53 @@ def invalid_data() -> List[Dict[str, Any]]:
     ]
 
 
+def edge_case_data() -> List[Dict[str, Any]]:
+    """Values outside of the canonical form, valid and invalid"""
+    duplicated_id = str(uuid4())
+
+    def row(**overrides) -> Dict[str, Any]:
+        return {
+            "transaction_id": str(uuid4()),
+            "timestamp": "2024-01-01T10:00:00Z",
+            "amount": "10.00",
+            "currency": "PLN",
+            "customer_id": str(uuid4()),
+            "product_id": str(uuid4()),
+            "quantity": "1",
+            **overrides,
+        }
+
+    return [
+        row(transaction_id=str(uuid4()).upper()),
+        row(product_id="{%s}" % uuid4()),
+        row(product_id=uuid4().hex),
+        row(customer_id=str(uuid4())[:-1]),
+        row(customer_id="a" + str(uuid4())),  # Aligns with the row above
+        row(timestamp="2024-01-01 10:00:00.5"),
+        row(timestamp="2024-01-01T10:00:00.123456-05:30"),
+        row(timestamp="2024-01-01t10:00:00z"),
+        row(timestamp="2024-01-01"),
+        row(timestamp="1700000000"),
+        row(timestamp="2024-02-30T10:00:00"),
+        row(timestamp="2024-01-01T25:00:00"),
+        row(amount="1."),
+        row(amount="1e3"),
+        row(amount=" 2.5"),
+        row(amount="0.00"),
+        row(amount="inf"),
+        row(amount="nan"),
+        row(quantity="3.0"),
+        row(quantity="+3"),
+        row(quantity="0"),
+        row(quantity="1.5"),
+        row(currency="usd"),
+        row(currency=""),
+        row(transaction_id=duplicated_id),
+        row(transaction_id=duplicated_id, amount="20.00"),
+        row(transaction_id=duplicated_id.upper()),
+    ]
+
+
 def generate_csv(headers: List[str], data: Optional[List[Dict]] = None) -> bytes:
     output = io.StringIO()
     writer = csv.DictWriter(output, fieldnames=headers)
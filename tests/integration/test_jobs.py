@@ -0,0 +1,333 @@
+import os
+import threading
+import time
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import text
+
+from src.core.database import SessionLocal
+from src.settings import settings
+from src.transaction.errors import UploadSessionClosed
+from src.transaction.jobs import IngestJobRunner, IngestJobService, _TailStream
+from src.transaction.models.dto import DuplicateStrategy, IngestJobStatus
+from src.transaction.repository import IngestJobRepository
+from tests.generators import generate_csv, invalid_headers, valid_data, valid_headers
+
+
+@pytest.fixture
+def job_repository(db_session) -> IngestJobRepository:
+    return IngestJobRepository(session=db_session)
+
+
+@pytest.fixture(autouse=True)
+def truncate_tables(db_session):
+    db_session.execute(
+        text(
+            "TRUNCATE TABLE transactions, customer_summary, product_summary, "
+            "customer_product, customer_sketch, product_sketch, ingest_jobs"
+        )
+    )
+    db_session.commit()
+
+
+def _spool_job(
+    job_repository, content: bytes, batch_size: int = 1, upload_complete: bool = True
+):
+    job_id = uuid4()
+    spool_path = os.path.join(settings.ingest_spool_directory, f"{job_id}.csv")
+
+    os.makedirs(settings.ingest_spool_directory, exist_ok=True)
+    with open(spool_path, "wb") as spool:
+        spool.write(content)
+
+    job_repository.create(
+        job_id=job_id,
+        file_name="transactions.csv",
+        spool_path=spool_path,
+        on_conflict=DuplicateStrategy.FAIL,
+        batch_size=batch_size,
+        bytes_total=len(content),
+        upload_complete=upload_complete,
+    )
+    job_repository.persist()
+
+    return job_id
+
+
+def test_run_persists_upload_and_reports_progress(job_repository):
+    job_id = _spool_job(job_repository, generate_csv(valid_headers(), valid_data()))
+
+    IngestJobRunner().run(job_id=job_id)
+
+    job = job_repository.get_by_id(job_id=job_id)
+    assert job.status == IngestJobStatus.COMPLETED
+    assert job.rows_persisted == 2
+    assert job.rows_validated == 2
+    assert job.eta_seconds is None
+
+
+def test_run_resumes_from_last_committed_batch(db_session, job_repository):
+    data = valid_data()
+    job_id = _spool_job(job_repository, generate_csv(valid_headers(), data))
+
+    # First batch committed before an interruption
+    db_session.execute(
+        text("UPDATE ingest_jobs SET batches_committed = 1, rows_persisted = 1")
+    )
+    db_session.commit()
+
+    IngestJobRunner().run(job_id=job_id)
+
+    job = job_repository.get_by_id(job_id=job_id)
+    stored = db_session.execute(text("SELECT transaction_id FROM transactions"))
+    assert job.status == IngestJobStatus.COMPLETED
+    assert job.rows_persisted == 2
+    assert [str(row.transaction_id) for row in stored] == [data[1]["transaction_id"]]
+
+
+def test_run_skips_job_running_on_another_worker(db_session, job_repository):
+    job_id = _spool_job(job_repository, generate_csv(valid_headers(), valid_data()))
+    assert job_repository.claim(job_id=job_id, owner="other", stale_after=60)
+    job_repository.persist()
+
+    IngestJobRunner().run(job_id=job_id)
+
+    db_session.expire_all()
+    job = job_repository.get_by_id(job_id=job_id)
+    assert job.status == IngestJobStatus.RUNNING
+    assert job.rows_persisted == 0
+    assert job_repository.claim_unfinished(owner="third", stale_after=60) == []
+
+
+def test_run_resumes_job_with_stale_heartbeat(db_session, job_repository):
+    job_id = _spool_job(job_repository, generate_csv(valid_headers(), valid_data()))
+    job_repository.claim(job_id=job_id, owner="crashed", stale_after=60)
+    db_session.execute(
+        text("UPDATE ingest_jobs SET heartbeat_at = now() - interval '2 minutes'")
+    )
+    db_session.commit()
+
+    runner = IngestJobRunner()
+    assert job_repository.claim_unfinished(owner=runner.owner, stale_after=60) == [
+        job_id
+    ]
+    job_repository.persist()
+
+    runner.run(job_id=job_id)
+
+    db_session.expire_all()
+    job = job_repository.get_by_id(job_id=job_id)
+    assert job.status == IngestJobStatus.COMPLETED
+    assert job.rows_persisted == 2
+
+
+def test_claim_succeeds_once(job_repository):
+    job_id = _spool_job(job_repository, generate_csv(valid_headers(), valid_data()))
+
+    assert job_repository.claim(job_id=job_id, owner="first", stale_after=60)
+    job_repository.persist()
+
+    assert not job_repository.claim(job_id=job_id, owner="second", stale_after=60)
+
+
+def test_run_marks_job_failed_on_invalid_headers(job_repository):
+    job_id = _spool_job(job_repository, generate_csv(invalid_headers()))
+
+    IngestJobRunner().run(job_id=job_id)
+
+    job = job_repository.get_by_id(job_id=job_id)
+    assert job.status == IngestJobStatus.FAILED
+    assert "Invalid CSV headers" in job.error
+
+
+def test_run_validates_upload_session_while_chunks_arrive(job_repository, monkeypatch):
+    monkeypatch.setattr(_TailStream, "_POLL_INTERVAL", 0.01)
+    content = generate_csv(valid_headers(), valid_data())
+    job_id = _spool_job(job_repository, content[:100], upload_complete=False)
+
+    runner = threading.Thread(target=IngestJobRunner().run, kwargs={"job_id": job_id})
+    runner.start()
+
+    with open(
+        os.path.join(settings.ingest_spool_directory, f"{job_id}.csv"), "ab"
+    ) as spool:
+        spool.write(content[100:])
+
+    job_repository.record_upload(
+        job_id=job_id, bytes_total=len(content), upload_complete=True
+    )
+    job_repository.persist()
+    runner.join(timeout=10)
+
+    job = job_repository.get_by_id(job_id=job_id)
+    assert job.status == IngestJobStatus.COMPLETED
+    assert job.rows_persisted == 2
+
+
+def test_run_fails_upload_session_without_chunks(job_repository, monkeypatch):
+    monkeypatch.setattr(_TailStream, "_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(settings, "upload_session_timeout", 0.05)
+    job_id = _spool_job(job_repository, b"", upload_complete=False)
+
+    IngestJobRunner().run(job_id=job_id)
+
+    job = job_repository.get_by_id(job_id=job_id)
+    assert job.status == IngestJobStatus.FAILED
+    assert job.error == "Upload session was not committed in time"
+
+
+def test_record_upload_keeps_committed_session_complete(job_repository):
+    job_id = _spool_job(job_repository, b"", upload_complete=False)
+    job_repository.record_upload(job_id=job_id, bytes_total=0, upload_complete=True)
+
+    job_repository.record_upload(job_id=job_id, bytes_total=10)
+    job_repository.persist()
+
+    assert job_repository.is_upload_complete(job_id=job_id)
+
+
+def test_append_chunk_rejects_session_committed_while_waiting_for_lock(
+    job_repository,
+):
+    job_id = _spool_job(job_repository, b"", upload_complete=False)
+    service = IngestJobService(job_repository=job_repository, runner=IngestJobRunner())
+    other = IngestJobRepository(session=SessionLocal())
+    other.get_active_record(job_id=job_id, for_update=True)
+    errors = []
+
+    def append() -> None:
+        try:
+            service.append_chunk(job_id=job_id, offset=0, chunk=b"chunk")
+        except UploadSessionClosed as error:
+            errors.append(error)
+
+    appending = threading.Thread(target=append)
+    appending.start()
+    time.sleep(0.2)  # Waits for the row lock held by the other session
+    other.record_upload(job_id=job_id, bytes_total=0, upload_complete=True)
+    other.persist()
+    other.session.close()
+    appending.join(timeout=10)
+
+    assert len(errors) == 1
+    assert job_repository.get_by_id(job_id=job_id).bytes_received == 0
+
+
+def test_run_parks_idle_upload_session(job_repository, monkeypatch):
+    monkeypatch.setattr(_TailStream, "_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(settings, "upload_session_idle_timeout", 0.05)
+    content = generate_csv(valid_headers(), valid_data())
+    job_id = _spool_job(job_repository, content[:100], upload_complete=False)
+
+    IngestJobRunner().run(job_id=job_id)
+
+    job = job_repository.get_active_record(job_id=job_id, for_update=True)
+    assert job.status == IngestJobStatus.PENDING.value
+    assert job.owner is None
+    assert os.path.exists(job.spool_path)
+
+
+def test_park_keeps_session_with_unread_chunk(job_repository):
+    job_id = _spool_job(job_repository, b"", upload_complete=False)
+    job_repository.claim(job_id=job_id, owner="worker", stale_after=60)
+    job_repository.record_upload(job_id=job_id, bytes_total=10)
+    job_repository.persist()
+
+    assert not job_repository.park(job_id=job_id, owner="worker", bytes_read=5)
+    assert job_repository.park(job_id=job_id, owner="worker", bytes_read=10)
+
+
+def test_expire_sessions_fails_session_without_chunks(db_session, job_repository):
+    job_id = _spool_job(job_repository, b"", upload_complete=False)
+    db_session.execute(
+        text(
+            "UPDATE ingest_jobs SET received_at = now() - interval '2 hours' "
+            "WHERE job_id = :id"
+        ),
+        {"id": job_id},
+    )
+    db_session.commit()
+
+    spool_paths = job_repository.expire_sessions(timeout=3600, error="Expired")
+    job_repository.persist()
+
+    job = job_repository.get_by_id(job_id=job_id)
+    assert spool_paths == [
+        os.path.join(settings.ingest_spool_directory, f"{job_id}.csv")
+    ]
+    assert job.status == IngestJobStatus.FAILED
+    assert job.error == "Expired"
+
+
+class _Runner:
+    def __init__(self):
+        self.submitted = []
+        self.notified = 0
+
+    def submit(self, job_id) -> None:
+        self.submitted.append(job_id)
+
+    def notify(self) -> None:
+        self.notified += 1
+
+
+def test_upload_session_is_queued_by_its_first_chunk(job_repository):
+    runner = _Runner()
+    service = IngestJobService(job_repository=job_repository, runner=runner)
+
+    job_id = service.create_session().job_id
+    assert runner.submitted == []
+
+    service.append_chunk(job_id=job_id, offset=0, chunk=b"chunk")
+    assert runner.submitted == [job_id]
+
+    job_repository.claim(job_id=job_id, owner="worker", stale_after=60)
+    job_repository.persist()
+    service.commit_session(job_id=job_id)
+    assert runner.submitted == [job_id]
+    assert runner.notified == 1
+
+
+def test_submit_runs_job_again_when_submitted_while_running(monkeypatch):
+    runner = IngestJobRunner(workers=2)
+    started, release = threading.Event(), threading.Event()
+    runs = []
+
+    def run(job_id) -> None:
+        runs.append(job_id)
+        started.set()
+        release.wait(timeout=10)
+
+    monkeypatch.setattr(runner, "run", run)
+    monkeypatch.setattr(runner, "_beat", lambda: None)
+    runner.start()
+    job_id = uuid4()
+
+    runner.submit(job_id=job_id)
+    started.wait(timeout=10)
+    runner.submit(job_id=job_id)
+    runner.submit(job_id=job_id)
+    release.set()
+    runner.shutdown()
+
+    assert runs == [job_id, job_id]
+
+
+def test_heartbeat_resumes_jobs_left_unfinished(job_repository, monkeypatch):
+    monkeypatch.setattr(settings, "ingest_job_heartbeat_interval", 0.05)
+    runner = IngestJobRunner()
+    runner.start()
+    job_id = _spool_job(job_repository, generate_csv(valid_headers(), valid_data()))
+
+    try:
+        deadline = time.monotonic() + 10
+        while (
+            job_repository.get_by_id(job_id=job_id).status != IngestJobStatus.COMPLETED
+            and time.monotonic() < deadline
+        ):
+            time.sleep(0.05)
+    finally:
+        runner.shutdown()
+
+    assert job_repository.get_by_id(job_id=job_id).status == IngestJobStatus.COMPLETED
@@ -0,0 +1,169 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from src.settings import settings
+from src.transaction.migrations import TypedColumnsMigration
+
+LEGACY_TABLE = "legacy_transactions"
+
+
+def _insert_legacy(connection, timestamp: str, amount: float, currency: str) -> None:
+    connection.execute(
+        text(
+            f"INSERT INTO {LEGACY_TABLE} VALUES "
+            "(:id, :timestamp, :amount, :currency, 1, :customer_id, :product_id)"
+        ),
+        {
+            "id": uuid4(),
+            "timestamp": timestamp,
+            "amount": amount,
+            "currency": currency,
+            "customer_id": uuid4(),
+            "product_id": uuid4(),
+        },
+    )
+
+
+@pytest.fixture
+def legacy_table(db_engine):
+    with db_engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {LEGACY_TABLE}"))
+        connection.execute(
+            text(
+                f"CREATE TABLE {LEGACY_TABLE} ("
+                "transaction_id uuid PRIMARY KEY, timestamp varchar NOT NULL, "
+                "amount double precision NOT NULL, currency varchar NOT NULL, "
+                "quantity integer NOT NULL, customer_id uuid NOT NULL, "
+                "product_id uuid NOT NULL)"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE INDEX ix_{LEGACY_TABLE}_customer_id ON {LEGACY_TABLE} (customer_id)"
+            )
+        )
+
+        for idx in range(5):
+            _insert_legacy(connection, f"2024-01-0{idx + 1} 10:00:00", 10.5, "EUR")
+
+        _insert_legacy(connection, "2024-01-06T10:00:00+02:00", 0.1, "PLN")
+
+    yield db_engine
+
+    with db_engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {LEGACY_TABLE}"))
+        connection.execute(
+            text(f"DROP FUNCTION IF EXISTS {LEGACY_TABLE}_typed_columns")
+        )
+
+
+def test_migration_converts_columns_of_populated_table(legacy_table):
+    migration = TypedColumnsMigration(
+        engine=legacy_table, table=LEGACY_TABLE, batch_size=2
+    )
+
+    assert migration.is_needed()
+
+    migration.add_shadow_columns()
+
+    # Written while the backfill is pending, filled by the trigger
+    with legacy_table.begin() as connection:
+        _insert_legacy(connection, "2024-01-07 10:00:00", 1.25, "USD")
+
+    assert migration.backfill() == 6
+
+    migration.create_indexes()
+    migration.swap_columns()
+
+    assert not migration.is_needed()
+
+    with legacy_table.connect() as connection:
+        columns = dict(
+            connection.execute(
+                text(
+                    "SELECT column_name, udt_name FROM information_schema.columns "
+                    "WHERE table_name = :table AND is_nullable = 'NO'"
+                ),
+                {"table": LEGACY_TABLE},
+            ).all()
+        )
+        indexes = connection.scalars(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = :table"),
+            {"table": LEGACY_TABLE},
+        ).all()
+        rows = connection.execute(
+            text(
+                f"SELECT timestamp, amount, currency FROM {LEGACY_TABLE} ORDER BY timestamp"
+            )
+        ).all()
+
+    assert columns["timestamp"] == "timestamptz"
+    assert columns["amount"] == "numeric"
+    assert columns["currency"] == "currency"
+    assert sorted(indexes) == [
+        f"ix_{LEGACY_TABLE}_customer_id_timestamp_id",
+        f"ix_{LEGACY_TABLE}_product_id_timestamp_id",
+        f"ix_{LEGACY_TABLE}_timestamp_id",
+        f"{LEGACY_TABLE}_pkey",
+    ]
+    assert len(rows) == 7
+    assert rows[0] == (
+        datetime(2024, 1, 1, 10, tzinfo=timezone.utc),
+        Decimal("10.5"),
+        "EUR",
+    )
+    assert rows[5] == (
+        datetime(2024, 1, 6, 8, tzinfo=timezone.utc),
+        Decimal("0.1"),
+        "PLN",
+    )
+    assert rows[6].currency == "USD"
+
+
+def test_create_indexes_rebuilds_invalid_index(legacy_table):
+    migration = TypedColumnsMigration(engine=legacy_table, table=LEGACY_TABLE)
+    migration.add_shadow_columns()
+    migration.backfill()
+    name = f"ix_{LEGACY_TABLE}_timestamp_id_typed"
+
+    # Fails on duplicate currencies, leaving an invalid index of that name
+    with legacy_table.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as connection:
+        with pytest.raises(IntegrityError):
+            connection.execute(
+                text(
+                    f"CREATE UNIQUE INDEX CONCURRENTLY {name} "
+                    f"ON {LEGACY_TABLE} (currency_typed)"
+                )
+            )
+
+    migration.create_indexes()
+
+    with legacy_table.connect() as connection:
+        index = connection.execute(
+            text(
+                "SELECT indisvalid, indisunique FROM pg_index "
+                "WHERE indexrelid = to_regclass(:name)"
+            ),
+            {"name": name},
+        ).one()
+        statement_timeout = connection.scalar(
+            text("SELECT setting FROM pg_settings WHERE name = 'statement_timeout'")
+        )
+
+    assert index == (True, False)
+    assert statement_timeout == str(settings.db_statement_timeout)
+
+
+def test_migration_run_is_noop_for_typed_table(db_engine):
+    migration = TypedColumnsMigration(engine=db_engine)
+
+    assert not migration.is_needed()
+
+    migration.run()
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import Select, text
+
+from src.transaction.queries import select_after, select_export, select_paginated
+
+
+# Within the range of the rows seeded by explain
+CURSOR_TIMESTAMP = datetime(2024, 1, 21, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def explain(db_session):
+    # Statistics of 100 customers and products over ~40 days, rows left by
+    # other tests would otherwise decide which index looks cheaper. ANALYZE
+    # is rolled back with the session.
+    db_session.execute(
+        text(
+            "INSERT INTO transactions "
+            "SELECT gen_random_uuid(), "
+            "timestamptz '2024-01-01' + make_interval(hours => n), "
+            "10, 'USD', 1, md5('c' || n % 100)::uuid, md5('p' || n % 100)::uuid "
+            "FROM generate_series(1, 1000) AS n"
+        )
+    )
+    db_session.execute(text("ANALYZE transactions"))
+    # The test table is too small for the planner to prefer an index on its own
+    db_session.execute(text("SET LOCAL enable_seqscan = off"))
+    db_session.execute(text("SET LOCAL enable_bitmapscan = off"))
+
+    def _explain(query: Select) -> str:
+        compiled = query.compile(
+            dialect=db_session.bind.dialect, compile_kwargs={"literal_binds": True}
+        )
+        return "\n".join(db_session.scalars(text(f"EXPLAIN {compiled}")).all())
+
+    return _explain
+
+
+def test_listing_page_reads_timestamp_index_without_sort(explain):
+    plan = explain(select_after(after=None, page_size=20))
+
+    assert "ix_transactions_timestamp_id" in plan
+    assert "Sort" not in plan
+
+
+def test_cursor_page_filtered_by_customer_reads_composite_index(explain):
+    after = (CURSOR_TIMESTAMP, uuid4())
+    plan = explain(select_after(after=after, page_size=20, customer_id=str(uuid4())))
+
+    assert "ix_transactions_customer_id_timestamp_id" in plan
+    assert "Sort" not in plan
+
+
+def test_offset_page_filtered_by_product_reads_composite_index(explain):
+    plan = explain(select_paginated(page=3, page_size=20, product_id=str(uuid4())))
+
+    assert "ix_transactions_product_id_timestamp_id" in plan
+    assert "Sort" not in plan
+
+
+def test_time_range_predicate_reads_timestamp_index(explain):
+    started = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    plan = explain(
+        select_export(
+            customer_id=uuid4(), since=started, until=started + timedelta(days=7)
+        )
+    )
+
+    assert "ix_transactions_customer_id_timestamp_id" in plan
+    assert "Index Cond" in plan and "timestamp" in plan.split("Index Cond")[1]
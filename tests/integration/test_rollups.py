@@ -0,0 +1,95 @@
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import text
+
+from src.transaction.models.dto import Currency, DuplicateStrategy
+from src.transaction.repository import TransactionRepository
+from src.transaction.rollups import SummaryRollups
+from tests.generators import generate_transaction
+
+
+@pytest.fixture
+def repository(db_session) -> TransactionRepository:
+    return TransactionRepository(session=db_session)
+
+
+@pytest.fixture
+def rollups(db_engine) -> SummaryRollups:
+    return SummaryRollups(engine=db_engine)
+
+
+@pytest.fixture(autouse=True)
+def truncate_tables(db_session):
+    db_session.execute(
+        text(
+            "TRUNCATE TABLE transactions, customer_summary, product_summary, "
+            "customer_product, customer_sketch, product_sketch"
+        )
+    )
+    db_session.commit()
+
+
+def test_ingest_updates_rollups_incrementally(repository, rollups):
+    customer_id, product_id = uuid4(), uuid4()
+    first = generate_transaction(
+        customer_id=customer_id,
+        product_id=product_id,
+        amount=10.0,
+        currency=Currency.EUR,
+        quantity=2,
+        timestamp="2024-02-01T10:00:00Z",
+    )
+    repository.create_many(transactions=[first])
+    repository.persist()
+
+    repository.create_many(
+        transactions=[
+            first,  # Skipped, counted once
+            generate_transaction(customer_id=customer_id, product_id=product_id),
+            generate_transaction(customer_id=customer_id, quantity=3),
+        ],
+        batch_size=2,
+        on_conflict=DuplicateStrategy.SKIP,
+    )
+    repository.create(transaction=generate_transaction(product_id=product_id))
+    repository.persist()
+
+    customer = repository.get_customer_summary(customer_id=customer_id)
+    product = repository.get_product_summary(product_id=product_id)
+
+    assert customer.total_revenue == Decimal("843.0")
+    assert customer.unique_products_count == 2
+    assert customer.last_transaction_date.isoformat() == "2024-02-01T10:00:00+00:00"
+    assert product.total_quantity == 4
+    assert product.total_revenue == Decimal("843.0")
+    assert product.unique_customers_count == 2
+    assert rollups.verify() == SummaryRollups.Drift(0, 0, [], [])
+
+
+def test_verify_reports_drift_and_rebuild_repairs_it(db_session, repository, rollups):
+    transaction = repository.create(transaction=generate_transaction())
+    other = repository.create(transaction=generate_transaction())
+    repository.persist()
+
+    db_session.execute(
+        text("UPDATE customer_summary SET total_revenue = 0 WHERE customer_id = :id"),
+        {"id": transaction.customer_id},
+    )
+    db_session.execute(
+        text("DELETE FROM product_summary WHERE product_id = :id"),
+        {"id": other.product_id},
+    )
+    db_session.commit()
+
+    drift = rollups.verify()
+
+    assert (drift.customers, drift.products) == (1, 1)
+    assert drift.customer_examples == [transaction.customer_id]
+    assert drift.product_examples == [other.product_id]
+
+    rollups.rebuild()
+
+    assert rollups.verify() == SummaryRollups.Drift(0, 0, [], [])
+    assert repository.get_product_summary(product_id=other.product_id)
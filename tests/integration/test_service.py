@@ -1,16 +1,32 @@
+import io
+import zipfile
+from datetime import datetime, timezone
 from decimal import Decimal
 from uuid import uuid4
 
 import pytest
 from sqlalchemy import text
 
+from src.core.errors import RepositoryUniqueConstraintError
+from src.settings import settings
 from src.transaction.errors import (
     CustomerSummaryNotFound,
+    InvalidCursor,
     ProductSummaryNotFound,
     TransactionNotFound,
 )
-from src.transaction.repository import TransactionRepository
-from src.transaction.service import TransactionService, TransactionValidator
+from src.transaction.models.dto import (
+    Currency,
+    DistinctCountMode,
+    DuplicateStrategy,
+    TotalCountKind,
+)
+from src.transaction.repository import AsyncTransactionRepository, TransactionRepository
+from src.transaction.service import (
+    AsyncTransactionService,
+    TransactionService,
+    TransactionValidator,
+)
 from tests.generators import (
     generate_csv,
     generate_transaction,
@@ -33,7 +49,13 @@ def service(repository) -> TransactionService:
 
 @pytest.fixture(autouse=True)
 def truncate_table(db_session):
-    db_session.execute(text("TRUNCATE TABLE transactions RESTART IDENTITY CASCADE"))
+    db_session.execute(
+        text(
+            "TRUNCATE TABLE transactions, customer_summary, product_summary, "
+            "customer_product, customer_sketch, product_sketch "
+            "RESTART IDENTITY CASCADE"
+        )
+    )
     db_session.commit()
 
 
@@ -73,6 +95,31 @@ def test_get_customer_summary_returns_summary(repository, service):
     assert result.total_revenue == Decimal(400.00)  # USD
 
 
+def test_get_customer_summary_aggregates_mixed_currencies(repository, service):
+    customer_id, product_id = uuid4(), uuid4()
+
+    for currency, timestamp in (
+        (Currency.PLN, "2024-01-01T10:00:00Z"),
+        (Currency.EUR, "2024-03-01T10:00:00Z"),
+        (Currency.USD, "2024-02-01T10:00:00Z"),
+    ):
+        repository.create(
+            transaction=generate_transaction(
+                customer_id=customer_id,
+                product_id=product_id,
+                amount=10.10,
+                currency=currency,
+                timestamp=timestamp,
+            )
+        )
+
+    result = service.get_customer_summary(customer_id=customer_id)
+
+    assert result.total_revenue == Decimal("10.10") * Decimal("9.3")
+    assert result.unique_products_count == 1
+    assert result.last_transaction_date == datetime(2024, 3, 1, 10, tzinfo=timezone.utc)
+
+
 def test_get_customer_summary_raises_resource_not_found(service):
     with pytest.raises(CustomerSummaryNotFound):
         service.get_customer_summary(customer_id=uuid4())
@@ -118,3 +165,391 @@ def test_paginate_returns_transactions(truncate_table, repository, service):
         page=page, page_size=page_size, product_id=transaction_other.product_id
     )
     assert len(paginated.items) == 1
+
+
+def test_fetch_after_cursor_walks_all_pages_in_listing_order(repository, service):
+    customer_id = uuid4()
+    for _ in range(5):
+        repository.create(transaction=generate_transaction(customer_id=customer_id))
+    # Same timestamp, ordered by transaction_id
+    for _ in range(2):
+        repository.create(
+            transaction=generate_transaction(
+                customer_id=customer_id, timestamp="2024-01-01T10:00:00"
+            )
+        )
+    repository.create(transaction=generate_transaction())
+    repository.persist()
+
+    items, cursor = [], None
+    while True:
+        page = service.fetch_after_cursor(
+            cursor=cursor, page_size=3, customer_id=customer_id
+        )
+        items.extend(page.items)
+        if not (cursor := page.next_cursor):
+            break
+
+    expected = service.fetch_paginated(page=1, page_size=10, customer_id=customer_id)
+    assert items == expected.items
+    assert len(items) == 7
+
+
+def test_fetch_paginated_links_first_cursor_page(repository, service):
+    for _ in range(3):
+        repository.create(transaction=generate_transaction())
+    repository.persist()
+
+    first = service.fetch_paginated(page=1, page_size=2)
+    following = service.fetch_after_cursor(cursor=first.next_cursor, page_size=2)
+
+    assert following.items == service.fetch_paginated(page=2, page_size=2).items
+    assert following.next_cursor is None
+    assert service.fetch_paginated(page=2, page_size=2).next_cursor is None
+
+
+def test_fetch_paginated_total_count_is_optional(repository, service):
+    for _ in range(3):
+        repository.create(transaction=generate_transaction())
+
+    counted = service.fetch_paginated(page=1, page_size=2)
+    uncounted = service.fetch_paginated(page=1, page_size=2, include_total=False)
+
+    assert (counted.total_count, counted.total_count_kind) == (3, TotalCountKind.EXACT)
+    assert (uncounted.total_count, uncounted.total_count_kind) == (None, None)
+    assert uncounted.items == counted.items
+    assert uncounted.next_cursor is not None
+
+
+def test_fetch_paginated_reuses_exact_count_until_ingest(repository, service):
+    transaction = repository.create(transaction=generate_transaction())
+    repository.persist()
+
+    assert service.fetch_paginated(page=1, page_size=2).total_count == 1
+
+    repository.create(transaction=generate_transaction())
+    assert service.fetch_paginated(page=1, page_size=2).total_count == 1
+    assert (
+        service.fetch_paginated(
+            page=1, page_size=2, customer_id=transaction.customer_id
+        ).total_count
+        == 1
+    )
+
+    repository.persist()
+    assert service.fetch_paginated(page=1, page_size=2).total_count == 2
+
+
+def test_fetch_paginated_estimates_large_unfiltered_count(
+    db_session, repository, service, monkeypatch
+):
+    transaction = repository.create(transaction=generate_transaction())
+    for _ in range(4):
+        repository.create(transaction=generate_transaction())
+    repository.persist()
+    db_session.execute(text("ANALYZE transactions"))
+    monkeypatch.setattr(settings, "listing_estimate_threshold", 5)
+
+    estimated = service.fetch_paginated(page=1, page_size=2)
+    filtered = service.fetch_paginated(
+        page=1, page_size=2, customer_id=transaction.customer_id
+    )
+
+    assert (estimated.total_count, estimated.total_count_kind) == (
+        5,
+        TotalCountKind.ESTIMATED,
+    )
+    assert (filtered.total_count, filtered.total_count_kind) == (
+        1,
+        TotalCountKind.EXACT,
+    )
+
+
+def test_get_customer_summary_is_cached_until_ingest_of_the_customer(
+    repository, service
+):
+    data = valid_data()
+    ingested, untouched = data[0]["customer_id"], data[1]["customer_id"]
+    for customer_id in (ingested, untouched):
+        repository.create(transaction=generate_transaction(customer_id=customer_id))
+    repository.persist()
+    summary = service.get_customer_summary(customer_id=ingested)
+    untouched_summary = service.get_customer_summary(customer_id=untouched)
+
+    # Not through ingest, the untouched customer is served from the cache
+    repository.create(transaction=generate_transaction(customer_id=untouched))
+    repository.persist()
+    service.create_from_csv(content=generate_csv(valid_headers(), data[:1]))
+
+    assert service.get_customer_summary(customer_id=ingested) != summary
+    assert service.get_customer_summary(customer_id=untouched) == untouched_summary
+
+
+def test_fetch_after_cursor_with_invalid_cursor_raises_error(service):
+    with pytest.raises(InvalidCursor):
+        service.fetch_after_cursor(cursor="not-a-cursor", page_size=2)
+
+
+def test_create_from_stream_persists_all_batches(service, monkeypatch):
+    csv_content = generate_csv(valid_headers(), valid_data())
+    validate_stream = service.validator.validate_stream
+    monkeypatch.setattr(
+        service.validator,
+        "validate_stream",
+        lambda stream, batch_size, errors, format: validate_stream(
+            stream=stream, batch_size=1, errors=errors, format=format
+        ),
+    )
+
+    result = service.create_from_stream(stream=io.BytesIO(csv_content))
+
+    assert result.success == 2
+    assert result.failure == 0
+    assert len(service.fetch_paginated(page=1, page_size=10).items) == 2
+
+
+def test_create_from_stream_fails_all_batches_on_stored_transaction_id(
+    service, monkeypatch
+):
+    data = valid_data()
+    service.create_from_csv(content=generate_csv(valid_headers(), data[1:]))
+    validate_stream = service.validator.validate_stream
+    monkeypatch.setattr(
+        service.validator,
+        "validate_stream",
+        lambda stream, batch_size, errors, format: validate_stream(
+            stream=stream, batch_size=1, errors=errors, format=format
+        ),
+    )
+
+    with pytest.raises(RepositoryUniqueConstraintError):
+        service.create_from_stream(
+            stream=io.BytesIO(generate_csv(valid_headers(), data))
+        )
+    service.transaction_repository.session.rollback()
+
+    with pytest.raises(TransactionNotFound):
+        service.get_by_id(transaction_id=data[0]["transaction_id"])
+
+
+def _small_batches(service, monkeypatch):
+    monkeypatch.setattr(service.validator, "_BLOCK_SIZE", 2)
+    validate_stream = service.validator.validate_stream
+    monkeypatch.setattr(
+        service.validator,
+        "validate_stream",
+        lambda stream, batch_size, errors, format: validate_stream(
+            stream=stream, batch_size=1, chunk_size=64, errors=errors, format=format
+        ),
+    )
+
+
+def _zip(**members: bytes) -> io.BytesIO:
+    archive = io.BytesIO()
+
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_STORED) as zip_file:
+        for name, content in members.items():
+            zip_file.writestr(f"{name}.csv", content)
+
+    archive.seek(0)
+
+    return archive
+
+
+def test_create_from_upload_rolls_back_archive_on_stored_transaction_id(
+    service, monkeypatch
+):
+    first, second = valid_data(), valid_data()
+    service.create_from_csv(content=generate_csv(valid_headers(), second[1:]))
+    _small_batches(service, monkeypatch)
+    archive = _zip(
+        a=generate_csv(valid_headers(), first),
+        b=generate_csv(valid_headers(), second),
+    )
+
+    with pytest.raises(RepositoryUniqueConstraintError):
+        service.create_from_upload(stream=archive)
+
+    for transaction in first + second[:1]:
+        with pytest.raises(TransactionNotFound):
+            service.get_by_id(transaction_id=transaction["transaction_id"])
+
+
+def test_create_from_upload_rolls_back_member_that_fails_to_read(service, monkeypatch):
+    first, last = valid_data(), valid_data()
+    corrupt = [row for _ in range(40) for row in valid_data()]  # Read in chunks
+    corrupt_content = generate_csv(valid_headers(), corrupt)
+    _small_batches(service, monkeypatch)
+    archive = _zip(
+        a=generate_csv(valid_headers(), first),
+        b=corrupt_content,
+        c=generate_csv(valid_headers(), last),
+    )
+    # Fails the CRC check once the whole member is read
+    content = archive.getvalue()
+    at = content.index(corrupt_content) + len(corrupt_content) - 2
+    archive = io.BytesIO(content[:at] + b"4" + content[at + 1 :])
+
+    result = service.create_from_upload(stream=archive)
+    members = {member.name: member for member in result.members}
+
+    assert result.success == 4
+    assert "Corrupt" in members["b.csv"].error
+    for transaction in first + last:
+        assert service.get_by_id(transaction_id=transaction["transaction_id"])
+    for transaction in corrupt:
+        with pytest.raises(TransactionNotFound):
+            service.get_by_id(transaction_id=transaction["transaction_id"])
+
+
+def test_create_many_inserts_transactions_in_batches(repository, service):
+    transactions = [generate_transaction() for _ in range(5)]
+
+    result = repository.create_many(transactions=transactions, batch_size=2)
+    repository.persist()
+
+    assert result.inserted == 5
+    for transaction in transactions:
+        assert service.get_by_id(transaction_id=transaction.transaction_id)
+
+
+def test_create_many_raises_on_existing_transaction_id(repository):
+    transaction = repository.create(transaction=generate_transaction())
+
+    with pytest.raises(RepositoryUniqueConstraintError):
+        repository.create_many(transactions=[transaction])
+
+
+def test_create_from_csv_with_skip_reports_already_stored_rows(service):
+    data = valid_data()
+    service.create_from_csv(content=generate_csv(valid_headers(), data[:1]))
+
+    result = service.create_from_csv(
+        content=generate_csv(valid_headers(), data),
+        on_conflict=DuplicateStrategy.SKIP,
+    )
+
+    assert result.success == 1
+    assert result.failure == 0
+    assert result.skipped == 1
+
+
+@pytest.fixture
+def async_service(async_db_session) -> AsyncTransactionService:
+    return AsyncTransactionService(
+        transaction_repository=AsyncTransactionRepository(session=async_db_session)
+    )
+
+
+@pytest.mark.anyio
+async def test_async_service_matches_sync_service(repository, service, async_service):
+    customer_id = uuid4()
+    transactions = [
+        repository.create(transaction=generate_transaction(customer_id=customer_id))
+        for _ in range(3)
+    ]
+    repository.persist()
+
+    transaction = await async_service.get_by_id(
+        transaction_id=transactions[0].transaction_id
+    )
+    paginated = await async_service.fetch_paginated(
+        page=1, page_size=2, customer_id=customer_id
+    )
+    summary = await async_service.get_customer_summary(customer_id=customer_id)
+
+    assert transaction == service.get_by_id(
+        transaction_id=transactions[0].transaction_id
+    )
+    assert paginated == service.fetch_paginated(
+        page=1, page_size=2, customer_id=customer_id
+    )
+    assert summary == service.get_customer_summary(customer_id=customer_id)
+
+
+@pytest.mark.anyio
+async def test_async_get_product_summary_raises_resource_not_found(async_service):
+    with pytest.raises(ProductSummaryNotFound):
+        await async_service.get_product_summary(product_id=uuid4())
+
+
+@pytest.mark.anyio
+async def test_async_summary_version_matches_cached_and_stored_summary(
+    repository, async_service
+):
+    transaction = repository.create(transaction=generate_transaction())
+    repository.persist()
+    product_id = transaction.product_id
+
+    summary = await async_service.get_product_summary(product_id=product_id)
+    cached = await async_service.get_product_summary_version(product_id=product_id)
+    async_service.report_cache.backend.reset()
+    stored = await async_service.get_product_summary_version(product_id=product_id)
+
+    assert summary.version == cached == stored
+    assert stored != await async_service.get_product_summary_version(
+        product_id=product_id, distinct=DistinctCountMode.APPROXIMATE
+    )
+
+
+@pytest.mark.anyio
+async def test_async_get_by_ids_splits_found_and_missing(repository, async_service):
+    transactions = [
+        repository.create(transaction=generate_transaction()) for _ in range(3)
+    ]
+    repository.persist()
+    missing_id = uuid4()
+    ids = [transactions[2].transaction_id, missing_id, transactions[0].transaction_id]
+
+    batch = await async_service.get_by_ids(transaction_ids=ids + ids)
+
+    assert batch.items == [transactions[2], transactions[0]]
+    assert batch.missing == [missing_id]
+
+
+@pytest.mark.anyio
+async def test_async_get_customer_summaries_match_single_summaries(
+    repository, async_service
+):
+    customer_ids = [uuid4(), uuid4()]
+    for customer_id in customer_ids:
+        for _ in range(3):
+            repository.create(transaction=generate_transaction(customer_id=customer_id))
+    repository.persist()
+    ids = [customer_ids[1], uuid4(), customer_ids[0], customer_ids[1]]
+
+    for distinct in DistinctCountMode:
+        summaries = await async_service.get_customer_summaries(
+            customer_ids=ids, distinct=distinct
+        )
+
+        assert summaries == [
+            await async_service.get_customer_summary(
+                customer_id=customer_id, distinct=distinct
+            )
+            for customer_id in (customer_ids[1], customer_ids[0])
+        ]
+
+
+@pytest.mark.anyio
+async def test_async_stream_reads_chunks_through_server_side_cursor(
+    repository, async_db_session
+):
+    transactions = [
+        repository.create(transaction=generate_transaction()) for _ in range(5)
+    ]
+    repository.persist()
+    async_repository = AsyncTransactionRepository(session=async_db_session)
+    chunks, cursors = [], []
+
+    async for chunk in async_repository.stream(chunk_size=2):
+        chunks.append(chunk)
+        cursors.append(
+            await async_db_session.scalar(text("SELECT count(*) FROM pg_cursors"))
+        )
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert {
+        transaction.transaction_id for chunk in chunks for transaction in chunk
+    } == {transaction.transaction_id for transaction in transactions}
+    assert cursors[0] == 1
@@ -0,0 +1,70 @@
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import text
+
+from src.transaction.models.dto import DistinctCountMode
+from src.transaction.repository import TransactionRepository
+from src.transaction.sketches import rank_sql, register_sql
+from tests.generators import generate_transaction
+from tests.unit.test_sketches import PRECISION, _register_rank
+
+
+@pytest.fixture
+def repository(db_session) -> TransactionRepository:
+    return TransactionRepository(session=db_session)
+
+
+@pytest.mark.parametrize("hash", [0, 1, -1, 2**63 - 1, -(2**63), 5812081656589608342])
+def test_sql_register_and_rank_match_reference(db_session, hash):
+    row = db_session.execute(
+        text(
+            f"SELECT {register_sql('h', PRECISION)}, {rank_sql('h', PRECISION)} "
+            "FROM (SELECT CAST(:hash AS bigint) AS h) AS hashed"
+        ),
+        {"hash": hash},
+    ).one()
+
+    assert tuple(row) == _register_rank(hash)
+
+
+def test_approximate_summaries_read_sketches(repository):
+    customer_id, product_id = uuid4(), uuid4()
+    customers = [uuid4() for _ in range(50)]
+
+    for customer in customers:
+        repository.create(
+            transaction=generate_transaction(
+                customer_id=customer, product_id=product_id
+            )
+        )
+    for _ in range(3):
+        repository.create(transaction=generate_transaction(customer_id=customer_id))
+
+    approximate = repository.get_product_summary(
+        product_id=product_id, distinct=DistinctCountMode.APPROXIMATE
+    )
+    repository.create_many(
+        transactions=[
+            generate_transaction(customer_id=customer, product_id=product_id)
+            for customer in customers[:10]  # Seen before, no new distinct customers
+        ]
+    )
+
+    product = repository.get_product_summary(
+        product_id=product_id, distinct=DistinctCountMode.APPROXIMATE
+    )
+    customer = repository.get_customer_summary(
+        customer_id=customer_id, distinct=DistinctCountMode.APPROXIMATE
+    )
+    exact = repository.get_product_summary(product_id=product_id)
+
+    assert exact.unique_customers_count == 50
+    assert product.unique_customers_count == approximate.unique_customers_count
+    assert abs(product.unique_customers_count - 50) <= 4 * 0.01625 * 50
+    assert product.unique_count_mode is DistinctCountMode.APPROXIMATE
+    assert product.unique_count_error == pytest.approx(0.01625)
+    assert product.total_quantity == exact.total_quantity
+    assert customer.unique_products_count in (2, 3)  # Unless two share a register
+    assert exact.unique_count_mode is DistinctCountMode.EXACT
+    assert exact.unique_count_error is None
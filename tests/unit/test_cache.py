@@ -0,0 +1,177 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.core.cache import MISSING, CacheBackend, ComputeCache, LRUCacheBackend
+
+
+def test_least_recently_used_entry_is_evicted():
+    backend = LRUCacheBackend(max_size=2, ttl=60)
+    backend.set("a", 1)
+    backend.set("b", 2)
+    backend.get("a")
+
+    backend.set("c", 3)
+
+    assert backend.get("b") is MISSING
+    assert backend.get("a") == 1
+    assert backend.evictions == 1
+
+
+def test_entry_expires_after_ttl(monkeypatch):
+    backend = LRUCacheBackend(max_size=10, ttl=5)
+    now = 1000.0
+    monkeypatch.setattr("src.core.cache.time.monotonic", lambda: now)
+
+    backend.set("a", 1)
+    now += 5
+
+    assert backend.get("a") is MISSING
+    assert backend.expirations == 1
+
+
+def test_snapshot_reports_hit_ratio():
+    backend = LRUCacheBackend(max_size=10, ttl=60)
+    backend.set("a", 1)
+    backend.get("a")
+    backend.get("b")
+
+    snapshot = backend.snapshot()
+
+    assert snapshot["hits"] == 1
+    assert snapshot["misses"] == 1
+    assert snapshot["hit_ratio"] == 0.5
+
+
+def test_peek_is_not_counted_as_lookup():
+    cache = ComputeCache(LRUCacheBackend(max_size=10, ttl=60))
+    cache.backend.set("a", 1)
+
+    assert cache.peek("a") == 1
+    assert cache.peek("b") is MISSING
+    assert cache.backend.hits == 0
+    assert cache.backend.misses == 0
+
+
+def test_backend_must_implement_storage():
+    class Incomplete(CacheBackend):
+        def get(self, key):
+            return MISSING
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_zero_ttl_disables_cache():
+    cache = ComputeCache(LRUCacheBackend(max_size=10, ttl=0))
+
+    cache.get_or_compute("a", lambda: 1)
+
+    assert cache.get_or_compute("a", lambda: 2) == 2
+
+
+def test_concurrent_misses_compute_once():
+    cache = ComputeCache(LRUCacheBackend(max_size=10, ttl=60))
+    calls = []
+
+    def compute():
+        calls.append(None)
+        time.sleep(0.05)
+        return 1
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(cache.get_or_compute("a", compute))
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [1] * 8
+    assert len(calls) == 1
+    assert cache.computations == 1
+
+
+def test_concurrent_async_misses_compute_once():
+    cache = ComputeCache(LRUCacheBackend(max_size=10, ttl=60))
+    calls = []
+
+    async def compute():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return 1
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.get_or_compute_async("a", compute) for _ in range(8))
+        )
+
+    assert asyncio.run(main()) == [1] * 8
+    assert len(calls) == 1
+    assert cache.coalesced == 7
+
+
+def test_cancelled_async_caller_does_not_cancel_waiters():
+    cache = ComputeCache(LRUCacheBackend(max_size=10, ttl=60))
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        return 1
+
+    async def main():
+        leader = asyncio.ensure_future(cache.get_or_compute_async("a", compute))
+        await asyncio.sleep(0)  # The leader starts the computation
+        waiters = asyncio.gather(
+            *(cache.get_or_compute_async("a", compute) for _ in range(3))
+        )
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+        return await waiters
+
+    assert asyncio.run(main()) == [1] * 3
+    assert cache.computations == 1
+    assert cache.backend.get("a") == 1
+
+
+def test_value_computed_during_invalidation_is_not_stored():
+    cache = ComputeCache(LRUCacheBackend(max_size=10, ttl=60))
+
+    def compute():
+        cache.invalidate(["b"])  # Ingest committed while computing
+        return 1
+
+    assert cache.get_or_compute("a", compute) == 1
+    assert cache.backend.get("a") is MISSING
+
+
+def test_exceptions_are_not_cached():
+    cache = ComputeCache(LRUCacheBackend(max_size=10, ttl=60))
+
+    def fail():
+        raise LookupError
+
+    with pytest.raises(LookupError):
+        cache.get_or_compute("a", fail)
+
+    assert cache.get_or_compute("a", lambda: 1) == 1
+
+
+def test_invalidate_drops_only_given_keys():
+    cache = ComputeCache(LRUCacheBackend(max_size=10, ttl=60))
+    cache.get_or_compute("a", lambda: 1)
+    cache.get_or_compute("b", lambda: 2)
+
+    cache.invalidate(["a"])
+
+    assert cache.get_or_compute("a", lambda: 3) == 3
+    assert cache.get_or_compute("b", lambda: 4) == 2
@@ -0,0 +1,100 @@
+import gzip
+import io
+import zipfile
+
+import pytest
+
+from src.transaction.compression import open_upload
+from src.transaction.errors import InvalidFileStructure, UnsupportedTransactionFormat
+
+CONTENT = b"transaction_id,amount\n1,10\n" * 1000
+
+
+def _read(stream, chunk_size: int = 100) -> bytes:
+    return b"".join(iter(lambda: stream.read(chunk_size), b""))
+
+
+def test_open_upload_passes_plain_csv_through():
+    [member] = open_upload(io.BytesIO(CONTENT))
+
+    assert member.name is None
+    assert _read(member.stream) == CONTENT
+
+
+def test_open_upload_decompresses_gzip():
+    [member] = [
+        (member.name, _read(member.stream))
+        for member in open_upload(io.BytesIO(gzip.compress(CONTENT)))
+    ]
+
+    assert member == (None, CONTENT)
+
+
+def test_open_upload_decompresses_zstd():
+    zstandard = pytest.importorskip("zstandard")
+    content = zstandard.ZstdCompressor().compress(CONTENT)
+
+    members = [_read(member.stream) for member in open_upload(io.BytesIO(content))]
+
+    assert members == [CONTENT]
+
+
+def test_open_upload_yields_csv_members_of_zip():
+    archive = io.BytesIO()
+
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("first.csv", CONTENT)
+        zip_file.writestr("notes/readme.txt", b"skipped")
+        zip_file.writestr("second.CSV", CONTENT[:50])
+
+    members = [
+        (member.name, _read(member.stream))
+        for member in open_upload(io.BytesIO(archive.getvalue()))
+    ]
+
+    assert members == [("first.csv", CONTENT), ("second.CSV", CONTENT[:50])]
+
+
+def test_open_upload_extracts_parquet_members_of_zip():
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    from src.transaction.formats import iter_record_batches
+
+    table = pyarrow.table({"transaction_id": ["1", "2"], "amount": [10, 20]})
+    parquet = io.BytesIO()
+    pyarrow.parquet.write_table(table, parquet)
+    archive = io.BytesIO()
+
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("transactions.parquet", parquet.getvalue())
+
+    [rows] = [
+        sum(
+            batch.num_rows
+            for batch in iter_record_batches(
+                stream=member.stream, format=member.format, batch_rows=1
+            )
+        )
+        for member in open_upload(io.BytesIO(archive.getvalue()))
+    ]
+
+    assert rows == 2
+
+
+def test_open_upload_rejects_zip_without_supported_files():
+    archive = io.BytesIO()
+
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        zip_file.writestr("readme.txt", b"skipped")
+
+    with pytest.raises(UnsupportedTransactionFormat):
+        list(open_upload(io.BytesIO(archive.getvalue())))
+
+
+def test_open_upload_reports_truncated_gzip_as_invalid_file():
+    content = gzip.compress(CONTENT)[:-20]
+
+    with pytest.raises(InvalidFileStructure):
+        for member in open_upload(io.BytesIO(content)):
+            _read(member.stream)
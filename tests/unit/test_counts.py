@@ -0,0 +1,57 @@
+from uuid import uuid4
+
+from src.transaction.counts import CountCache
+
+
+def test_count_is_cached_per_filter():
+    cache = CountCache(ttl=60)
+    customer_id = uuid4()
+
+    cache.set(count=10)
+    cache.set(count=2, customer_id=customer_id)
+
+    assert cache.get() == 10
+    assert cache.get(customer_id=str(customer_id)) == 2
+    assert cache.get(product_id=uuid4()) is None
+
+
+def test_count_expires_after_ttl(monkeypatch):
+    cache = CountCache(ttl=5)
+    now = 1000.0
+    monkeypatch.setattr("src.core.cache.time.monotonic", lambda: now)
+
+    cache.set(count=10)
+    now += 5
+
+    assert cache.get() is None
+
+
+def test_invalidate_clears_every_filter():
+    cache = CountCache(ttl=60)
+    cache.set(count=10)
+    cache.set(count=2, customer_id=uuid4())
+
+    cache.invalidate()
+
+    assert cache.get() is None
+
+
+def test_zero_ttl_disables_cache():
+    cache = CountCache(ttl=0)
+    cache.set(count=10)
+
+    assert cache.get() is None
+
+
+def test_least_recently_used_filter_is_evicted():
+    cache = CountCache(ttl=60, max_size=2)
+    first, second, third = uuid4(), uuid4(), uuid4()
+    cache.set(count=1, customer_id=first)
+    cache.set(count=2, customer_id=second)
+    cache.get(customer_id=first)
+
+    cache.set(count=3, customer_id=third)
+
+    assert cache.get(customer_id=first) == 1
+    assert cache.get(customer_id=second) is None
+    assert cache.get(customer_id=third) == 3
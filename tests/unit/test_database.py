@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+
+from src.core.database import catch_errors
+from src.core.errors import RepositoryOperationalError
+
+
+@pytest.mark.parametrize(
+    "error",
+    [OperationalError("SELECT 1", {}, Exception("server closed")), PoolTimeoutError()],
+)
+def test_catch_errors_maps_database_errors(error):
+    @catch_errors
+    def query():
+        raise error
+
+    with pytest.raises(RepositoryOperationalError):
+        query()
+
+
+def test_catch_errors_lets_value_error_propagate():
+    @catch_errors
+    def query():
+        raise ValueError("bug")
+
+    with pytest.raises(ValueError, match="bug"):
+        query()
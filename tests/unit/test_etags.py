@@ -0,0 +1,16 @@
+from src.core import etags
+
+
+def test_version_depends_on_every_part():
+    assert etags.version("a", 1) == etags.version("a", 1)
+    assert etags.version("a", 1) != etags.version("a", 2)
+    assert etags.version("a1") != etags.version("a", 1)
+
+
+def test_matches_any_listed_tag_weakly():
+    etag = etags.etag(etags.version("a"))
+
+    assert etags.matches(f'"other", W/{etag}', etag)
+    assert etags.matches("*", etag)
+    assert not etags.matches('"other"', etag)
+    assert not etags.matches(None, etag)
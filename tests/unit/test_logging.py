@@ -0,0 +1,50 @@
+import io
+import json
+import logging
+import queue
+
+from src.core.logging import (
+    CustomFormatter,
+    _BatchingQueueListener,
+    _RecordQueueHandler,
+    _ThrottleFilter,
+)
+
+
+def _record(message: str = "message") -> logging.LogRecord:
+    return logging.LogRecord("tests", logging.ERROR, __file__, 1, message, None, None)
+
+
+class TestThrottleFilter:
+    def test_drops_records_over_burst(self):
+        throttle = _ThrottleFilter(rate=0.001, burst=2, sample_rates={})
+
+        passed = [throttle.filter(_record()) for _ in range(5)]
+
+        assert passed == [True, True, False, False, False]
+
+    def test_sample_rate_applies_per_logger(self):
+        throttle = _ThrottleFilter(rate=0, burst=0, sample_rates={"tests": 0.0})
+
+        assert not throttle.filter(_record())
+        assert throttle.filter(logging.makeLogRecord({"name": "other"}))
+
+
+class TestBatchingQueueListener:
+    def test_writes_queued_records_as_json_lines(self):
+        records, stream = queue.SimpleQueue(), io.StringIO()
+        logger = logging.getLogger("tests.listener")
+        logger.propagate = False
+        logger.addHandler(_RecordQueueHandler(records))
+        listener = _BatchingQueueListener(
+            records, stream=stream, formatter=CustomFormatter(), batch_size=2
+        )
+
+        for idx in range(5):
+            logger.error("row %s", idx, extra={"extra": {"column": "amount"}})
+        listener.start()
+        listener.stop()
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [line["message"] for line in lines] == [f"row {i}" for i in range(5)]
+        assert all(line["column"] == "amount" for line in lines)
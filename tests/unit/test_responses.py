@@ -0,0 +1,81 @@
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.core.responses import ModelResponse
+from src.transaction.models.access import TransactionActiveRecord
+from src.transaction.models.dto import (
+    CustomerSummary,
+    DistinctCountMode,
+    Transaction,
+    TotalCountKind,
+    TransactionsPaginated,
+)
+
+
+def _active_record(amount: Decimal = Decimal("75.25")) -> TransactionActiveRecord:
+    return TransactionActiveRecord(
+        transaction_id=uuid4(),
+        timestamp=datetime(2024, 1, 2, 11, tzinfo=timezone.utc),
+        amount=amount,
+        currency="EUR",
+        customer_id=uuid4(),
+        product_id=uuid4(),
+        quantity=2,
+    )
+
+
+def test_from_row_matches_validated_transaction():
+    model = _active_record()
+
+    transaction = Transaction.from_row(model)
+
+    assert transaction == Transaction(
+        transaction_id=model.transaction_id,
+        timestamp=model.timestamp,
+        amount=model.amount,
+        currency=model.currency,
+        customer_id=model.customer_id,
+        product_id=model.product_id,
+        quantity=model.quantity,
+    )
+
+
+def test_model_response_matches_jsonable_encoder():
+    paginated = TransactionsPaginated(
+        total_count=2,
+        total_count_kind=TotalCountKind.EXACT,
+        page=1,
+        page_size=2,
+        items=[Transaction.from_row(_active_record()) for _ in range(2)],
+    )
+    summary = CustomerSummary(
+        customer_id=uuid4(),
+        total_revenue=Decimal("401.50"),
+        unique_products_count=3,
+        last_transaction_date=datetime(2024, 1, 2, tzinfo=timezone.utc),
+        unique_count_mode=DistinctCountMode.APPROXIMATE,
+        unique_count_error=0.01625,
+        version="0123",
+    )
+
+    for content in (paginated, paginated.items[0], summary):
+        assert (
+            ModelResponse(content=content).body
+            == JSONResponse(content=jsonable_encoder(content)).body
+        )
+
+
+def test_model_response_formats_floats_like_pydantic():
+    transaction = Transaction.from_row(_active_record(amount=Decimal("1e20")))
+
+    body = ModelResponse(content=transaction).body
+    encoded = JSONResponse(content=jsonable_encoder(transaction)).body
+
+    assert b'"amount":1e20' in body
+    assert b'"amount":1e+20' in encoded
+    assert json.loads(body) == json.loads(encoded)
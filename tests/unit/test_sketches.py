@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from src.transaction.sketches import estimate, standard_error
+
+PRECISION = 12
+
+
+def _register_rank(hash: int, precision: int = PRECISION):
+    """Reference of sketches.register_sql and sketches.rank_sql"""
+    rest = hash & ((1 << (64 - precision)) - 1)
+    register = (hash >> (64 - precision)) & ((1 << precision) - 1)
+
+    return register, (64 - precision) - rest.bit_length() + 1
+
+
+def _sketch(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    registers = {}
+
+    for _ in range(count):
+        register, rank = _register_rank(rng.getrandbits(64) - 2**63)
+        registers[register] = max(registers.get(register, 0), rank)
+
+    return len(registers), sum(2.0**-rank for rank in registers.values())
+
+
+@pytest.mark.parametrize("count", [1, 10, 1000, 20000, 200000])
+def test_estimate_is_within_error_bound(count):
+    registers, harmonic_sum = _sketch(count)
+
+    result = estimate(registers, harmonic_sum, precision=PRECISION)
+
+    assert abs(result - count) <= max(1, 4 * standard_error(PRECISION) * count)
+
+
+def test_empty_sketch_estimates_zero():
+    assert estimate(0, 0.0, precision=PRECISION) == 0
+
+
+def test_standard_error_shrinks_with_precision():
+    assert standard_error(12) == pytest.approx(0.01625)
+    assert standard_error(14) < standard_error(12)
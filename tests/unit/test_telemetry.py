@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from src.core.telemetry import instrumented, pool_telemetry
+
+
+class TestInstrumentedPool:
+    def setup_method(self):
+        pool_class = instrumented(QueuePool, name="tests")
+        self.pool = pool_class(
+            lambda: sqlite3.connect(":memory:"),
+            pool_size=1,
+            max_overflow=0,
+            timeout=0.01,
+        )
+        self.telemetry = pool_telemetry["tests"]
+        self.telemetry.reset()
+
+    def test_checkouts_are_counted_and_bucketed(self):
+        connection = self.pool.connect()
+
+        snapshot = self.telemetry.snapshot()
+        connection.close()
+
+        assert snapshot["checkouts"] == 1
+        assert snapshot["checked_out"] == 1
+        assert snapshot["connects"] == 1
+        assert sum(bucket["count"] for bucket in snapshot["wait_ms_histogram"]) == 1
+
+    def test_checkout_timeout_is_counted(self):
+        connection = self.pool.connect()
+
+        with pytest.raises(PoolTimeoutError):
+            self.pool.connect()
+
+        connection.close()
+        snapshot = self.telemetry.snapshot()
+
+        assert snapshot["checkout_timeouts"] == 1
@@ -1,8 +1,20 @@
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime
+from uuid import UUID
+
 import pytest
 
 from src.transaction.errors import InvalidFileStructure
+from src.transaction.ingest_errors import ErrorCollector, remove_expired_reports
+from src.transaction.models.dto import UploadFormat
 from src.transaction.service import TransactionValidator
+from src.transaction.validator import ColumnarTransactionValidator
 from tests.generators import (
+    edge_case_data,
     generate_csv,
     invalid_data,
     invalid_headers,
@@ -36,3 +48,323 @@ class TestTransactionValidator:
 
         assert result.success == 1
         assert result.failure == 7
+
+    def test_validate_stream_yields_bounded_batches(self):
+        csv_content = generate_csv(valid_headers(), valid_data())
+
+        batches = list(
+            self.validator.validate_stream(stream=io.BytesIO(csv_content), batch_size=1)
+        )
+
+        assert all(len(batch.validated_items) <= 1 for batch in batches)
+        assert sum(batch.success for batch in batches) == 2
+        assert sum(batch.failure for batch in batches) == 0
+
+    def test_validate_stream_handles_rows_split_across_chunks(self):
+        csv_content = generate_csv(valid_headers(), valid_data() + invalid_data())
+
+        batches = list(
+            self.validator.validate_stream(stream=io.BytesIO(csv_content), chunk_size=7)
+        )
+
+        assert sum(batch.success for batch in batches) == 3
+        assert sum(batch.failure for batch in batches) == 7
+
+    def test_validate_stream_groups_errors_by_column_and_reason(self, tmp_path):
+        duplicate = valid_data()[0]
+        csv_content = generate_csv(
+            valid_headers(),
+            [duplicate, duplicate] + invalid_data() + invalid_data() + invalid_data(),
+        )
+        errors = ErrorCollector(report_path=str(tmp_path / "errors.csv"), examples=2)
+
+        list(
+            self.validator.validate_stream(
+                stream=io.BytesIO(csv_content), errors=errors
+            )
+        )
+        errors.close()
+
+        groups = {(group.column, group.reason): group for group in errors.summary()}
+        with open(errors.report_path) as report:
+            report_rows = list(csv.DictReader(report))
+
+        assert groups[("transaction_id", "duplicate")].rows == [2]
+        assert groups[("transaction_id", "uuid_parsing")].count == 3
+        assert groups[("transaction_id", "uuid_parsing")].rows == [4, 12]
+        assert groups[("currency", "enum")].count == 3
+        assert len(report_rows) == sum(group.count for group in groups.values())
+
+    def test_remove_expired_reports_keeps_recent_reports(self, tmp_path):
+        expired, recent = tmp_path / "expired.csv", tmp_path / "recent.csv"
+        expired.write_text("row")
+        recent.write_text("row")
+        written_at = time.time() - 120
+        os.utime(expired, (written_at, written_at))
+
+        assert remove_expired_reports(directory=str(tmp_path), retention=0) == 0
+        assert remove_expired_reports(directory=str(tmp_path), retention=60) == 1
+        assert not expired.exists()
+        assert recent.exists()
+
+
+def _as_rows(items) -> list:
+    return [
+        (
+            str(item.transaction_id),
+            str(item.timestamp),
+            item.amount,
+            item.currency,
+            str(item.customer_id),
+            str(item.product_id),
+            item.quantity,
+        )
+        for item in items
+    ]
+
+
+class TestColumnarTransactionValidator:
+
+    validator = ColumnarTransactionValidator()
+    reference = TransactionValidator()
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            valid_data(),
+            invalid_data(),
+            edge_case_data(),
+            valid_data() + invalid_data() + edge_case_data(),
+        ],
+    )
+    def test_validate_matches_model_validator(self, data):
+        csv_content = generate_csv(valid_headers(), data)
+
+        result = self.validator.validate(content=csv_content)
+        expected = self.reference.validate(content=csv_content)
+
+        assert result.success == expected.success
+        assert result.failure == expected.failure
+        assert _as_rows(result.validated_items) == _as_rows(expected.validated_items)
+
+    def test_validate_stream_reports_same_errors_as_model_validator(self):
+        csv_content = generate_csv(
+            valid_headers(), valid_data() + invalid_data() + edge_case_data()
+        )
+        errors, expected = ErrorCollector(), ErrorCollector()
+
+        list(self.validator.validate_stream(io.BytesIO(csv_content), errors=errors))
+        list(self.reference.validate_stream(io.BytesIO(csv_content), errors=expected))
+
+        assert errors.summary() == expected.summary()
+
+    def test_validate_with_quoted_fields_matches_model_validator(self):
+        output = io.StringIO()
+        writer = csv.DictWriter(
+            output, fieldnames=valid_headers(), quoting=csv.QUOTE_ALL
+        )
+        writer.writeheader()
+        writer.writerows(valid_data())
+        writer.writerow({**valid_data()[0], "currency": "US\nD"})
+        csv_content = (
+            output.getvalue().encode()
+            + generate_csv(valid_headers(), valid_data()).split(b"\n", 1)[1]
+        )
+
+        result = self.validator.validate(content=csv_content)
+        expected = self.reference.validate(content=csv_content)
+
+        assert (result.success, result.failure) == (4, 1)
+        assert (expected.success, expected.failure) == (4, 1)
+        assert _as_rows(result.validated_items) == _as_rows(expected.validated_items)
+
+    def test_validate_with_irregular_rows_returns_failure(self):
+        csv_content = generate_csv(valid_headers(), valid_data())
+        csv_content += b"1,2,3\n"
+
+        result = self.validator.validate(content=csv_content)
+
+        assert result.success == 2
+        assert result.failure == 1
+
+    def test_validate_with_invalid_headers_raises_error(self):
+        csv_content = generate_csv(invalid_headers())
+
+        with pytest.raises(InvalidFileStructure):
+            self.validator.validate(csv_content)
+
+
+class TestParallelTransactionValidator:
+
+    @pytest.mark.parametrize(
+        "validator_class", [TransactionValidator, ColumnarTransactionValidator]
+    )
+    def test_validate_matches_sequential_validation(self, validator_class):
+        data = (valid_data() + invalid_data() + edge_case_data()) * 5
+        data.append({**data[0]})  # Duplicate across parts
+        csv_content = generate_csv(valid_headers(), data)
+
+        result = validator_class(workers=2, part_size=512).validate(csv_content)
+        expected = validator_class().validate(csv_content)
+
+        assert result.success == expected.success
+        assert result.failure == expected.failure
+        assert _as_rows(result.validated_items) == _as_rows(expected.validated_items)
+
+    def test_validate_does_not_split_quoted_rows(self):
+        output = io.StringIO()
+        writer = csv.DictWriter(
+            output, fieldnames=valid_headers(), quoting=csv.QUOTE_ALL
+        )
+        writer.writeheader()
+
+        for _ in range(20):
+            writer.writerows(valid_data())
+            writer.writerow({**valid_data()[0], "currency": "US\nD"})
+
+        csv_content = output.getvalue().encode()
+
+        result = TransactionValidator(workers=2, part_size=64).validate(csv_content)
+
+        assert result.success == 40
+        assert result.failure == 20
+
+    def test_validate_with_invalid_headers_raises_error(self):
+        csv_content = generate_csv(invalid_headers())
+
+        with pytest.raises(InvalidFileStructure):
+            TransactionValidator(workers=2).validate(csv_content)
+
+    def test_validate_with_stray_quote_raises_error(self):
+        data = [row for _ in range(50) for row in valid_data()]
+        csv_content = generate_csv(valid_headers(), data).replace(
+            b"75.25", b'"75.25', 1
+        )
+        validator = TransactionValidator(workers=2, part_size=64)
+
+        with pytest.raises(InvalidFileStructure, match="stray quote"):
+            list(validator.validate_stream(io.BytesIO(csv_content), chunk_size=256))
+
+
+def _typed_batch(data):
+    pyarrow = pytest.importorskip("pyarrow")
+
+    return pyarrow.record_batch(
+        {
+            "transaction_id": pyarrow.array(
+                [UUID(item["transaction_id"]).bytes for item in data], pyarrow.uuid()
+            ),
+            "timestamp": pyarrow.array(
+                [datetime.fromisoformat(item["timestamp"]) for item in data],
+                pyarrow.timestamp("ns", tz="UTC"),
+            ),
+            "amount": pyarrow.array([float(item["amount"]) for item in data]),
+            "currency": pyarrow.array(
+                [item["currency"] for item in data]
+            ).dictionary_encode(),
+            "customer_id": pyarrow.array([item["customer_id"] for item in data]),
+            "product_id": pyarrow.array([item["product_id"] for item in data]),
+            "quantity": pyarrow.array([item["quantity"] for item in data]),
+        }
+    )
+
+
+def _utc_data():
+    return [
+        {**item, "timestamp": f"2024-01-0{idx + 1}T10:00:00+00:00"}
+        for idx, item in enumerate(valid_data())
+    ]
+
+
+@pytest.mark.parametrize(
+    "validator_class", [TransactionValidator, ColumnarTransactionValidator]
+)
+class TestTypedFormats:
+
+    def test_validate_ndjson_matches_csv_validation(self, validator_class):
+        data = valid_data() + invalid_data() + edge_case_data()
+        lines = [json.dumps(item).encode() for item in data]
+        lines += [b"not json", json.dumps({"amount": 1}).encode(), b""]
+        errors = ErrorCollector()
+
+        batches = list(
+            validator_class().validate_stream(
+                stream=io.BytesIO(b"\n".join(lines)),
+                errors=errors,
+                format=UploadFormat.NDJSON,
+            )
+        )
+        expected = validator_class().validate(generate_csv(valid_headers(), data))
+        groups = {(group.column, group.reason) for group in errors.summary()}
+
+        assert sum(batch.success for batch in batches) == expected.success
+        assert sum(batch.failure for batch in batches) == expected.failure + 2
+        assert {(None, "json_invalid"), ("transaction_id", "missing")} <= groups
+
+    def test_validate_ndjson_reports_unknown_keys(self, validator_class):
+        item = valid_data()[0]
+        item["amout"] = item.pop("amount")  # Same key count, misspelled
+        errors = ErrorCollector()
+
+        batches = list(
+            validator_class().validate_stream(
+                stream=io.BytesIO(json.dumps(item).encode()),
+                errors=errors,
+                format=UploadFormat.NDJSON,
+            )
+        )
+        groups = {(group.column, group.reason) for group in errors.summary()}
+
+        assert sum(batch.success for batch in batches) == 0
+        assert sum(batch.failure for batch in batches) == 1
+        assert groups == {("amount", "missing"), ("amout", "unknown_field")}
+
+    @pytest.mark.parametrize("format", [UploadFormat.PARQUET, UploadFormat.ARROW])
+    def test_validate_typed_columns_matches_csv_validation(
+        self, validator_class, format
+    ):
+        pyarrow = pytest.importorskip("pyarrow")
+        import pyarrow.parquet
+
+        data = _utc_data()
+        invalid = {**_utc_data()[0], "amount": -1, "quantity": 0}
+        batch = _typed_batch(data + [invalid])
+        stream = io.BytesIO()
+
+        if format is UploadFormat.PARQUET:
+            pyarrow.parquet.write_table(pyarrow.Table.from_batches([batch]), stream)
+        else:
+            with pyarrow.ipc.new_file(stream, batch.schema) as writer:
+                writer.write_batch(batch)
+
+        stream.seek(0)
+        errors = ErrorCollector()
+
+        [result] = validator_class().validate_stream(
+            stream=stream, errors=errors, format=format
+        )
+        expected = validator_class().validate(generate_csv(valid_headers(), data))
+        groups = {(group.column, group.reason) for group in errors.summary()}
+
+        assert (result.success, result.failure) == (2, 1)
+        assert _as_rows(result.validated_items) == _as_rows(expected.validated_items)
+        assert groups == {("amount", "greater_than"), ("quantity", "greater_than")}
+
+    def test_validate_arrow_stream_with_invalid_columns_raises_error(
+        self, validator_class
+    ):
+        pyarrow = pytest.importorskip("pyarrow")
+
+        batch = _typed_batch(_utc_data()).drop_columns(["quantity"])
+        stream = io.BytesIO()
+
+        with pyarrow.ipc.new_stream(stream, batch.schema) as writer:
+            writer.write_batch(batch)
+
+        with pytest.raises(InvalidFileStructure):
+            list(
+                validator_class().validate_stream(
+                    stream=io.BytesIO(stream.getvalue()),
+                    format=UploadFormat.ARROW_STREAM,
+                )
+            )